@@ -0,0 +1,14 @@
+"""
+run.py — Pipeline fin a fin (ingesta → clean → oro → reporte.md).
+
+Atajo de `python -m ut1 run`; acepta las mismas opciones (p. ej. --shard-ventas).
+Para etapas sueltas: python -m ut1 --help
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ut1.cli import main
+
+if __name__ == "__main__":
+    raise SystemExit(main(["run", *sys.argv[1:]]))
@@ -13,24 +13,50 @@ CREATE TABLE IF NOT EXISTS raw_ventas(
   _batch_id TEXT
 );
 
--- Plata: clean (lo usa run.py y las vistas)
-CREATE TABLE IF NOT EXISTS clean_ventas(
-  fecha TEXT,
-  id_cliente TEXT,
-  id_producto TEXT,
+-- Diccionarios de claves sustitutas: se dan de alta en ingest (ver ut1/keys.py)
+CREATE TABLE IF NOT EXISTS dim_cliente(
+  cliente_sk INTEGER PRIMARY KEY,
+  id_cliente TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS dim_producto(
+  producto_sk INTEGER PRIMARY KEY,
+  id_producto TEXT NOT NULL UNIQUE
+);
+
+-- Plata: clean con claves enteras (fecha_dia = días desde 1970-01-01)
+CREATE TABLE IF NOT EXISTS fact_ventas(
+  fecha_dia INTEGER,
+  cliente_sk INTEGER,
+  producto_sk INTEGER,
   unidades REAL,
   precio_unitario REAL,
   _ingest_ts TEXT,
-  PRIMARY KEY (fecha, id_cliente, id_producto)
-);
+  PRIMARY KEY (fecha_dia, cliente_sk, producto_sk)
+) WITHOUT ROWID;
+
+-- clean_ventas con las claves naturales (lo usan run.py y las vistas)
+CREATE VIEW IF NOT EXISTS clean_ventas AS
+SELECT
+  date(f.fecha_dia * 86400, 'unixepoch') AS fecha,
+  c.id_cliente,
+  p.id_producto,
+  f.unidades,
+  f.precio_unitario,
+  f._ingest_ts
+FROM fact_ventas f
+JOIN dim_cliente c ON c.cliente_sk = f.cliente_sk
+JOIN dim_producto p ON p.producto_sk = f.producto_sk;
 
 -- Cuarentena para registros inválidos (exportada a CSV por run.py)
+-- _header: cabecera del drop en las líneas de parseo (guardadas tal cual; ver ut1/replay.py)
 CREATE TABLE IF NOT EXISTS quarantine_ventas(
   _reason TEXT,
   _row TEXT,
   _ingest_ts TEXT,
   _source_file TEXT,
-  _batch_id TEXT
+  _batch_id TEXT,
+  _header TEXT
 );
 
 --clientes
@@ -61,7 +87,8 @@ CREATE TABLE IF NOT EXISTS quarantine_clientes(
   _row TEXT,
   _ingest_ts TEXT,
   _source_file TEXT,
-  _batch_id TEXT
+  _batch_id TEXT,
+  _header TEXT
 );
 
 -- Productos
@@ -96,5 +123,142 @@ CREATE TABLE IF NOT EXISTS quarantine_productos(
   _row TEXT,
   _ingest_ts TEXT,
   _source_file TEXT,
-  _batch_id TEXT
+  _batch_id TEXT,
+  _header TEXT
+);
+
+-- Historia (SCD2) de las dimensiones: una versión por (id, valid_from, _ingest_ts), vigente en [valid_from, valid_to)
+-- valid_from = fecha de negocio (alta del cliente / fecha_entrada del producto); las correcciones de una
+-- misma fecha se ordenan por _ingest_ts y la anterior queda con valid_to = valid_from. La versión actual
+-- tiene valid_to = '9999-12-31'. clean_clientes/clean_productos siguen siendo el estado actual.
+CREATE TABLE IF NOT EXISTS hist_clientes(
+  id_cliente TEXT,
+  valid_from TEXT,
+  valid_to TEXT,
+  fecha TEXT,
+  nombre TEXT,
+  apellido TEXT,
+  _ingest_ts TEXT,
+  PRIMARY KEY (id_cliente, valid_from, _ingest_ts)
+);
+
+CREATE TABLE IF NOT EXISTS hist_productos(
+  id_producto TEXT,
+  valid_from TEXT,
+  valid_to TEXT,
+  fecha_entrada TEXT,
+  nombre_producto TEXT,
+  unidades REAL,
+  precio_unitario REAL,
+  categoria TEXT,
+  _ingest_ts TEXT,
+  PRIMARY KEY (id_producto, valid_from, _ingest_ts)
+);
+
+-- Control: diario de ejecución por batch (un drop = un batch), para reanudar y saltar lo ya procesado
+-- state: pending → ingested → cleaned → published
+-- ingest_ts: _ingest_ts de la última ingesta del drop (lo anterior ya se limpió en otro run)
+CREATE TABLE IF NOT EXISTS run_journal(
+  _source_file TEXT PRIMARY KEY,
+  _batch_id TEXT,
+  kind TEXT,
+  fingerprint TEXT,
+  state TEXT,
+  run_id TEXT,
+  updated_ts TEXT,
+  ingest_ts TEXT
+);
+
+-- Cola de trabajo compartida entre workers (ver ut1/workers.py): un drop por fila, reclamado con lease
+-- state: queued → claimed → done | failed; lease_until en segundos epoch (relojes sincronizados entre hosts)
+-- started_ts: inicio del primer intento desde el alta (desde ahí purga un reintento)
+CREATE TABLE IF NOT EXISTS work_queue(
+  _source_file TEXT PRIMARY KEY,
+  kind TEXT,
+  fingerprint TEXT,
+  state TEXT,
+  owner TEXT,
+  lease_until REAL,
+  attempts INTEGER,
+  queued_ts TEXT,
+  started_ts TEXT,
+  updated_ts TEXT,
+  error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_work_queue_state ON work_queue(state, lease_until);
+
+-- Huellas de 64 bits de fichero + fila de lo ya ingerido (dedupe de reenvíos en ingest, ver ut1/rowdedup.py)
+CREATE TABLE IF NOT EXISTS raw_fingerprints(
+  kind TEXT,
+  fp INTEGER,
+  _source_file TEXT,
+  _ingest_ts TEXT,
+  PRIMARY KEY (kind, fp)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_raw_fingerprints_source ON raw_fingerprints(_source_file, _ingest_ts);
+
+-- Versión vigente en raw_* por clave de negocio: huella de la clave → huella de su última fila guardada
+CREATE TABLE IF NOT EXISTS raw_current(
+  kind TEXT,
+  key_fp INTEGER,
+  fp INTEGER,
+  _source_file TEXT,
+  _ingest_ts TEXT,
+  PRIMARY KEY (kind, key_fp)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_raw_current_source ON raw_current(_source_file, _ingest_ts);
+
+-- Filtro de Bloom de raw_fingerprints por dominio (m bits, k hashes, n huellas añadidas)
+CREATE TABLE IF NOT EXISTS raw_fingerprint_bloom(
+  kind TEXT PRIMARY KEY,
+  m INTEGER,
+  k INTEGER,
+  n INTEGER,
+  bits BLOB
+);
+-- Dominios con huellas confirmadas que su filtro guardado aún no tiene (run sin flush): se reconstruye al cargar
+CREATE TABLE IF NOT EXISTS raw_fingerprint_bloom_stale(
+  kind TEXT PRIMARY KEY
+);
+
+-- Perfil de calidad por batch de ingesta (drop + huella): contadores y sketches fusionables en JSON (ver ut1/quality.py)
+CREATE TABLE IF NOT EXISTS quality_profile(
+  _source_file TEXT,
+  fingerprint TEXT,
+  _batch_id TEXT,
+  kind TEXT,
+  rows INTEGER,
+  profile TEXT,
+  created_ts TEXT,
+  updated_ts TEXT,
+  PRIMARY KEY (_source_file, fingerprint)
+);
+
+-- Autoajuste (--autotune): filas, segundos (con decaimiento) y pico de RSS por host, parámetro y valor (ver ut1/autotune.py)
+CREATE TABLE IF NOT EXISTS autotune(
+  host TEXT,
+  knob TEXT,
+  value INTEGER,
+  rows REAL,
+  secs REAL,
+  rss_mib REAL,
+  samples INTEGER,
+  updated_ts TEXT,
+  PRIMARY KEY (host, knob, value)
 );
+
+-- Índices para leer/purgar un batch sin recorrer todo el histórico
+CREATE INDEX IF NOT EXISTS ix_raw_ventas_source ON raw_ventas(_source_file);
+CREATE INDEX IF NOT EXISTS ix_raw_clientes_source ON raw_clientes(_source_file);
+CREATE INDEX IF NOT EXISTS ix_raw_productos_source ON raw_productos(_source_file);
+
+-- Cuarentena: selección para replay por motivo, batch o fichero (ver ut1/replay.py)
+CREATE INDEX IF NOT EXISTS ix_quarantine_ventas_reason ON quarantine_ventas(_reason, _batch_id);
+CREATE INDEX IF NOT EXISTS ix_quarantine_ventas_batch ON quarantine_ventas(_batch_id);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_quarantine_ventas_row ON quarantine_ventas(_source_file, _row);
+CREATE INDEX IF NOT EXISTS ix_quarantine_clientes_reason ON quarantine_clientes(_reason, _batch_id);
+CREATE INDEX IF NOT EXISTS ix_quarantine_clientes_batch ON quarantine_clientes(_batch_id);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_quarantine_clientes_row ON quarantine_clientes(_source_file, _row);
+CREATE INDEX IF NOT EXISTS ix_quarantine_productos_reason ON quarantine_productos(_reason, _batch_id);
+CREATE INDEX IF NOT EXISTS ix_quarantine_productos_batch ON quarantine_productos(_batch_id);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_quarantine_productos_row ON quarantine_productos(_source_file, _row);
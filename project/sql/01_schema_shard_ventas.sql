@@ -0,0 +1,90 @@
+-- 01_schema_shard_ventas.sql — Esquema de cada shard mensual de ventas (SQLite)
+-- Un fichero por mes: output/shards/ventas_AAAA_MM.db (lo usa ut1/shards.py)
+
+-- Bronce: raw del mes
+CREATE TABLE IF NOT EXISTS raw_ventas(
+  fecha TEXT,
+  id_cliente TEXT,
+  id_producto TEXT,
+  unidades TEXT,
+  precio_unitario TEXT,
+  _ingest_ts TEXT,
+  _source_file TEXT,
+  _batch_id TEXT
+);
+
+-- Plata: clean del mes con las claves enteras de ut1.db (los diccionarios dim_* viven allí)
+CREATE TABLE IF NOT EXISTS fact_ventas(
+  fecha_dia INTEGER,
+  cliente_sk INTEGER,
+  producto_sk INTEGER,
+  unidades REAL,
+  precio_unitario REAL,
+  _ingest_ts TEXT,
+  PRIMARY KEY (fecha_dia, cliente_sk, producto_sk)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_raw_ventas_source ON raw_ventas(_source_file);
+
+-- Días del mes cambiados en fact_ventas, pendientes de volcar al cubo de ut1.db (ver 30_rollup.sql)
+CREATE TABLE IF NOT EXISTS gold_dirty_fechas(fecha_dia INTEGER PRIMARY KEY);
+
+CREATE TRIGGER IF NOT EXISTS trg_fact_ventas_ins AFTER INSERT ON fact_ventas
+BEGIN
+  INSERT INTO gold_dirty_fechas SELECT NEW.fecha_dia WHERE NOT EXISTS (SELECT 1 FROM gold_dirty_fechas WHERE fecha_dia = NEW.fecha_dia);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fact_ventas_upd AFTER UPDATE ON fact_ventas
+BEGIN
+  INSERT INTO gold_dirty_fechas SELECT OLD.fecha_dia WHERE NOT EXISTS (SELECT 1 FROM gold_dirty_fechas WHERE fecha_dia = OLD.fecha_dia);
+  INSERT INTO gold_dirty_fechas SELECT NEW.fecha_dia WHERE NOT EXISTS (SELECT 1 FROM gold_dirty_fechas WHERE fecha_dia = NEW.fecha_dia);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fact_ventas_del AFTER DELETE ON fact_ventas
+BEGIN
+  INSERT INTO gold_dirty_fechas SELECT OLD.fecha_dia WHERE NOT EXISTS (SELECT 1 FROM gold_dirty_fechas WHERE fecha_dia = OLD.fecha_dia);
+END;
+
+-- Cambios de fact_ventas del mes pendientes de copiar a cdc_changes de ut1.db (ver 40_cdc.sql):
+-- la clave natural no se puede formar aquí porque los diccionarios están en ut1.db
+CREATE TABLE IF NOT EXISTS cdc_pending(
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  fecha_dia INTEGER,
+  cliente_sk INTEGER,
+  producto_sk INTEGER,
+  op TEXT,
+  before TEXT,
+  after TEXT
+);
+
+-- Copia del interruptor de cdc_context de ut1.db (la fija cada UPSERT del shard)
+CREATE TABLE IF NOT EXISTS cdc_context(id INTEGER PRIMARY KEY CHECK (id = 1), enabled INTEGER NOT NULL DEFAULT 1);
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_fact_ventas_ins AFTER INSERT ON fact_ventas
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_pending (fecha_dia, cliente_sk, producto_sk, op, before, after) VALUES (
+    NEW.fecha_dia, NEW.cliente_sk, NEW.producto_sk, 'insert', NULL,
+    json_object('unidades', NEW.unidades, 'precio_unitario', NEW.precio_unitario, '_ingest_ts', NEW._ingest_ts)
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_fact_ventas_upd AFTER UPDATE ON fact_ventas
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_pending (fecha_dia, cliente_sk, producto_sk, op, before, after) VALUES (
+    NEW.fecha_dia, NEW.cliente_sk, NEW.producto_sk, 'update',
+    json_object('unidades', OLD.unidades, 'precio_unitario', OLD.precio_unitario, '_ingest_ts', OLD._ingest_ts),
+    json_object('unidades', NEW.unidades, 'precio_unitario', NEW.precio_unitario, '_ingest_ts', NEW._ingest_ts)
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_fact_ventas_del AFTER DELETE ON fact_ventas
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_pending (fecha_dia, cliente_sk, producto_sk, op, before, after) VALUES (
+    OLD.fecha_dia, OLD.cliente_sk, OLD.producto_sk, 'delete',
+    json_object('unidades', OLD.unidades, 'precio_unitario', OLD.precio_unitario, '_ingest_ts', OLD._ingest_ts),
+    NULL
+  );
+END;
@@ -1,13 +1,13 @@
--- UPSERT para clean_ventas (PK: fecha,id_cliente,id_producto)
-INSERT INTO clean_ventas (
-    fecha, id_cliente, id_producto, unidades, precio_unitario, _ingest_ts
+-- UPSERT para fact_ventas (PK entera: fecha_dia,cliente_sk,producto_sk; clean_ventas es su vista)
+INSERT INTO fact_ventas (
+    fecha_dia, cliente_sk, producto_sk, unidades, precio_unitario, _ingest_ts
 )
-VALUES (:fecha, :idc, :idp, :u, :p, :ts)
-ON CONFLICT(fecha, id_cliente, id_producto) DO UPDATE SET
+VALUES (:dia, :csk, :psk, :u, :p, :ts)
+ON CONFLICT(fecha_dia, cliente_sk, producto_sk) DO UPDATE SET
     unidades = excluded.unidades,
     precio_unitario = excluded.precio_unitario,
     _ingest_ts = excluded._ingest_ts
-WHERE excluded._ingest_ts > clean_ventas._ingest_ts;
+WHERE excluded._ingest_ts > fact_ventas._ingest_ts;
 
 -- UPSERT para clean_clientes (PK: id_cliente)
 INSERT INTO clean_clientes (
@@ -34,3 +34,43 @@ ON CONFLICT(id_producto) DO UPDATE SET
     categoria = excluded.categoria,
     _ingest_ts = excluded._ingest_ts
 WHERE excluded._ingest_ts > clean_productos._ingest_ts;
+
+-- UPSERTs de historia (PK: id, valid_from, _ingest_ts). Solo entra una versión si algún atributo cambia
+-- respecto a la anterior de ese id; una corrección con la misma fecha de negocio abre versión (ordenada
+-- por _ingest_ts) en vez de pisar la que había. valid_to lo recalcula ut1/scd.py al cerrar el batch
+INSERT INTO hist_clientes (
+    id_cliente, valid_from, valid_to, fecha, nombre, apellido, _ingest_ts
+)
+SELECT :idc, :valid_from, '9999-12-31', :fecha, :nombre, :apellido, :ts
+WHERE NOT EXISTS (
+    SELECT 1 FROM (
+        SELECT fecha, nombre, apellido FROM hist_clientes
+        WHERE id_cliente = :idc AND (valid_from, _ingest_ts) < (:valid_from, :ts)
+        ORDER BY valid_from DESC, _ingest_ts DESC LIMIT 1
+    ) AS prev
+    WHERE prev.fecha IS :fecha AND prev.nombre IS :nombre AND prev.apellido IS :apellido
+)
+ON CONFLICT(id_cliente, valid_from, _ingest_ts) DO UPDATE SET
+    fecha = excluded.fecha,
+    nombre = excluded.nombre,
+    apellido = excluded.apellido;
+
+INSERT INTO hist_productos (
+    id_producto, valid_from, valid_to, fecha_entrada, nombre_producto, unidades, precio_unitario, categoria, _ingest_ts
+)
+SELECT :idp, :valid_from, '9999-12-31', :fecha_entrada, :nombre_producto, :u, :p, :cat, :ts
+WHERE NOT EXISTS (
+    SELECT 1 FROM (
+        SELECT fecha_entrada, nombre_producto, unidades, precio_unitario, categoria FROM hist_productos
+        WHERE id_producto = :idp AND (valid_from, _ingest_ts) < (:valid_from, :ts)
+        ORDER BY valid_from DESC, _ingest_ts DESC LIMIT 1
+    ) AS prev
+    WHERE prev.fecha_entrada IS :fecha_entrada AND prev.nombre_producto IS :nombre_producto
+      AND prev.unidades IS :u AND prev.precio_unitario IS :p AND prev.categoria IS :cat
+)
+ON CONFLICT(id_producto, valid_from, _ingest_ts) DO UPDATE SET
+    fecha_entrada = excluded.fecha_entrada,
+    nombre_producto = excluded.nombre_producto,
+    unidades = excluded.unidades,
+    precio_unitario = excluded.precio_unitario,
+    categoria = excluded.categoria;
@@ -1,30 +1,30 @@
--- Ventas diarias (se mantiene por compatibilidad)
+-- Ventas diarias (se mantiene por compatibilidad); agrupa por la clave entera
 CREATE VIEW IF NOT EXISTS ventas_diarias AS
 SELECT
-  fecha AS fecha,
+  date(fecha_dia * 86400, 'unixepoch') AS fecha,
   SUM(unidades * precio_unitario) AS importe_total,
   COUNT(*) AS lineas
-FROM clean_ventas
-GROUP BY fecha;
+FROM fact_ventas
+GROUP BY fecha_dia;
 
 -- Producto más vendido (por unidades totales)
 CREATE VIEW IF NOT EXISTS vw_producto_mas_vendido AS
 WITH ventas_por_producto AS (
   SELECT
-    v.id_producto,
-    SUM(v.unidades) AS unidades_vendidas
-  FROM clean_ventas v
-  GROUP BY v.id_producto
+    producto_sk,
+    SUM(unidades) AS unidades_vendidas
+  FROM fact_ventas
+  GROUP BY producto_sk
 ),
 ranked AS (
   SELECT
-    p.id_producto,
+    d.id_producto,
     cp.nombre_producto,
     vpp.unidades_vendidas,
-    ROW_NUMBER() OVER (ORDER BY vpp.unidades_vendidas DESC, p.id_producto) AS rn
+    ROW_NUMBER() OVER (ORDER BY vpp.unidades_vendidas DESC, d.id_producto) AS rn
   FROM ventas_por_producto vpp
-  JOIN clean_productos cp ON cp.id_producto = vpp.id_producto
-  JOIN clean_productos p  ON p.id_producto  = vpp.id_producto
+  JOIN dim_producto d ON d.producto_sk = vpp.producto_sk
+  JOIN clean_productos cp ON cp.id_producto = d.id_producto
 )
 SELECT id_producto, nombre_producto, unidades_vendidas
 FROM ranked
@@ -0,0 +1,73 @@
+-- 30_rollup.sql — Cubo oro pre-agregado (SQLite), mantenido incrementalmente por ut1/rollup.py
+-- Claves enteras como fact_ventas (fecha_dia, producto_sk); las vistas vw_gold_* dan las naturales
+
+-- Grano día × producto, con categoría y sumas acumuladas (prefijos) por producto
+CREATE TABLE IF NOT EXISTS gold_ventas_dia_producto(
+  fecha_dia INTEGER,
+  producto_sk INTEGER,
+  categoria TEXT,
+  unidades REAL,
+  importe REAL,
+  lineas INTEGER,
+  cum_unidades REAL,
+  cum_importe REAL,
+  cum_lineas INTEGER,
+  PRIMARY KEY (fecha_dia, producto_sk)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_gold_vdp_producto ON gold_ventas_dia_producto(producto_sk, fecha_dia);
+CREATE INDEX IF NOT EXISTS ix_gold_vdp_categoria ON gold_ventas_dia_producto(categoria);
+
+-- Productos presentes en el cubo (lista corta para el top-N sin recorrer el cubo)
+CREATE TABLE IF NOT EXISTS gold_productos(
+  producto_sk INTEGER PRIMARY KEY,
+  categoria TEXT
+);
+
+-- Grano día, con sumas acumuladas: KPIs de cualquier rango [desde, hasta] en O(1)
+CREATE TABLE IF NOT EXISTS gold_ventas_dia(
+  fecha_dia INTEGER PRIMARY KEY,
+  unidades REAL,
+  importe REAL,
+  lineas INTEGER,
+  cum_unidades REAL,
+  cum_importe REAL,
+  cum_lineas INTEGER
+);
+
+CREATE VIEW IF NOT EXISTS vw_gold_ventas_dia AS
+SELECT date(fecha_dia * 86400, 'unixepoch') AS fecha, unidades, importe, lineas, cum_unidades, cum_importe, cum_lineas
+FROM gold_ventas_dia;
+
+CREATE VIEW IF NOT EXISTS vw_gold_ventas_dia_producto AS
+SELECT date(g.fecha_dia * 86400, 'unixepoch') AS fecha, d.id_producto, g.categoria,
+       g.unidades, g.importe, g.lineas, g.cum_unidades, g.cum_importe, g.cum_lineas
+FROM gold_ventas_dia_producto g
+JOIN dim_producto d ON d.producto_sk = g.producto_sk;
+
+-- Días a recalcular: los anotan los triggers de fact_ventas
+-- (sin OR IGNORE: dentro de un UPSERT, SQLite aplica al trigger la política ABORT del UPSERT)
+CREATE TABLE IF NOT EXISTS gold_dirty_fechas(fecha_dia INTEGER PRIMARY KEY);
+
+CREATE TRIGGER IF NOT EXISTS trg_fact_ventas_ins AFTER INSERT ON fact_ventas
+BEGIN
+  INSERT INTO gold_dirty_fechas SELECT NEW.fecha_dia WHERE NOT EXISTS (SELECT 1 FROM gold_dirty_fechas WHERE fecha_dia = NEW.fecha_dia);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fact_ventas_upd AFTER UPDATE ON fact_ventas
+BEGIN
+  INSERT INTO gold_dirty_fechas SELECT OLD.fecha_dia WHERE NOT EXISTS (SELECT 1 FROM gold_dirty_fechas WHERE fecha_dia = OLD.fecha_dia);
+  INSERT INTO gold_dirty_fechas SELECT NEW.fecha_dia WHERE NOT EXISTS (SELECT 1 FROM gold_dirty_fechas WHERE fecha_dia = NEW.fecha_dia);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fact_ventas_del AFTER DELETE ON fact_ventas
+BEGIN
+  INSERT INTO gold_dirty_fechas SELECT OLD.fecha_dia WHERE NOT EXISTS (SELECT 1 FROM gold_dirty_fechas WHERE fecha_dia = OLD.fecha_dia);
+END;
+
+-- Páginas de informe por periodo pendientes de publicar (ver ut1/publish.py): las anota refresh()
+-- kind: dia ('AAAA-MM-DD') | mes ('AAAA-MM') | categoria (nombre; '' = sin categoría)
+CREATE TABLE IF NOT EXISTS report_dirty(
+  kind TEXT,
+  key TEXT,
+  PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
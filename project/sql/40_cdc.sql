@@ -0,0 +1,138 @@
+-- 40_cdc.sql — Feed de cambios de clean_ventas, clean_clientes y clean_productos (ver ut1/cdc.py)
+-- op: insert | update | delete (los anotan los triggers) | skip (llegó una versión que
+-- perdió la comparación de _ingest_ts; la anota clean). key/before/after son JSON:
+-- before = lo guardado antes del cambio; after = lo guardado después (en skip, lo descartado).
+CREATE TABLE IF NOT EXISTS cdc_changes(
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  run_id TEXT,
+  entity TEXT,
+  op TEXT,
+  key TEXT,
+  before TEXT,
+  after TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_cdc_changes_run ON cdc_changes(run_id);
+
+-- Run en curso (una fila): clean la fija en la misma transacción que sus UPSERTs.
+-- enabled = 0 (`cdc --disable`) apaga los triggers: sin feed, el UPSERT no paga nada más
+CREATE TABLE IF NOT EXISTS cdc_context(id INTEGER PRIMARY KEY CHECK (id = 1), run_id TEXT, enabled INTEGER NOT NULL DEFAULT 1);
+
+-- Posición de cada consumidor en el feed (último seq procesado)
+CREATE TABLE IF NOT EXISTS cdc_cursors(
+  consumer TEXT PRIMARY KEY,
+  seq INTEGER NOT NULL,
+  updated_ts TEXT
+);
+
+-- Último cdc_pending.seq de cada shard ya copiado a cdc_changes (con --shard-ventas)
+CREATE TABLE IF NOT EXISTS cdc_shard_marks(shard TEXT PRIMARY KEY, seq INTEGER NOT NULL);
+
+-- Ventas: clave natural desde los diccionarios (fact_ventas solo guarda claves enteras)
+CREATE TRIGGER IF NOT EXISTS trg_cdc_fact_ventas_ins AFTER INSERT ON fact_ventas
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_changes (run_id, entity, op, key, before, after) VALUES (
+    (SELECT run_id FROM cdc_context WHERE id = 1), 'ventas', 'insert',
+    json_object('fecha', date(NEW.fecha_dia * 86400, 'unixepoch'),
+                'id_cliente', (SELECT id_cliente FROM dim_cliente WHERE cliente_sk = NEW.cliente_sk),
+                'id_producto', (SELECT id_producto FROM dim_producto WHERE producto_sk = NEW.producto_sk)),
+    NULL,
+    json_object('unidades', NEW.unidades, 'precio_unitario', NEW.precio_unitario, '_ingest_ts', NEW._ingest_ts)
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_fact_ventas_upd AFTER UPDATE ON fact_ventas
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_changes (run_id, entity, op, key, before, after) VALUES (
+    (SELECT run_id FROM cdc_context WHERE id = 1), 'ventas', 'update',
+    json_object('fecha', date(NEW.fecha_dia * 86400, 'unixepoch'),
+                'id_cliente', (SELECT id_cliente FROM dim_cliente WHERE cliente_sk = NEW.cliente_sk),
+                'id_producto', (SELECT id_producto FROM dim_producto WHERE producto_sk = NEW.producto_sk)),
+    json_object('unidades', OLD.unidades, 'precio_unitario', OLD.precio_unitario, '_ingest_ts', OLD._ingest_ts),
+    json_object('unidades', NEW.unidades, 'precio_unitario', NEW.precio_unitario, '_ingest_ts', NEW._ingest_ts)
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_fact_ventas_del AFTER DELETE ON fact_ventas
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_changes (run_id, entity, op, key, before, after) VALUES (
+    (SELECT run_id FROM cdc_context WHERE id = 1), 'ventas', 'delete',
+    json_object('fecha', date(OLD.fecha_dia * 86400, 'unixepoch'),
+                'id_cliente', (SELECT id_cliente FROM dim_cliente WHERE cliente_sk = OLD.cliente_sk),
+                'id_producto', (SELECT id_producto FROM dim_producto WHERE producto_sk = OLD.producto_sk)),
+    json_object('unidades', OLD.unidades, 'precio_unitario', OLD.precio_unitario, '_ingest_ts', OLD._ingest_ts),
+    NULL
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_clean_clientes_ins AFTER INSERT ON clean_clientes
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_changes (run_id, entity, op, key, before, after) VALUES (
+    (SELECT run_id FROM cdc_context WHERE id = 1), 'clientes', 'insert',
+    json_object('id_cliente', NEW.id_cliente),
+    NULL,
+    json_object('fecha', NEW.fecha, 'nombre', NEW.nombre, 'apellido', NEW.apellido, '_ingest_ts', NEW._ingest_ts)
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_clean_clientes_upd AFTER UPDATE ON clean_clientes
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_changes (run_id, entity, op, key, before, after) VALUES (
+    (SELECT run_id FROM cdc_context WHERE id = 1), 'clientes', 'update',
+    json_object('id_cliente', NEW.id_cliente),
+    json_object('fecha', OLD.fecha, 'nombre', OLD.nombre, 'apellido', OLD.apellido, '_ingest_ts', OLD._ingest_ts),
+    json_object('fecha', NEW.fecha, 'nombre', NEW.nombre, 'apellido', NEW.apellido, '_ingest_ts', NEW._ingest_ts)
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_clean_clientes_del AFTER DELETE ON clean_clientes
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_changes (run_id, entity, op, key, before, after) VALUES (
+    (SELECT run_id FROM cdc_context WHERE id = 1), 'clientes', 'delete',
+    json_object('id_cliente', OLD.id_cliente),
+    json_object('fecha', OLD.fecha, 'nombre', OLD.nombre, 'apellido', OLD.apellido, '_ingest_ts', OLD._ingest_ts),
+    NULL
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_clean_productos_ins AFTER INSERT ON clean_productos
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_changes (run_id, entity, op, key, before, after) VALUES (
+    (SELECT run_id FROM cdc_context WHERE id = 1), 'productos', 'insert',
+    json_object('id_producto', NEW.id_producto),
+    NULL,
+    json_object('fecha_entrada', NEW.fecha_entrada, 'nombre_producto', NEW.nombre_producto, 'unidades', NEW.unidades,
+                'precio_unitario', NEW.precio_unitario, 'categoria', NEW.categoria, '_ingest_ts', NEW._ingest_ts)
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_clean_productos_upd AFTER UPDATE ON clean_productos
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_changes (run_id, entity, op, key, before, after) VALUES (
+    (SELECT run_id FROM cdc_context WHERE id = 1), 'productos', 'update',
+    json_object('id_producto', NEW.id_producto),
+    json_object('fecha_entrada', OLD.fecha_entrada, 'nombre_producto', OLD.nombre_producto, 'unidades', OLD.unidades,
+                'precio_unitario', OLD.precio_unitario, 'categoria', OLD.categoria, '_ingest_ts', OLD._ingest_ts),
+    json_object('fecha_entrada', NEW.fecha_entrada, 'nombre_producto', NEW.nombre_producto, 'unidades', NEW.unidades,
+                'precio_unitario', NEW.precio_unitario, 'categoria', NEW.categoria, '_ingest_ts', NEW._ingest_ts)
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cdc_clean_productos_del AFTER DELETE ON clean_productos
+WHEN (SELECT enabled FROM cdc_context WHERE id = 1) IS NOT 0
+BEGIN
+  INSERT INTO cdc_changes (run_id, entity, op, key, before, after) VALUES (
+    (SELECT run_id FROM cdc_context WHERE id = 1), 'productos', 'delete',
+    json_object('id_producto', OLD.id_producto),
+    json_object('fecha_entrada', OLD.fecha_entrada, 'nombre_producto', OLD.nombre_producto, 'unidades', OLD.unidades,
+                'precio_unitario', OLD.precio_unitario, 'categoria', OLD.categoria, '_ingest_ts', OLD._ingest_ts),
+    NULL
+  );
+END;
@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+@pytest.fixture
+def root(tmp_path):
+    """Salidas (output/) bajo tmp_path; al acabar, de vuelta a la raíz del proyecto."""
+    from ut1 import paths
+    paths.set_root(tmp_path)
+    paths.ensure_output_dirs()
+    yield tmp_path
+    paths.set_root(paths.ROOT)
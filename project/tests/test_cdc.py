@@ -0,0 +1,40 @@
+import sqlite3
+import pandas as pd
+from ut1 import cdc, storage
+from ut1.clean import clean_and_persist_clientes_from_raw
+
+def _batch(ts, nombre):
+    return pd.DataFrame([{
+        "fecha": "2025-01-01", "nombre": nombre, "apellido": "Gil", "id_cliente": "C001",
+        "_ingest_ts": ts, "_source_file": f"clientes_{ts}.csv", "_batch_id": f"clientes_{ts}",
+    }])
+
+def _con(root):
+    con = sqlite3.connect(":memory:")
+    storage.apply_schema(con, root / "shards")
+    return con, storage.load_upsert_sqls()
+
+def _clean(con, sql, df, run_id, fresh_since=None):
+    clean_and_persist_clientes_from_raw(con, sql["clean_clientes"], df=df, run_id=run_id, fresh_since=fresh_since)
+
+def _ops(con, run_id):
+    return [r[3] for r in cdc.read(con) if r[1] == run_id]
+
+def test_skip_solo_de_lo_ingerido_en_el_run(root):
+    con, sql = _con(root)
+    _clean(con, sql, _batch("t2", "Ana"), "r1")
+    # Versión más antigua que llega ahora: pierde y queda como skip
+    _clean(con, sql, _batch("t1", "Eva"), "r2", fresh_since="t1")
+    # Relimpiar lo ya limpio (--full): ni cambios ni skips
+    _clean(con, sql, pd.concat([_batch("t1", "Eva"), _batch("t2", "Ana")]), "r3", fresh_since="t3")
+    assert (_ops(con, "r1"), _ops(con, "r2"), _ops(con, "r3")) == (["insert"], ["skip"], [])
+
+def test_feed_apagado_no_anota_nada(root):
+    con, sql = _con(root)
+    cdc.set_enabled(con, False)
+    _clean(con, sql, _batch("t1", "Ana"), "r1")
+    _clean(con, sql, _batch("t0", "Eva"), "r2")
+    assert cdc.last_seq(con) == 0 and con.execute("SELECT nombre FROM clean_clientes").fetchall() == [("Ana",)]
+    cdc.set_enabled(con, True)
+    _clean(con, sql, _batch("t2", "Eva"), "r3")
+    assert _ops(con, "r3") == ["update"]
@@ -0,0 +1,25 @@
+import pandas as pd
+from ut1 import coerce
+
+def _plain(values):
+    """Referencia: cada valor parseado solo, sin lote."""
+    out = []
+    for v in values:
+        d = pd.to_datetime(v, errors="coerce", utc=True) if v is not None else pd.NaT
+        out.append(None if pd.isna(d) else d.date())
+    return out
+
+def _memo(values):
+    return [None if pd.isna(d) else d for d in coerce.to_date(pd.Series(values, dtype=object))]
+
+def test_to_date_no_depende_del_lote_anterior():
+    batches = [["2025-01-12", "01/02/2025"], ["01/02/2025", "03/04/2025"], ["03/04/2025", "2025-01-09T10:15:00Z", "2025/01/08", "x", None]]
+    for order in (batches, batches[::-1], [batches[1], batches[0], batches[2]]):
+        coerce.clear_caches()
+        for b in order:
+            assert _memo(b) == _plain(b)
+
+def test_is_date_coincide_con_to_date():
+    coerce.clear_caches()
+    values = ["2025-01-12", "01/02/2025", "2025-13-01", "", None, "12/31/2025"]
+    assert coerce.is_date(pd.Series(values, dtype=object)).tolist() == [v is not None for v in _memo(values)]
@@ -0,0 +1,37 @@
+import gzip
+import sqlite3
+from ut1 import quality, storage
+from ut1.ingest import ingest_file
+
+HEADER = "fecha_entrada,nombre_producto,id_producto,unidades,precio_unitario,categoria\n"
+ROWS = ["2025-01-04,Lápiz,P1,5,1.00,papel\n", "2025-01-04,Goma,P2,3,0.50,papel\n", "2025-01-05,Regla,P3,2,2.00,papel\n"]
+
+def test_perfil_por_drop_y_huella(root):
+    con = sqlite3.connect(":memory:")
+    storage.apply_schema(con, root / "shards")
+    plain = root / "productos.csv"
+    plain.write_text(HEADER + "".join(ROWS) + "P4,mal\n", encoding="utf-8")
+    packed = root / "productos.csv.gz"
+    with gzip.open(packed, "wt", encoding="utf-8") as fh:
+        fh.write(HEADER + "2025-01-06,Tijeras,P5,1,4.00,papel\n")
+    ingest_file(con, plain, "productos", "fp1", "r1")
+    ingest_file(con, packed, "productos", "fpgz", "r1")
+    # Mismo contenido con otra huella: todo repetido, no deja filas y no pisa ni añade perfil
+    ingest_file(con, plain, "productos", "fp2", "r2")
+    quality.set_failures(con, "productos.csv", "validation_failed", 0, checked=0, fingerprint="fp2")
+    profiles = {p.label: p for p in quality.load(con)}
+    assert sorted(profiles) == ["productos.csv.gz@fpgz", "productos.csv@fp1"]
+    assert profiles["productos.csv@fp1"].rows == 3
+    assert profiles["productos.csv.gz@fpgz"].rows == 1
+    # Una línea mal formada de 4 vistas; clean invalida 1 de 3 filas → 1/4 + (1/3)·3/4
+    quality.set_failures(con, "productos.csv", "validation_failed", 1, checked=3, fingerprint="fp1")
+    m = quality.load(con, batch_ids=["productos.csv"])[0].metrics()
+    assert m["rows"] == 3 and m["fail_rate"] == 0.5
+
+def test_fail_rate_acotado_con_validacion_de_todo_el_fichero():
+    p = quality.BatchProfile("productos", "productos", "productos.csv", "fp")
+    p.set_failures(quality.REPEATED, 10)
+    p.set_failures("validation_failed", 4, checked=4)
+    assert p.metrics()["fail_rate"] == 1.0
+    p.set_failures("validation_failed", 4, checked=40)
+    assert p.metrics()["fail_rate"] == 0.1
@@ -0,0 +1,46 @@
+import sqlite3
+from ut1 import paths, replay, storage
+from ut1.clean import clean_all
+from ut1.ingest import ingest_file
+
+def _ingest(root, text):
+    con = sqlite3.connect(":memory:")
+    storage.apply_schema(con, root / "shards")
+    paths.DATA.mkdir(parents=True)
+    f = paths.DATA / "clientes.csv"
+    f.write_text(text, encoding="utf-8")
+    ingest_file(con, f, "clientes", "fp", "r1")
+    return con
+
+def test_replay_usa_la_cabecera_del_drop(root):
+    # Columnas en otro orden que RAW_COLS y una línea a la que le falta el apellido
+    con = _ingest(root, "id_cliente,fecha,nombre,apellido\nC001,2025-01-02,Luis,Mora\n C009 ,2025-01-03, Ana\n")
+    con.execute("UPDATE quarantine_clientes SET _row = _row || ', Gil ' WHERE _row LIKE '%C009%'")
+    res = replay.replay(con, "clientes")
+    assert (res["recovered"], res["malformed"]) == (1, 0)
+    assert con.execute("SELECT fecha, nombre, apellido FROM clean_clientes WHERE id_cliente = 'C009'").fetchall() == [("2025-01-03", "Ana", "Gil")]
+    # Mismo recorte que ingest en bronce, y su huella registrada como las de ingest
+    assert con.execute("SELECT id_cliente, nombre, apellido FROM raw_clientes WHERE id_cliente LIKE '%C009%'").fetchall() == [("C009", "Ana", "Gil")]
+    assert con.execute("SELECT COUNT(*) FROM raw_fingerprints WHERE kind = 'clientes'").fetchone()[0] == 2
+    assert con.execute("SELECT COUNT(*) FROM quarantine_clientes").fetchone()[0] == 0
+
+def test_replay_sin_cabecera_guardada_relee_el_drop(root):
+    con = _ingest(root, "nombre,apellido,id_cliente,fecha\nLuis,Mora,C001,2025-01-02\nAna,C009,2025-01-03\n")
+    con.execute("UPDATE quarantine_clientes SET _header = NULL, _row = 'Ana,Gil,C009,2025-01-03'")
+    df, bad = replay.parse_rows(replay.select(con, "clientes"), "clientes")
+    assert bad.empty
+    assert df[["fecha", "nombre", "apellido", "id_cliente"]].values.tolist() == [["2025-01-03", "Ana", "Gil", "C009"]]
+
+def test_replay_conserva_las_que_siguen_mal(root):
+    con = sqlite3.connect(":memory:")
+    storage.apply_schema(con, root / "shards")
+    paths.DATA.mkdir(parents=True)
+    f = paths.DATA / "ventas.csv"
+    f.write_text("fecha,id_cliente,id_producto,unidades,precio_unitario\n2025-07-08,C002,P002,-1,100\n2025-07-09,C003,P003,2,5\n", encoding="utf-8")
+    ingest_file(con, f, "ventas", "fp", "r1")
+    clean_all(con)
+    for _ in range(2):
+        res = replay.replay(con, "ventas")
+        assert (res["selected"], res["recovered"], res["requarantined"]) == (1, 0, 1)
+        rows = con.execute("SELECT _reason, _row FROM quarantine_ventas").fetchall()
+        assert len(rows) == 1 and rows[0][0].startswith("validation_failed") and rows[0][1].startswith("2025-07-08,C002,P002,-1")
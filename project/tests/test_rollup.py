@@ -0,0 +1,14 @@
+import sqlite3
+import pytest
+from ut1 import rollup, storage
+
+@pytest.mark.parametrize("desde, hasta", [("2025-07-31", "2025-07-01"), ("2025-07-xx", "2025-07-31"), ("01/07/2025", "2025-07-31")])
+def test_rango_invalido_se_rechaza(tmp_path, desde, hasta):
+    con = sqlite3.connect(":memory:")
+    storage.apply_schema(con, tmp_path)
+    for fn in (rollup.range_kpis, rollup.productos_en_rango, rollup.top_productos):
+        with pytest.raises(ValueError):
+            fn(con, desde, hasta)
+
+def test_rango_de_un_dia_es_valido():
+    assert rollup.check_range("2025-07-01", "2025-07-01") == ("2025-07-01", "2025-07-01")
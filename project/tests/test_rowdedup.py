@@ -0,0 +1,60 @@
+import sqlite3
+import pandas as pd
+from ut1 import paths, rowdedup, storage
+from ut1.clean import clean_all
+from ut1.ingest import ingest_file
+
+COLS = ["fecha", "nombre", "apellido", "id_cliente"]
+
+def _batch(src, ids):
+    df = pd.DataFrame({"fecha": "2025-01-01", "nombre": "Ana", "apellido": "Gil", "id_cliente": ids})
+    return df.assign(_source_file=src, _ingest_ts="2025-02-01T00:00:00")
+
+def _saved_n(con):
+    row = con.execute("SELECT n FROM raw_fingerprint_bloom WHERE kind = 'clientes'").fetchone()
+    return row[0] if row else None
+
+def test_filtro_en_memoria_se_guarda_una_vez(tmp_path):
+    con = sqlite3.connect(":memory:")
+    storage.apply_schema(con, tmp_path)
+    cache = rowdedup.BloomCache()
+    for i in range(3):
+        df, rep = rowdedup.filter_repeats(con, "clientes", _batch(f"c{i}.csv", [f"C{i}{j:02d}" for j in range(10)]), COLS, cache=cache)
+        assert (len(df), rep) == (10, 0)
+        con.commit()
+    # El filtro guardado es el vacío de la primera carga; la marca de desfase avisa
+    assert _saved_n(con) == 0
+    assert con.execute("SELECT kind FROM raw_fingerprint_bloom_stale").fetchall() == [("clientes",)]
+    cache.flush(con)
+    assert _saved_n(con) == 30
+    assert con.execute("SELECT COUNT(*) FROM raw_fingerprint_bloom_stale").fetchone()[0] == 0
+    _, rep = rowdedup.filter_repeats(con, "clientes", _batch("c9.csv", ["C000", "C105", "C999"]), COLS)
+    assert rep == 2
+
+def test_run_sin_flush_reconstruye_el_filtro(tmp_path):
+    con = sqlite3.connect(":memory:")
+    storage.apply_schema(con, tmp_path)
+    rowdedup.filter_repeats(con, "clientes", _batch("c0.csv", ["C001"]), COLS)  # filtro guardado con C001
+    con.commit()
+    cache = rowdedup.BloomCache()
+    rowdedup.filter_repeats(con, "clientes", _batch("c1.csv", ["C002", "C003"]), COLS, cache=cache)
+    con.commit()  # el run muere aquí, sin flush: el filtro guardado no tiene C002/C003
+    df, rep = rowdedup.filter_repeats(con, "clientes", _batch("c2.csv", ["C002", "C003", "C004"]), COLS, cache=rowdedup.BloomCache())
+    assert rep == 2 and df["id_cliente"].tolist() == ["C004"]
+
+def test_vuelta_a_un_valor_anterior_no_es_un_reenvio(root):
+    con = sqlite3.connect(":memory:")
+    storage.apply_schema(con, root / "shards")
+    paths.DATA.mkdir(parents=True)
+    header = "fecha_entrada,nombre_producto,id_producto,unidades,precio_unitario,categoria\n"
+    for i, precio in enumerate((100, 120, 100, 100)):
+        f = paths.DATA / f"productos_{i}.csv"
+        f.write_text(header + f"2025-01-01,Boli,P001,10,{precio},escritura\n", encoding="utf-8")
+        ingest_file(con, f, "productos", f"fp{i}", "r1")
+    # A→B→A: la vuelta a 100 se guarda; el cuarto drop sí es igual a lo vigente
+    assert [r[0] for r in con.execute("SELECT precio_unitario FROM raw_productos ORDER BY rowid")] == ["100", "120", "100"]
+    clean_all(con)
+    assert con.execute("SELECT precio_unitario FROM clean_productos WHERE id_producto = 'P001'").fetchone()[0] == 100
+    # Reingerir un fichero ya visto (--full) es un reenvío exacto aunque lo vigente sea otra cosa
+    ingest_file(con, paths.DATA / "productos_1.csv", "productos", "fp1b", "r2")
+    assert con.execute("SELECT COUNT(*) FROM raw_productos").fetchone()[0] == 3
@@ -0,0 +1,52 @@
+import sqlite3
+import pandas as pd
+from ut1 import scd, storage
+from ut1.clean import clean_and_persist_clientes_from_raw, clean_and_persist_productos_from_raw
+
+def _batch(ts, rows):
+    cols = ["fecha_entrada", "nombre_producto", "id_producto", "unidades", "precio_unitario", "categoria"]
+    df = pd.DataFrame(rows, columns=cols, dtype=object)
+    return df.assign(_ingest_ts=ts, _source_file=f"productos_{ts}.csv", _batch_id=f"productos_{ts}")
+
+def _con(tmp_path):
+    con = sqlite3.connect(":memory:")
+    storage.apply_schema(con, tmp_path)
+    return con, storage.load_upsert_sqls()
+
+def test_correccion_en_la_misma_fecha_abre_version(tmp_path):
+    con, sql = _con(tmp_path)
+    batches = [
+        _batch("2025-02-01T10:00:00", [["2025-01-04", "Lápiz", "P1", "5", "1.00", "papel"], ["2025-01-02", "Goma", "P2", "3", "0.50", "papel"]]),
+        _batch("2025-02-02T10:00:00", [["2025-01-04", "Lápiz", "P1", "5", "1.20", "escritura"]]),
+        _batch("2025-02-03T10:00:00", [["2025-01-04", "Lápiz", "P1", "5", "1.20", "escritura"], ["2025-01-06", "Goma", "P2", "3", "0.60", "papel"]]),
+    ]
+    for b in batches:
+        clean_and_persist_productos_from_raw(con, sql["clean_productos"], None, sql["hist_productos"], df=b, run_id="t")
+    hist = pd.read_sql_query("SELECT id_producto, valid_from, valid_to, precio_unitario FROM hist_productos ORDER BY id_producto, valid_from, _ingest_ts", con)
+    # P1: la corrección del mismo día es otra versión y la original queda cerrada en su propia fecha;
+    # el reenvío idéntico del tercer batch no abre ninguna
+    assert hist.values.tolist() == [
+        ["P1", "2025-01-04", "2025-01-04", 1.00],
+        ["P1", "2025-01-04", "9999-12-31", 1.20],
+        ["P2", "2025-01-02", "2025-01-06", 0.50],
+        ["P2", "2025-01-06", "9999-12-31", 0.60],
+    ]
+    ventas = pd.DataFrame({
+        "id_producto": ["P1", "P1", "P1", "P2", "P2", "P3"],
+        "fecha": ["2025-01-03", "2025-01-04", "2025-01-10", "2025-01-05", "2025-01-06", "2025-01-06"],
+    })
+    out = scd.asof_join(con, ventas)
+    assert out["precio_unitario_vigente"].tolist()[1:5] == [1.20, 1.20, 0.50, 0.60]
+    assert out["precio_unitario_vigente"].isna().tolist() == [True, False, False, False, False, True]
+    assert out["categoria_vigente"][1] == "escritura"
+
+def test_valid_from_en_iso_aunque_la_fecha_llegue_en_otro_formato(tmp_path):
+    con, sql = _con(tmp_path)
+    cols = ["fecha", "nombre", "apellido", "id_cliente"]
+    for ts, rows in [("2025-02-01T10:00:00", [["01/02/2025", "Ana", "Gil", "C001"]]), ("2025-02-02T10:00:00", [["2025-01-03", "Eva", "Gil", "C001"]])]:
+        b = pd.DataFrame(rows, columns=cols, dtype=object).assign(_ingest_ts=ts, _source_file="clientes.csv", _batch_id="clientes")
+        clean_and_persist_clientes_from_raw(con, sql["clean_clientes"], None, sql["hist_clientes"], df=b, run_id="t")
+    hist = con.execute("SELECT valid_from, valid_to, nombre FROM hist_clientes ORDER BY valid_from").fetchall()
+    assert hist == [("2025-01-02", "2025-01-03", "Ana"), ("2025-01-03", "9999-12-31", "Eva")]
+    ventas = pd.DataFrame({"id_cliente": ["C001", "C001"], "fecha": ["2025-01-02", "2025-01-05"]})
+    assert scd.asof_join(con, ventas, "clientes")["nombre_vigente"].tolist() == ["Ana", "Eva"]
@@ -0,0 +1,50 @@
+import gzip
+import json
+import sqlite3
+from ut1 import journal, storage
+from ut1.ingest import ingest_file
+from ut1.staged import ingest_staged
+
+HEADER = "fecha,nombre,apellido,id_cliente"
+
+def _drop(root):
+    lines = [HEADER]
+    for i in range(300):
+        lines.append(f"2025-01-{i % 250 % 28 + 1:02d},Ana{i % 250},Gil,C{i % 250:03d}")  # repetidas entre trozos
+        if i % 40 == 0:
+            lines.append(f"2025-01-01,Mal,Formada,C{i:03d},extra")
+    f = root / "clientes_big.csv.gz"
+    with gzip.open(f, "wt") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return f
+
+def _state(con):
+    raw = con.execute("SELECT fecha, nombre, apellido, id_cliente, _source_file, _batch_id FROM raw_clientes ORDER BY rowid").fetchall()
+    quarantine = con.execute("SELECT _reason, _row, _header FROM quarantine_clientes ORDER BY rowid").fetchall()
+    fps = con.execute("SELECT fp FROM raw_fingerprints ORDER BY fp").fetchall()
+    rows, profile = con.execute("SELECT rows, profile FROM quality_profile").fetchone()
+    failures = json.loads(profile)["failures"]
+    ts = con.execute("SELECT COUNT(DISTINCT _ingest_ts) FROM raw_clientes").fetchone()[0]
+    return raw, quarantine, fps, rows, failures, ts
+
+def test_trozos_dan_lo_mismo_que_el_drop_entero(root):
+    f = _drop(root)
+    fp = journal.fingerprint(f)
+    out = {}
+    for label in ("entero", "trozos"):
+        con = sqlite3.connect(root / f"{label}.db")
+        storage.apply_schema(con, root / label)
+        if label == "entero":
+            ingest_file(con, f, "clientes", fp, "r")
+        else:
+            counters, stats = ingest_staged(con, [(f, "clientes", fp)], "r", chunk_bytes=1024)
+            assert counters["clientes"] == 250
+            assert stats["lectura"].items > 5  # nunca el drop entero en una cola
+        out[label] = _state(con)
+        assert con.execute("SELECT state FROM run_journal").fetchall() == [("ingested",)]
+        con.close()
+    assert out["trozos"] == out["entero"]
+    raw, quarantine, _, rows, failures, ts = out["trozos"]
+    assert len(raw) == rows == 250 and ts == 1
+    assert len(quarantine) == 8 and {q[2] for q in quarantine} == {HEADER}
+    assert failures["parse_error_bad_field_count"] == 8 and failures["repeated_row"] == 50
@@ -0,0 +1,104 @@
+import shutil
+import sqlite3
+import threading
+import time
+import pytest
+from ut1 import clean, ingest, paths, workers
+
+LEASE_S = 0.5
+TABLES = [
+    "raw_ventas", "raw_clientes", "raw_productos", "fact_ventas", "clean_clientes", "clean_productos",
+    "hist_clientes", "hist_productos", "quarantine_ventas", "quarantine_clientes", "quarantine_productos",
+    "raw_fingerprints", "quality_profile",
+]
+
+def _root(tmp_path, name):
+    root = tmp_path / name
+    shutil.copytree(paths.ROOT / "data" / "drops", root / "data" / "drops")
+    return root
+
+def _run(root, owner, **kw):
+    return workers.run_worker(root / "ut1.db", root / "data" / "drops", root / "shards", owner=owner, lease_s=LEASE_S, **kw)
+
+def _counts(root):
+    con = sqlite3.connect(root / "ut1.db")
+    try:
+        return {t: con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in TABLES}
+    finally:
+        con.close()
+
+class Died(BaseException):
+    """El proceso del worker muere: no hay release ni rollback ordenado."""
+
+@pytest.fixture
+def reference(root):
+    ref = _root(root, "ref")
+    assert _run(ref, "R")["done"] == 3
+    return _counts(ref)
+
+def _stall_first(monkeypatch, name, step):
+    """En el hilo `step.thread`, la primera llamada a ut1.<name> espera a `step.go` (como un proceso parado)."""
+    module = ingest if name == "ingest_file" else clean
+    real = getattr(module, name)
+
+    def stalled(*args, **kw):
+        if threading.current_thread() is step.thread and not step.stalled.is_set():
+            step.stalled.set()
+            step.go.wait(30)
+            if step.die:
+                raise Died()
+        return real(*args, **kw)
+
+    monkeypatch.setattr(module, name, stalled)
+    # Parado del todo: tampoco renueva el lease
+    real_hb = workers.heartbeat
+    monkeypatch.setattr(workers, "heartbeat", lambda con, src, owner, lease_s=workers.LEASE_S: owner == "A" or real_hb(con, src, owner, lease_s))
+
+class Step:
+    def __init__(self, die=False):
+        self.stalled, self.go, self.die = threading.Event(), threading.Event(), die
+        self.thread, self.stats = None, None
+
+def _worker_a(root, step):
+    def target():
+        try:
+            step.stats = _run(root, "A", max_files=1)
+        except Died:
+            step.stats = "muerto"
+    step.thread = threading.Thread(target=target)
+    return step.thread
+
+@pytest.mark.parametrize("name", ["ingest_file", "clean_batch"])
+def test_worker_parado_no_confirma_tras_perder_el_lease(root, reference, monkeypatch, name):
+    shared = _root(root, "shared")
+    step = Step()
+    a = _worker_a(shared, step)
+    _stall_first(monkeypatch, name, step)
+    a.start()
+    assert step.stalled.wait(30)
+    time.sleep(LEASE_S * 1.5)  # caduca el lease de A; B reclama su drop y purga lo que A dejó confirmado
+    b = _run(shared, "B")
+    assert b["done"] == 3 and b["lost"] == 0
+    step.go.set()
+    a.join(30)
+    assert step.stats["lost"] == 1 and step.stats["done"] == 0
+    assert _counts(shared) == reference
+    con = sqlite3.connect(shared / "ut1.db")
+    # Nada de A en el diario: todos los drops los cerró B en su run
+    assert con.execute("SELECT COUNT(DISTINCT run_id), COUNT(*) FROM run_journal WHERE state = 'cleaned'").fetchone() == (1, 3)
+    assert con.execute("SELECT COUNT(*) FROM work_queue WHERE state = 'done' AND owner = 'B'").fetchone()[0] == 3
+    con.close()
+
+def test_worker_caido_tras_ingest_se_reintenta_una_vez(root, reference, monkeypatch):
+    shared = _root(root, "shared")
+    step = Step(die=True)
+    a = _worker_a(shared, step)
+    _stall_first(monkeypatch, "clean_batch", step)
+    a.start()
+    assert step.stalled.wait(30)
+    step.go.set()  # A muere con el ingest de su drop ya confirmado
+    a.join(30)
+    assert step.stats == "muerto"
+    time.sleep(LEASE_S * 1.5)
+    assert _run(shared, "B")["done"] == 3
+    assert _counts(shared) == reference
@@ -1,7 +1,10 @@
 from pathlib import Path
+from site_sync import write_if_changed
+
+# Solo reescribe el destino si el contenido cambió (escritura atómica): no dispara rebuilds de Quartz
 src = Path(__file__).resolve().parents[1] / "output" / "reporte.md"
 dst = Path(__file__).resolve().parents[2] / "site" / "content" / "reportes" / "reporte-UT1.md"
-dst.parent.mkdir(parents=True, exist_ok=True)
-dst.write_text(src.read_text(encoding="utf-8"), encoding="utf-8")
-print("Copiado:", dst)
-
+if write_if_changed(dst, src.read_bytes()):
+    print("Copiado:", dst)
+else:
+    print("Sin cambios:", dst)
@@ -0,0 +1,68 @@
+"""
+site_sync.py — Utilidades compartidas por las herramientas que publican en /site.
+
+- Manifiesto de contenido (site/.sync-manifest.json): tamaño, mtime y sha256 de cada
+  fichero publicado, para copiar solo lo que cambió y borrar lo que ya no existe.
+- Escrituras atómicas (temporal + os.replace): Quartz nunca ve un fichero a medias y
+  un fichero sin cambios no se reescribe (su mtime no cambia y no dispara rebuild).
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+MANIFEST = ROOT / "site" / ".sync-manifest.json"
+
+def sha256_file(p: Path) -> str:
+    h = hashlib.sha256()
+    with open(p, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _atomic(dst: Path, fill) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{dst.name}.", suffix=".tmp", dir=dst.parent)
+    os.close(fd)
+    try:
+        fill(Path(tmp))
+        os.replace(tmp, dst)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+def atomic_copy(src: Path, dst: Path) -> None:
+    _atomic(dst, lambda tmp: shutil.copy2(src, tmp))
+
+def atomic_write_bytes(dst: Path, data: bytes) -> None:
+    _atomic(dst, lambda tmp: tmp.write_bytes(data))
+
+def write_if_changed(dst: Path, data: bytes) -> bool:
+    """Escribe `data` en `dst` solo si el contenido es distinto. Devuelve True si escribió."""
+    try:
+        if dst.stat().st_size == len(data) and dst.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    atomic_write_bytes(dst, data)
+    return True
+
+class Manifest:
+    """Secciones {ruta destino relativa → {size, mtime_ns, sha256, ...}} persistidas en JSON."""
+
+    def __init__(self, path: Path = MANIFEST):
+        self.path = path
+        try:
+            self.data = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.data = {}
+
+    def section(self, name: str) -> dict[str, dict]:
+        return self.data.setdefault(name, {})
+
+    def save(self) -> None:
+        atomic_write_bytes(self.path, json.dumps(self.data, indent=1, sort_keys=True).encode("utf-8"))
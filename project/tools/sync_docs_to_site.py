@@ -5,19 +5,24 @@
 sync_docs_to_site.py — Copia /docs → /site/content/docs para publicarlos en Quartz.
 
 Uso:
-  python project/tools/sync_docs_to_site.py            # copia todo
+  python project/tools/sync_docs_to_site.py            # copia lo que cambió y borra lo obsoleto
   python project/tools/sync_docs_to_site.py --dry-run  # simula
-  python project/tools/sync_docs_to_site.py --clean    # borra destino antes de copiar
+  python project/tools/sync_docs_to_site.py --clean    # además borra del destino lo que no venga de /docs
   python project/tools/sync_docs_to_site.py --only 10-diseno-ingesta.md 20-limpieza-calidad.md
 
 Notas:
 - No modifica tus ficheros; solo copia.
+- Incremental: el manifiesto (site/.sync-manifest.json) guarda tamaño, mtime y sha256 de
+  cada fichero; solo se copian los que cambiaron (en paralelo y de forma atómica) y se
+  borran del destino los que ya no existen en /docs. Publicar cuesta O(cambios).
 - Si un .md no tiene frontmatter, te avisará (Quartz funciona igual, pero es recomendable).
 """
 from __future__ import annotations
 import argparse
-import shutil
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from site_sync import Manifest, atomic_copy, sha256_file
 
 ROOT = Path(__file__).resolve().parents[2]
 SRC = ROOT / "project" / "docs"
@@ -28,7 +33,8 @@ IGNORE_FILES = {".DS_Store", "Thumbs.db"}
 
 def has_frontmatter(md_path: Path) -> bool:
     try:
-        head = md_path.read_text(encoding="utf-8").lstrip()
+        with open(md_path, encoding="utf-8") as fh:
+            head = fh.read(4096).lstrip()
     except Exception:
         return False
     return head.startswith("---\n") or head.startswith("---\r\n")
@@ -48,17 +54,35 @@ def list_sources(only: list[str] | None) -> list[Path]:
         return paths
     return sorted([p for p in SRC.rglob("*") if p.is_file() and p.name not in IGNORE_FILES and p.suffix.lower() not in IGNORE_EXT])
 
-def copy_file(src: Path, dst: Path, dry: bool):
-    dst.parent.mkdir(parents=True, exist_ok=True)
+def rel_of(src: Path) -> str:
+    return src.relative_to(SRC).as_posix()
+
+def sync_file(src: Path, entry: dict | None, dry: bool) -> tuple[str, dict | None]:
+    """Copia `src` si cambió respecto al manifiesto. Devuelve (acción, nueva entrada)."""
+    dst = DST / rel_of(src)
+    st = src.stat()
+    dst_ok = entry is not None and dst.exists() and dst.stat().st_size == entry["size"]
+    if dst_ok and entry["mtime_ns"] == st.st_mtime_ns:
+        return "sin cambios", entry
+    new = {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": sha256_file(src),
+        "frontmatter": has_frontmatter(src) if src.suffix.lower() == ".md" else True,
+    }
+    if dst_ok and entry["sha256"] == new["sha256"]:
+        return "sin cambios", new  # solo cambió el mtime del origen
     if dry:
-        print(f"[DRY] Copiar {src.relative_to(SRC)} -> {dst.relative_to(DST)}")
-        return
-    shutil.copy2(src, dst)
+        print(f"[DRY] Copiar {rel_of(src)} -> {dst.relative_to(DST)}")
+        return "copiado", entry
+    atomic_copy(src, dst)
+    return "copiado", new
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--dry-run", action="store_true", help="Simula la copia sin escribir")
-    ap.add_argument("--clean", action="store_true", help="Borra el destino antes de copiar")
+    ap.add_argument("--clean", action="store_true", help="Borra del destino lo que no venga de /docs")
+    ap.add_argument("--jobs", type=int, default=8, help="Hilos para comparar/copiar")
     ap.add_argument("--only", nargs="*", help="Lista de archivos dentro de /docs a copiar")
     args = ap.parse_args()
 
@@ -67,26 +91,41 @@ def main():
         return 1
 
     ensure_dst()
-
-    if args.clean and not args.dry_run:
-        print(f"[INFO] Limpiando destino: {DST}")
-        shutil.rmtree(DST, ignore_errors=True)
-        ensure_dst()
+    manifest = Manifest()
+    tracked = manifest.section("docs")
 
     sources = list_sources(args.only)
-    if not sources:
+    if not sources and args.only:
         print("[INFO] No hay archivos que copiar.")
         return 0
 
-    missing_front = []
-    for s in sources:
-        rel = s.relative_to(SRC)
-        d = DST / rel
-        if s.suffix.lower() == ".md" and not has_frontmatter(s):
-            missing_front.append(str(rel))
-        copy_file(s, d, args.dry_run)
-
-    print(f"[OK] {'Simulación completada' if args.dry_run else 'Copia completada'}: {len(sources)} archivo(s).")
+    with ThreadPoolExecutor(max_workers=args.jobs) as ex:
+        results = list(ex.map(lambda s: sync_file(s, tracked.get(rel_of(s)), args.dry_run), sources))
+    counts = Counter()
+    for s, (action, entry) in zip(sources, results):
+        counts[action] += 1
+        if entry is not None:
+            tracked[rel_of(s)] = entry
+
+    # Obsoletos: lo publicado antes que ya no está en /docs (con --clean, todo lo que no venga de /docs)
+    if not args.only:
+        current = {rel_of(s) for s in sources}
+        stale = {r for r in tracked if r not in current}
+        if args.clean:
+            stale |= {p.relative_to(DST).as_posix() for p in DST.rglob("*") if p.is_file()} - current
+        for r in sorted(stale):
+            if args.dry_run:
+                print(f"[DRY] Borrar {r}")
+                continue
+            (DST / r).unlink(missing_ok=True)
+            tracked.pop(r, None)
+            counts["borrado"] += 1
+
+    if not args.dry_run:
+        manifest.save()
+    print(f"[OK] {'Simulación completada' if args.dry_run else 'Sincronización completada'}: "
+          f"{len(sources)} archivo(s) · " + " · ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+    missing_front = [rel_of(s) for s in sources if tracked.get(rel_of(s), {}).get("frontmatter") is False]
     if missing_front:
         print("\n[AVISO] Algunos .md no tienen frontmatter YAML (recomendado en Quartz):")
         for f in missing_front:
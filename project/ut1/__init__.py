@@ -0,0 +1,6 @@
+"""
+ut1 — Pipeline UT1 (bronce → plata → oro → reporte) como paquete importable.
+
+Importar el paquete no hace trabajo: no crea directorios ni carga pandas.
+Cada subcomando de la CLI (`python -m ut1 --help`) importa solo lo que usa.
+"""
@@ -0,0 +1,3 @@
+from ut1.cli import main
+
+raise SystemExit(main())
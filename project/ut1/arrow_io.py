@@ -0,0 +1,82 @@
+"""
+Exportación Arrow IPC (Feather v2) de clean_* y de las tablas oro, y lectura con mmap.
+
+Sin compresión, read_table() mapea el fichero y las columnas apuntan directamente a
+esas páginas: no hay decodificación y varios procesos del mismo host comparten la
+caché de páginas del sistema. Con LZ4 ocupa menos en disco pero hay que descomprimir
+al leer. Las escrituras son atómicas (temporal + os.replace), así que un lector que ya
+tiene el fichero mapeado sigue viendo la versión anterior hasta que lo vuelve a abrir.
+"""
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from ut1 import paths
+from ut1.shards import read_clean_ventas
+
+COMPRESSIONS = ("uncompressed", "lz4")
+
+# nombre de fichero → (tabla/vista de ut1.db, columnas); clean_* como PARQUET_EXPORTS.
+# El cubo oro se exporta con claves naturales (vistas vw_gold_*)
+EXPORTS = {
+    "clean_ventas": ("clean_ventas", ["fecha", "id_cliente", "id_producto", "unidades", "precio_unitario", "_ingest_ts"]),
+    "clean_clientes": ("clean_clientes", ["id_cliente", "nombre", "apellido", "fecha"]),
+    "clean_productos": ("clean_productos", ["id_producto", "nombre_producto", "categoria", "precio_unitario", "unidades", "fecha_entrada"]),
+    "gold_ventas_dia": ("vw_gold_ventas_dia", ["fecha", "unidades", "importe", "lineas", "cum_unidades", "cum_importe", "cum_lineas"]),
+    "gold_ventas_dia_producto": (
+        "vw_gold_ventas_dia_producto",
+        ["fecha", "id_producto", "categoria", "unidades", "importe", "lineas", "cum_unidades", "cum_importe", "cum_lineas"],
+    ),
+}
+
+def arrow_path(name: str, arrow_dir: Path | None = None) -> Path:
+    return (arrow_dir or paths.ARROW_DIR) / f"{name}.arrow"
+
+def write_ipc(df: pd.DataFrame, path: Path, compression: str = "uncompressed"):
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compresión no soportada: {compression} (usa {COMPRESSIONS})")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    os.close(fd)
+    try:
+        feather.write_feather(table, tmp, compression=compression)
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0o666 & ~umask)  # mkstemp crea 0600: otros usuarios del host también lo leen
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+def export_all(
+    con: sqlite3.Connection,
+    shard_dir: Path | None = None,
+    compression: str = "uncompressed",
+    arrow_dir: Path | None = None,
+) -> dict[str, int]:
+    """Escribe un .arrow por tabla de EXPORTS. Devuelve filas por fichero."""
+    arrow_dir = arrow_dir or paths.ARROW_DIR
+    out = {}
+    for name, (source, cols) in EXPORTS.items():
+        if name == "clean_ventas" and shard_dir is not None:
+            df = read_clean_ventas(con, shard_dir)[cols]
+        else:
+            df = pd.read_sql_query(f"SELECT {', '.join(cols)} FROM {source}", con)
+        write_ipc(df, arrow_path(name, arrow_dir), compression)
+        out[name] = len(df)
+    print(f"Arrow IPC ({compression}) en {arrow_dir}:", out)
+    return out
+
+def read_table(path: Path, columns: list[str] | None = None) -> pa.Table:
+    """Abre el fichero con mmap; sin compresión, los buffers no se copian."""
+    with pa.memory_map(str(path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+def read_pandas(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """DataFrame sobre el mmap: las columnas numéricas sin nulos no se copian (split_blocks)."""
+    return read_table(path, columns).to_pandas(split_blocks=True, self_destruct=False)
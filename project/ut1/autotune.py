@@ -0,0 +1,195 @@
+"""
+Autoajuste de tamaños de trozo y número de workers (`--autotune`).
+
+Cada parámetro (KNOBS) tiene una escalera de valores. El Tuner mide filas/s y RSS
+(proceso + hijos) en las primeras unidades de trabajo de un run, es decir, los
+primeros trozos o drops, y se mueve por la escalera:
+- prueba el vecino de abajo del mejor valor y luego el de arriba, si su RSS previsto
+  (el del mejor, proporcional al valor) cabe en el límite;
+- se queda en el mejor cuando los dos vecinos ya están medidos y rinden menos.
+De los valores a menos de TOLERANCE del mejor, gana el más pequeño: menos memoria y
+CPU por el mismo rendimiento (y el ruido de la medida no lo hace subir sin motivo).
+
+Los límites son --max-mem (MiB) y --max-cpus. Un valor que superó la memoria no se
+vuelve a probar, ni ninguno mayor. Los valores de workers no pasan de max-cpus.
+
+Lo medido se guarda por host en la tabla autotune de ut1.db, y el siguiente run
+arranca del mejor valor conocido en vez de explorar desde cero. Los parámetros `live`
+cambian dentro del run tras cada muestra. Los demás (p. ej. clean.jobs, que fija el
+tamaño del pool) se eligen al empezar y aprenden de un run al siguiente.
+"""
+import multiprocessing
+import os
+import socket
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+TOLERANCE = 0.10  # rendimiento "igual" al mejor (el ruido de muestras de pocos segundos ronda ese orden)
+MIN_SAMPLES = 2  # muestras antes de dar un valor por medido
+DECAY = 0.5  # peso de lo acumulado frente a cada muestra nueva (sigue cambios del host)
+
+@dataclass(frozen=True)
+class Knob:
+    ladder: tuple[int, ...]
+    default: int
+    cpu_bound: bool = False  # valores por encima de --max-cpus no se prueban
+    live: bool = True  # se ajusta dentro del run (si no, de un run al siguiente)
+    min_rows: int = 0  # filas mínimas por muestra (se acumulan unidades pequeñas)
+
+KNOBS = {
+    # parseos de trozos en vuelo en la ingesta en etapas (ut1/staged.py)
+    "ingest.parse_workers": Knob((1, 2, 3, 4, 6, 8), 2, cpu_bound=True, min_rows=50_000),
+    # filas por lectura de raw_ventas en la limpieza en paralelo (ut1/parallel.py)
+    "clean.chunk_rows": Knob((25_000, 50_000, 100_000, 200_000, 400_000, 800_000), 200_000),
+    # procesos de la limpieza en paralelo (pool de clean_all; 1 = secuencial)
+    "clean.jobs": Knob((1, 2, 3, 4, 6, 8), 2, cpu_bound=True, live=False, min_rows=100_000),
+}
+
+@dataclass
+class Limits:
+    mem_mib: float
+    cpus: int
+
+def default_limits(mem_mib: float | None = None, cpus: int | None = None) -> Limits:
+    """Por defecto, la mitad de la RAM del host y todas las CPUs disponibles para el proceso."""
+    if mem_mib is None:
+        try:
+            mem_mib = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 2**20 / 2
+        except (ValueError, OSError, AttributeError):
+            mem_mib = 4096.0
+    if cpus is None:
+        cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    return Limits(float(mem_mib), max(1, cpus))
+
+def host_id() -> str:
+    return socket.gethostname() or "local"
+
+def rss_mib() -> float:
+    """RSS actual del proceso y de sus hijos vivos (workers de los pools), desde /proc."""
+    pids = [os.getpid()] + [p.pid for p in multiprocessing.active_children()]
+    pages = 0
+    for pid in pids:
+        try:
+            pages += int(Path(f"/proc/{pid}/statm").read_text().split()[1])
+        except (OSError, IndexError, ValueError):
+            pass
+    if pages:
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    import resource  # sin /proc: el pico del proceso (KiB en Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+@dataclass
+class Stat:
+    rows: float = 0.0
+    secs: float = 0.0
+    rss_mib: float = 0.0  # máximo visto con este valor
+    samples: int = 0
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.secs if self.secs > 0 else 0.0
+
+class Tuner:
+    """Elige el valor de un parámetro a partir de las muestras (filas, segundos, RSS) de cada valor."""
+
+    def __init__(self, name: str, limits: Limits, stats: dict[int, Stat] | None = None):
+        self.name, self.knob, self.limits = name, KNOBS[name], limits
+        self.stats: dict[int, Stat] = stats or {}
+        self.allowed = [v for v in self.knob.ladder if not (self.knob.cpu_bound and v > limits.cpus)] or [self.knob.ladder[0]]
+        self.pending = Stat()
+        self.value = self.choose()
+
+    def observe(self, rows: int, secs: float, rss: float | None = None):
+        """Anota una unidad de trabajo hecha con self.value (y, si es live, elige el siguiente valor)."""
+        p = self.pending
+        p.rows += rows
+        p.secs += secs
+        p.rss_mib = max(p.rss_mib, rss if rss is not None else rss_mib())
+        if p.rows < max(1, self.knob.min_rows) or p.secs <= 0:
+            return
+        s = self.stats.setdefault(self.value, Stat())
+        s.rows = s.rows * DECAY + p.rows
+        s.secs = s.secs * DECAY + p.secs
+        s.rss_mib = max(s.rss_mib, p.rss_mib)
+        s.samples += 1
+        self.pending = Stat()
+        if self.knob.live:
+            self.value = self.choose()
+
+    def choose(self) -> int:
+        over = [v for v, s in self.stats.items() if s.rss_mib > self.limits.mem_mib]
+        allowed = [v for v in self.allowed if not over or v < min(over)] or [self.allowed[0]]
+        measured = {v: s for v, s in self.stats.items() if v in allowed and s.samples >= MIN_SAMPLES}
+        if not measured:
+            # el valor en curso hasta completar sus muestras; si no, el por defecto (o el mayor permitido por debajo)
+            current = getattr(self, "value", None)
+            if current in allowed and current in self.stats:
+                return current
+            return max([v for v in allowed if v <= self.knob.default], default=allowed[0])
+        best = _best(measured)
+        i = allowed.index(best)
+        for j in (i - 1, i + 1):
+            if 0 <= j < len(allowed) and allowed[j] not in measured:
+                if j > i and measured[best].rss_mib * allowed[j] / best > self.limits.mem_mib:
+                    continue
+                return allowed[j]
+        return best
+
+    def best(self) -> int | None:
+        measured = {v: s for v, s in self.stats.items() if s.samples >= MIN_SAMPLES and s.rss_mib <= self.limits.mem_mib}
+        return _best(measured) if measured else None
+
+def _best(measured: dict[int, Stat]) -> int:
+    """El valor más pequeño a menos de TOLERANCE del mejor rendimiento."""
+    top = max(s.rate for s in measured.values())
+    return min(v for v, s in measured.items() if s.rate >= top * (1 - TOLERANCE))
+
+class Session:
+    """Tuners de un run: se cargan de la tabla autotune (por host) y se guardan con save()."""
+
+    def __init__(self, con: sqlite3.Connection, limits: Limits | None = None, host: str | None = None):
+        self.limits = limits or default_limits()
+        self.host = host or host_id()
+        self.tuners: dict[str, Tuner] = {}
+        self._saved: dict[str, dict[int, Stat]] = {}
+        for knob, value, rows, secs, rss, samples in con.execute(
+            "SELECT knob, value, rows, secs, rss_mib, samples FROM autotune WHERE host = ?", (self.host,)
+        ):
+            self._saved.setdefault(knob, {})[value] = Stat(rows, secs, rss, samples)
+
+    def tuner(self, name: str) -> Tuner:
+        if name not in self.tuners:
+            self.tuners[name] = Tuner(name, self.limits, self._saved.get(name))
+        return self.tuners[name]
+
+    def save(self, con: sqlite3.Connection):
+        now = datetime.now(timezone.utc).isoformat()
+        con.executemany(
+            "INSERT OR REPLACE INTO autotune (host, knob, value, rows, secs, rss_mib, samples, updated_ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (self.host, name, v, s.rows, s.secs, s.rss_mib, s.samples, now)
+                for name, t in self.tuners.items() for v, s in t.stats.items()
+            ],
+        )
+        con.commit()
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={t.value}" for name, t in sorted(self.tuners.items()))
+
+def learned(con: sqlite3.Connection, host: str | None = None) -> list[tuple]:
+    """(host, knob, value, filas/s, RSS MiB, muestras, actualizado) de lo aprendido, por host y parámetro."""
+    where, params = ("WHERE host = ?", (host,)) if host else ("", ())
+    return con.execute(
+        f"SELECT host, knob, value, CASE WHEN secs > 0 THEN rows / secs END, rss_mib, samples, updated_ts "
+        f"FROM autotune {where} ORDER BY host, knob, value",
+        params,
+    ).fetchall()
+
+def reset(con: sqlite3.Connection, host: str | None = None) -> int:
+    where, params = ("WHERE host = ?", (host,)) if host else ("", ())
+    n = con.execute(f"DELETE FROM autotune {where}", params).rowcount
+    con.commit()
+    return n
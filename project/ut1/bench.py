@@ -0,0 +1,808 @@
+"""Microbenchmarks del pipeline (`python -m ut1 bench [nombre ...]`)."""
+import statistics
+import subprocess
+import sys
+import time
+from ut1 import paths
+
+def _median_ms(cmd: list[str], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, cwd=paths.ROOT, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+def bench_startup(repeat: int = 5):
+    """Arranque en frío de la CLI frente al coste de importar pandas."""
+    py = sys.executable
+    rows = [
+        ("python -c pass", [py, "-c", "pass"]),
+        ("python -m ut1 --help", [py, "-m", "ut1", "--help"]),
+        ("python -m ut1 status", [py, "-m", "ut1", "status"]),
+        ("python -c 'import pandas'", [py, "-c", "import pandas"]),
+    ]
+    for label, cmd in rows:
+        print(f"{label:<28} {_median_ms(cmd, repeat):8.1f} ms (mediana de {repeat})")
+
+def _best_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return min(times)
+
+def bench_coerce(repeat: int = 5, rows: int = 1_000_000):
+    """Coerción fila a fila frente a memoizada (ut1/coerce.py) con cardinalidades realistas."""
+    import numpy as np
+    import pandas as pd
+    from ut1 import coerce
+    from ut1.utils import to_float_money
+
+    rng = np.random.default_rng(0)
+    fechas = pd.date_range("2024-01-01", periods=400).strftime("%Y-%m-%d").to_numpy()
+    ids = np.array([f" c{i:04d} " for i in range(5000)])
+    nombres = np.array([f"Nombre{chr(65 + i % 26)}" + "ñ" * (i % 3) for i in range(2000)])
+    precios = np.array([f"{p // 100},{p % 100:02d}" for p in range(100, 40000, 130)])
+    df = pd.DataFrame({
+        "fecha": rng.choice(fechas, rows),
+        "id": rng.choice(ids, rows),
+        "nombre": rng.choice(nombres, rows),
+        "precio": rng.choice(precios, rows),
+    }).astype(object)
+
+    cases = [
+        ("to_date", lambda: pd.to_datetime(df["fecha"], errors="coerce").dt.date, lambda: coerce.to_date(df["fecha"])),
+        ("norm_id", lambda: df["id"].fillna("").str.upper().str.strip(), lambda: coerce.norm_id(df["id"])),
+        ("is_name", lambda: df["nombre"].fillna("").str.len().gt(0) & df["nombre"].fillna("").str.match(coerce.NAME_RE),
+         lambda: coerce.is_name(df["nombre"])),
+        ("to_money", lambda: df["precio"].apply(to_float_money), lambda: coerce.to_money(df["precio"])),
+    ]
+    print(f"{rows} filas · {len(fechas)} fechas · {len(ids)} ids · {len(nombres)} nombres · {len(precios)} precios")
+    print(f"{'transformación':<12} {'fila a fila':>12} {'memo (frío)':>12} {'memo (LRU)':>12} {'speedup':>8}")
+    for name, naive, memo in cases:
+        t_naive = _best_ms(naive, repeat)
+        coerce.clear_caches()
+        t0 = time.perf_counter()
+        memo()
+        t_cold = (time.perf_counter() - t0) * 1000
+        t_warm = _best_ms(memo, repeat)
+        print(f"{name:<12} {t_naive:10.1f}ms {t_cold:10.1f}ms {t_warm:10.1f}ms {t_naive / t_warm:7.1f}x")
+
+def bench_asof(repeat: int = 5, rows: int = 2_000_000, productos: int = 10_000, versiones: int = 5):
+    """Precio vigente por venta: AsOfIndex (ut1/scd.py) frente a pd.merge_asof."""
+    import numpy as np
+    import pandas as pd
+    from ut1.scd import MAX_DATE, AsOfIndex
+
+    rng = np.random.default_rng(0)
+    dias = pd.date_range("2023-01-01", periods=730).strftime("%Y-%m-%d").to_numpy()
+    ids = np.array([f"P{i:05d}" for i in range(productos)])
+    hist = pd.DataFrame({
+        "id_producto": np.repeat(ids, versiones),
+        "valid_from": np.sort(rng.choice(dias, (productos, versiones)), axis=1).ravel(),
+        "precio_unitario": rng.uniform(1, 500, productos * versiones).round(2),
+    }).astype({"id_producto": object, "valid_from": object}).drop_duplicates(["id_producto", "valid_from"])
+    hist["valid_to"] = hist.groupby("id_producto")["valid_from"].shift(-1).fillna(MAX_DATE)
+    ventas = pd.DataFrame({"id_producto": rng.choice(ids, rows), "fecha": rng.choice(dias, rows)}).astype(object)
+
+    def merge_asof():
+        l = ventas.assign(_t=pd.to_datetime(ventas["fecha"])).sort_values("_t")
+        r = hist.assign(_t=pd.to_datetime(hist["valid_from"])).sort_values("_t")
+        return pd.merge_asof(l, r[["_t", "id_producto", "precio_unitario"]], on="_t", by="id_producto")
+
+    t0 = time.perf_counter()
+    idx = AsOfIndex(hist, "id_producto")
+    t_build = (time.perf_counter() - t0) * 1000
+    t_ref = _best_ms(merge_asof, repeat)
+    t_idx = _best_ms(lambda: idx.attach(ventas, ["precio_unitario"]), repeat)
+    print(f"{rows} ventas · {len(hist)} versiones de {productos} productos (índice: {t_build:.1f} ms)")
+    print(f"pd.merge_asof {t_ref:10.1f} ms")
+    print(f"AsOfIndex     {t_idx:10.1f} ms ({rows / t_idx / 1000:.1f} M filas/s, {t_ref / t_idx:.1f}x)")
+
+def _rss_anon_kb() -> int | None:
+    """Memoria anónima (privada) del proceso; las páginas de un mmap de fichero no cuentan."""
+    try:
+        for line in open("/proc/self/status", encoding="ascii"):
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def bench_arrow(repeat: int = 5, rows: int = 2_000_000):
+    """Lectura repetida de clean_ventas: Parquet frente a Arrow IPC (mmap) sin comprimir y LZ4."""
+    import gc
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+    from ut1.arrow_io import read_pandas, read_table, write_ipc
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "fecha": rng.choice(pd.date_range("2024-01-01", periods=400).strftime("%Y-%m-%d").to_numpy(), rows),
+        "id_cliente": rng.choice(np.array([f"C{i:04d}" for i in range(5000)]), rows),
+        "id_producto": rng.choice(np.array([f"P{i:04d}" for i in range(2000)]), rows),
+        "unidades": rng.integers(1, 10, rows).astype("float64"),
+        "precio_unitario": rng.uniform(1, 500, rows).round(2),
+    })
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        df.to_parquet(d / "v.parquet", index=False)
+        write_ipc(df, d / "v.arrow", "uncompressed")
+        write_ipc(df, d / "v_lz4.arrow", "lz4")
+        cases = [
+            ("parquet → pandas", lambda: pd.read_parquet(d / "v.parquet")),
+            ("arrow lz4 → pandas", lambda: read_pandas(d / "v_lz4.arrow")),
+            ("arrow mmap → pandas", lambda: read_pandas(d / "v.arrow")),
+            ("arrow mmap → Table", lambda: read_table(d / "v.arrow")),
+        ]
+        print(f"{rows} filas · parquet {(d / 'v.parquet').stat().st_size >> 20} MiB · "
+              f"arrow {(d / 'v.arrow').stat().st_size >> 20} MiB · lz4 {(d / 'v_lz4.arrow').stat().st_size >> 20} MiB")
+        print(f"{'lectura':<22} {'tiempo':>10} {'RSS privada':>12}")
+        for label, fn in cases:
+            gc.collect()
+            before = _rss_anon_kb()
+            kept = fn()
+            after = _rss_anon_kb()
+            del kept
+            extra = f"{(after - before) / 1024:9.1f} MiB" if before is not None else "   n/d"
+            print(f"{label:<22} {_best_ms(fn, repeat):8.1f}ms {extra:>12}")
+
+LEGACY_CLEAN_VENTAS = """
+CREATE TABLE clean_ventas(
+  fecha TEXT, id_cliente TEXT, id_producto TEXT, unidades REAL, precio_unitario REAL, _ingest_ts TEXT,
+  PRIMARY KEY (fecha, id_cliente, id_producto)
+);
+"""
+LEGACY_UPSERT = (
+    "INSERT INTO clean_ventas VALUES (:fecha, :idc, :idp, :u, :p, :ts) "
+    "ON CONFLICT(fecha, id_cliente, id_producto) DO UPDATE SET unidades = excluded.unidades, "
+    "precio_unitario = excluded.precio_unitario, _ingest_ts = excluded._ingest_ts "
+    "WHERE excluded._ingest_ts > clean_ventas._ingest_ts"
+)
+
+def bench_keys(repeat: int = 5, rows: int = 500_000):
+    """clean_ventas con claves TEXT frente a fact_ventas con claves enteras (ut1/keys.py): tamaño, UPSERT y GROUP BY."""
+    import sqlite3
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+    from ut1 import keys, storage
+    from ut1.shards import fact_params
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "fecha": rng.choice(pd.date_range("2024-01-01", periods=400).strftime("%Y-%m-%d").to_numpy(), rows),
+        "id_cliente": rng.choice(np.array([f"C{i:06d}" for i in range(50_000)]), rows),
+        "id_producto": rng.choice(np.array([f"P{i:05d}" for i in range(5000)]), rows),
+        "unidades": rng.integers(1, 10, rows).astype("float64"),
+        "precio_unitario": rng.uniform(1, 500, rows).round(2),
+        "_ingest_ts": "2024-01-01T00:00:00+00:00",
+    }).drop_duplicates(["fecha", "id_cliente", "id_producto"])
+
+    def size_mib(con: sqlite3.Connection) -> float:
+        pages, size = con.execute("PRAGMA page_count").fetchone()[0], con.execute("PRAGMA page_size").fetchone()[0]
+        return pages * size / 2**20
+
+    def timed(fn) -> float:
+        t0 = time.perf_counter()
+        fn()
+        return (time.perf_counter() - t0) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old = sqlite3.connect(Path(tmp) / "text.db")
+        old.executescript(LEGACY_CLEAN_VENTAS)
+        new = sqlite3.connect(Path(tmp) / "sk.db")
+        storage.apply_schema(new, Path(tmp) / "shards")
+        new.executescript("DROP TRIGGER trg_fact_ventas_ins; DROP TRIGGER trg_fact_ventas_upd; DROP TRIGGER trg_fact_ventas_del;")
+        new.executescript(CDC_DROP_VENTAS)  # solo el coste de las claves (el del feed lo mide bench cdc)
+        upsert = storage.load_upsert_sqls()["fact_ventas"]
+
+        # Ambos como en clean: parámetros desde el DataFrame, más la resolución de claves en el caso entero
+        def load_new():
+            clean = df.copy()
+            clean["fecha_dia"] = keys.day_number(clean["fecha"])
+            clean["cliente_sk"] = keys.resolve(new, "cliente", clean["id_cliente"])
+            clean["producto_sk"] = keys.resolve(new, "producto", clean["id_producto"])
+            clean = clean.sort_values(["fecha_dia", "cliente_sk", "producto_sk"])
+            new.executemany(upsert, fact_params(clean))
+            new.commit()
+
+        def load_old():
+            cols = zip(*(df[c].tolist() for c in df.columns))
+            old.executemany(LEGACY_UPSERT, [{"fecha": f, "idc": c, "idp": k, "u": u, "p": p, "ts": ts} for f, c, k, u, p, ts in cols])
+            old.commit()
+
+        cases = [
+            ("UPSERT (insercion)", timed(load_old), timed(load_new)),
+            ("UPSERT (conflicto)", timed(load_old), timed(load_new)),
+        ]
+        group = "SELECT {k}, SUM(unidades * precio_unitario) FROM {t} GROUP BY {k}"
+        for label, k_old, k_new in (("GROUP BY dia", "fecha", "fecha_dia"), ("GROUP BY producto", "id_producto", "producto_sk")):
+            q_old, q_new = group.format(k=k_old, t="clean_ventas"), group.format(k=k_new, t="fact_ventas")
+            cases.append((label, _best_ms(lambda: old.execute(q_old).fetchall(), repeat), _best_ms(lambda: new.execute(q_new).fetchall(), repeat)))
+        print(f"{len(df)} filas · TEXT {size_mib(old):.1f} MiB · enteras {size_mib(new):.1f} MiB (incluye dim_*)")
+        print(f"{'operación':<20} {'TEXT':>10} {'enteras':>10}")
+        for label, t_old, t_new in cases:
+            print(f"{label:<20} {t_old:8.1f}ms {t_new:8.1f}ms")
+        old.close()
+        new.close()
+
+CDC_DROP_VENTAS = "DROP TRIGGER trg_cdc_fact_ventas_ins; DROP TRIGGER trg_cdc_fact_ventas_upd; DROP TRIGGER trg_cdc_fact_ventas_del;"
+
+def _crashed_worker(db, data_dir):
+    """Reclama un drop, escribe su raw y muere sin soltarlo (para bench_workers)."""
+    import os
+    from ut1 import journal, storage, workers
+    from ut1.ingest import ingest_file
+    con = storage.connect(db, timeout=30)
+    storage.apply_schema(con)
+    workers.enqueue(con, data_dir)
+    job = workers.claim(con, "caido", lease_s=10.0)
+    f = data_dir / job["_source_file"]
+    ingest_file(con, f, job["kind"], journal.fingerprint(f), journal.new_run_id())
+    os._exit(1)
+
+def bench_workers(repeat: int = 1, files: int = 8, rows: int = 50_000):
+    """Cola compartida (ut1/workers.py): filas/s con 1, 2 y 4 procesos, y un worker que muere a medias."""
+    import multiprocessing
+    import os
+    import sqlite3
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+    from ut1 import workers
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "drops"
+        data_dir.mkdir()
+        for i in range(files):
+            pd.DataFrame({
+                "fecha": rng.choice(pd.date_range("2024-01-01", periods=365).strftime("%Y-%m-%d").to_numpy(), rows),
+                "id_cliente": [f"C{i:02d}{j:06d}" for j in range(rows)],  # claves distintas en cada fichero
+                "id_producto": rng.choice(np.array([f"P{k:04d}" for k in range(2000)]), rows),
+                "unidades": rng.integers(1, 10, rows),
+                "precio_unitario": rng.uniform(1, 500, rows).round(2),
+            }).to_csv(data_dir / f"ventas_{i:03d}.csv", index=False)
+
+        def check(db: Path) -> str:
+            con = sqlite3.connect(db)
+            q = workers.summary(con)
+            raw = con.execute("SELECT COUNT(*) FROM raw_ventas").fetchone()[0]
+            fact = con.execute("SELECT COUNT(*) FROM fact_ventas").fetchone()[0]
+            retried = con.execute("SELECT COUNT(*) FROM work_queue WHERE attempts > 1").fetchone()[0]
+            con.close()
+            ok = q["done"] == files and raw == fact == files * rows
+            return f"done={q['done']}/{files} raw={raw} fact={fact} reintentos={retried} {'OK' if ok else 'ERROR'}"
+
+        print(f"{files} drops × {rows} filas · {os.cpu_count()} CPU")
+        base = None
+        for procs in (1, 2, 4):
+            db = Path(tmp) / f"w{procs}.db"
+            t0 = time.perf_counter()
+            workers.run_pool(procs, db=db, data_dir=data_dir, wal=True)
+            secs = time.perf_counter() - t0
+            base = base or secs
+            print(f"{procs} procesos: {files * rows / secs:10.0f} filas/s  x{base / secs:4.2f}  {check(db)}")
+        db = Path(tmp) / "caido.db"
+        p = multiprocessing.get_context("spawn").Process(target=_crashed_worker, args=(db, data_dir))
+        p.start()
+        p.join()
+        # El lease tiene que cubrir la transacción más larga de un batch: con él vence el del caído
+        workers.run_pool(2, db=db, data_dir=data_dir, lease_s=10.0, wal=True)
+        print(f"con un worker caído: {check(db)}")
+
+def bench_parallel(repeat: int = 1, rows: int = 1_000_000):
+    """clean de ventas en secuencia frente a particiones hash en 2 y 4 procesos (ut1/parallel.py)."""
+    import os
+    import resource
+    import shutil
+    import sqlite3
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+    from ut1 import parallel, paths, storage
+    from ut1.clean import clean_and_persist_ventas_from_raw
+
+    rng = np.random.default_rng(0)
+    raw = pd.DataFrame({
+        "fecha": rng.choice(pd.date_range("2024-01-01", periods=400).strftime("%Y-%m-%d").to_numpy(), rows),
+        "id_cliente": rng.choice(np.array([f"C{i:06d}" for i in range(50_000)]), rows),
+        "id_producto": rng.choice(np.array([f"P{i:05d}" for i in range(5000)]), rows),
+        "unidades": rng.integers(-1, 10, rows).astype(str),  # ~9 % negativas → cuarentena
+        "precio_unitario": rng.uniform(1, 500, rows).round(2).astype(str),
+        "_ingest_ts": rng.choice(np.array([f"2024-01-0{d}T00:00:00+00:00" for d in range(1, 4)]), rows),
+        "_source_file": "bench.csv",
+        "_batch_id": "bench",
+    })
+    old_out, old_quality = paths.OUT, paths.QUALITY_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        paths.OUT = paths.QUALITY_DIR = Path(tmp)  # cuarentena y temporales fuera de output/
+        try:
+            base_db = Path(tmp) / "base.db"
+            con = sqlite3.connect(base_db)
+            storage.apply_schema(con, Path(tmp) / "shards")
+            raw.to_sql("raw_ventas", con, if_exists="append", index=False)
+            con.close()
+            upsert = storage.load_upsert_sqls()["fact_ventas"]
+
+            def run(jobs: int) -> tuple[float, str]:
+                db = Path(tmp) / f"j{jobs}.db"
+                shutil.copy(base_db, db)
+                con = sqlite3.connect(db)
+                t0 = time.perf_counter()
+                if jobs == 1:
+                    res = clean_and_persist_ventas_from_raw(con, upsert)
+                else:
+                    with ProcessPoolExecutor(jobs) as pool:
+                        res = parallel.clean_ventas_parallel(con, upsert, pool, jobs)
+                secs = time.perf_counter() - t0
+                rows_ = sorted(con.execute("SELECT * FROM clean_ventas").fetchall())
+                quar = con.execute("SELECT _row FROM quarantine_ventas ORDER BY rowid").fetchall()
+                con.close()
+                return secs, res, hash((tuple(rows_), tuple(quar)))
+
+            print(f"{rows} filas raw · {os.cpu_count()} CPU · particiones de hasta {parallel.PART_ROWS} filas")
+            base = None
+            for jobs in (1, 2, 4):
+                secs, res, digest = run(jobs)
+                base = base or (secs, digest)
+                same = "igual" if digest == base[1] else "DISTINTO"
+                print(f"jobs={jobs}: {secs:6.2f} s  {rows / secs:9.0f} filas/s  x{base[0] / secs:4.2f}  (raw, clean, quar)={res}  {same}")
+            peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+            print(f"pico RSS de un worker: {peak:.0f} MiB")
+        finally:
+            paths.OUT, paths.QUALITY_DIR = old_out, old_quality
+
+def bench_rowdedup(repeat: int = 1, files: int = 8, rows: int = 100_000, overlap: float = 0.8):
+    """Reenvíos solapados: ingest + clean de ventas con y sin dedupe por huella de fila (ut1/rowdedup.py)."""
+    import sqlite3
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+    from ut1 import storage
+    from ut1.clean import clean_and_persist_ventas_from_raw
+    from ut1.ingest import ingest_all_csvs_to_raw
+
+    rng = np.random.default_rng(0)
+    n_total = int(rows + (files - 1) * rows * (1 - overlap))
+    universe = pd.DataFrame({
+        "fecha": rng.choice(pd.date_range("2024-01-01", periods=400).strftime("%Y-%m-%d").to_numpy(), n_total),
+        "id_cliente": rng.choice(np.array([f"C{i:06d}" for i in range(50_000)]), n_total),
+        "id_producto": rng.choice(np.array([f"P{i:05d}" for i in range(5000)]), n_total),
+        "unidades": rng.integers(1, 10, n_total),
+        "precio_unitario": rng.uniform(1, 500, n_total).round(2),
+    })
+    step = int(rows * (1 - overlap))
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "drops"
+        data_dir.mkdir()
+        for i in range(files):  # cada extracto repite el `overlap` final del anterior
+            universe.iloc[i * step:i * step + rows].to_csv(data_dir / f"ventas_{i:03d}.csv", index=False)
+        print(f"{files} drops × {rows} filas, solape {overlap:.0%} · {n_total} filas distintas")
+        print(f"{'modo':<14} {'raw':>9} {'ingest':>9} {'clean':>9} {'MiB':>7}")
+        for label, dedup in (("sin dedupe", False), ("con dedupe", True)):
+            con = sqlite3.connect(Path(tmp) / f"{label[:3]}.db")
+            storage.apply_schema(con, Path(tmp) / "shards")
+            t0 = time.perf_counter()
+            ingest_all_csvs_to_raw(con, data_dir=data_dir, dedup=dedup)
+            t1 = time.perf_counter()
+            clean_and_persist_ventas_from_raw(con, storage.load_upsert_sqls()["fact_ventas"])
+            t2 = time.perf_counter()
+            raw = con.execute("SELECT COUNT(*) FROM raw_ventas").fetchone()[0]
+            mib = con.execute("PRAGMA page_count").fetchone()[0] * con.execute("PRAGMA page_size").fetchone()[0] / 2**20
+            print(f"{label:<14} {raw:>9} {t1 - t0:8.2f}s {t2 - t1:8.2f}s {mib:7.1f}")
+            con.close()
+
+def bench_publish(repeat: int = 1, days: int = 1095, productos: int = 500, lineas: int = 60):
+    """Páginas por periodo (ut1/publish.py): publicación completa frente a incremental tras cambiar un día."""
+    import sqlite3
+    import tempfile
+    import numpy as np
+    from pathlib import Path
+    from ut1 import publish, rollup, storage
+
+    rng = np.random.default_rng(0)
+    n = days * lineas
+    with tempfile.TemporaryDirectory() as tmp:
+        db, site = Path(tmp) / "ut1.db", Path(tmp) / "reportes"
+        con = sqlite3.connect(db)
+        storage.apply_schema(con, Path(tmp) / "shards")
+        con.executemany("INSERT INTO dim_producto (id_producto) VALUES (?)", [(f"P{i:04d}",) for i in range(productos)])
+        con.executemany(
+            "INSERT INTO clean_productos (id_producto, nombre_producto, categoria, precio_unitario, unidades, fecha_entrada, _ingest_ts) "
+            "VALUES (?, ?, ?, 1, 1, '2024-01-01', '')",
+            [(f"P{i:04d}", f"Producto {i}", f"Categoría {i % 12}") for i in range(productos)],
+        )
+        dia0 = 19723  # 2024-01-01
+        rows = {(dia0 + int(d), int(c), int(p)) for d, c, p in zip(np.repeat(np.arange(days), lineas), rng.integers(1, 10**6, n), rng.integers(1, productos + 1, n))}
+        con.executemany(
+            "INSERT OR IGNORE INTO fact_ventas VALUES (?, ?, ?, ?, ?, '')",
+            sorted((d, c, p, float(rng.integers(1, 10)), float(rng.uniform(1, 500))) for d, c, p in rows),
+        )
+        con.commit()
+        rollup.refresh(con)
+        print(f"{days} días × {lineas} líneas · {productos} productos")
+        for jobs in (1, 4):
+            t0 = time.perf_counter()
+            stats = publish.publish(con, db, site, jobs=jobs, full=True)
+            print(f"completa, jobs={jobs}: {time.perf_counter() - t0:7.2f} s  {stats}")
+        con.execute("UPDATE fact_ventas SET unidades = unidades + 1 WHERE fecha_dia = ?", (dia0 + days // 2,))
+        con.commit()
+        rollup.refresh(con)
+        t0 = time.perf_counter()
+        stats = publish.publish(con, db, site)
+        print(f"incremental (1 día cambiado): {time.perf_counter() - t0:7.2f} s  {stats}")
+        con.close()
+
+def bench_preflight(repeat: int = 3, sizes: tuple[int, ...] = (250_000, 1_000_000, 4_000_000), bad_price: float = 0.05, bad_lines: float = 0.02):
+    """Preflight por muestreo (ut1/preflight.py) frente a ingest_one + validación del drop entero: tiempo y tasa."""
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+    from ut1 import preflight
+    from ut1.clean import prepare_ventas
+    from ut1.ingest import parse_lines, split_good_bad_lines
+
+    rng = np.random.default_rng(0)
+    print(f"{'filas':>9} {'MiB':>7} {'preflight':>10} {'estimada [IC95]':>24} {'completo':>9} {'real':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            df = pd.DataFrame({
+                "fecha_venta": rng.choice(pd.date_range("2024-01-01", periods=400).strftime("%Y-%m-%d").to_numpy(), rows),
+                "id_cliente": rng.choice(np.array([f"C{i:03d}" for i in range(1000)]), rows),
+                "id_producto": rng.choice(np.array([f"P{i:04d}" for i in range(5000)]), rows),
+                "unidades": rng.integers(1, 10, rows),
+                "precio_unitario": np.where(rng.random(rows) < bad_price, "n/d", rng.uniform(1, 500, rows).round(2).astype(str)),
+            })
+            extra = rng.random(rows) < bad_lines  # columna de más: cuarentena de parseo
+            df["precio_unitario"] = df["precio_unitario"].where(~extra, df["precio_unitario"] + ",x")
+            f = Path(tmp) / f"ventas_{rows}.csv"
+            df.to_csv(f, index=False, quoting=3, escapechar="\\")
+            r = preflight.check(f)
+            fast = _best_ms(lambda: preflight.check(f), repeat)
+            t0 = time.perf_counter()
+            good, bad = split_good_bad_lines(f)
+            _, invalid = prepare_ventas(parse_lines(good))
+            full = time.perf_counter() - t0
+            real = (len(bad) + len(invalid)) / rows
+            ci = f"{r['tasa']:.2%} [{r['ic95'][0]:.2%}, {r['ic95'][1]:.2%}]"
+            print(f"{rows:>9} {f.stat().st_size / 2**20:7.1f} {fast:8.1f}ms {ci:>24} {full:8.2f}s {real:7.2%}")
+
+def bench_staged(repeat: int = 1, files: int = 8, rows: int = 150_000):
+    """Ingesta de drops .gz uno tras otro (leer → parsear → escribir) frente a las etapas solapadas de ut1/staged.py."""
+    import gzip
+    import os
+    import sqlite3
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+    from ut1 import journal, storage
+    from ut1.ingest import ingest_file
+    from ut1.staged import format_stats, ingest_staged
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        drops = []
+        for i in range(files):
+            df = pd.DataFrame({
+                "fecha_venta": rng.choice(pd.date_range("2024-01-01", periods=400).strftime("%Y-%m-%d").to_numpy(), rows),
+                "id_cliente": rng.choice(np.array([f"C{i:06d}" for i in range(50_000)]), rows),
+                "id_producto": rng.choice(np.array([f"P{i:05d}" for i in range(5000)]), rows),
+                "unidades": rng.integers(1, 10, rows),
+                "precio_unitario": rng.uniform(1, 500, rows).round(2),
+            })
+            f = Path(tmp) / f"ventas_{i:03d}.csv.gz"
+            with gzip.open(f, "wt", compresslevel=6) as fh:
+                df.to_csv(fh, index=False)
+            drops.append((f, "ventas", journal.fingerprint(f)))
+        print(f"{files} drops .gz × {rows} filas · {os.cpu_count()} CPU")
+        results = {}
+        for label in ("secuencial", "etapas"):
+            con = sqlite3.connect(Path(tmp) / f"{label}.db")
+            storage.apply_schema(con, Path(tmp) / "shards")
+            run_id = journal.new_run_id()
+            t0 = time.perf_counter()
+            if label == "secuencial":
+                for f, kind, fp in drops:
+                    ingest_file(con, f, kind, fp, run_id)
+            else:
+                _, stats = ingest_staged(con, drops, run_id)
+            results[label] = time.perf_counter() - t0
+            raw = con.execute("SELECT COUNT(*), SUM(CAST(precio_unitario AS REAL)) FROM raw_ventas").fetchone()
+            print(f"{label:<12} {results[label]:7.2f} s  raw={raw[0]} suma precios={raw[1]:.2f}")
+            con.close()
+        print(format_stats(stats))
+        print(f"x{results['secuencial'] / results['etapas']:.2f}")
+
+def bench_cdc(repeat: int = 3, rows: int = 500_000, changed: float = 0.01):
+    """Feed CDC (ut1/cdc.py): coste en clean de ventas y lectura de deltas frente a releer y comparar la tabla."""
+    import sqlite3
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+    from ut1 import cdc, keys, storage
+    from ut1.clean import persist_ventas
+    from ut1.shards import fact_params
+
+    rng = np.random.default_rng(0)
+    first = pd.DataFrame({
+        "fecha": pd.to_datetime(rng.choice(pd.date_range("2024-01-01", periods=400).strftime("%Y-%m-%d").to_numpy(), rows)).date,
+        "id_cliente": rng.choice(np.array([f"C{i:06d}" for i in range(50_000)]), rows),
+        "id_producto": rng.choice(np.array([f"P{i:05d}" for i in range(5000)]), rows),
+        "unidades": rng.integers(1, 10, rows).astype("float64"),
+        "precio_unitario": rng.uniform(1, 500, rows).round(2),
+        "_ingest_ts": "2024-01-01T00:00:00+00:00",
+    }).drop_duplicates(["fecha", "id_cliente", "id_producto"])
+    # Reenvío completo con un `changed` de filas corregidas (las demás, misma versión: skip)
+    second = first.copy()
+    fix = rng.random(len(second)) < changed
+    second.loc[fix, "precio_unitario"] += 1
+    second.loc[fix, "_ingest_ts"] = "2024-01-02T00:00:00+00:00"
+    query = "SELECT fecha, id_cliente, id_producto, unidades, precio_unitario, _ingest_ts FROM clean_ventas"
+    print(f"{len(first)} filas, reenvío con {int(fix.sum())} corregidas")
+    print(f"{'modo':<10} {'carga':>9} {'reenvío':>9} {'MiB':>7}")
+    upsert = storage.load_upsert_sqls()["fact_ventas"]
+
+    def persist_plain(con: sqlite3.Connection, df: pd.DataFrame):
+        # persist_ventas sin begin/record_skips (y sin los triggers CDC): la carga de antes del feed
+        clean = df.copy()
+        clean["fecha_dia"] = keys.day_number(clean["fecha"])
+        clean["cliente_sk"] = keys.resolve(con, "cliente", clean["id_cliente"])
+        clean["producto_sk"] = keys.resolve(con, "producto", clean["id_producto"])
+        clean = clean.sort_values(["fecha_dia", "cliente_sk", "producto_sk"])
+        con.executemany(upsert, fact_params(clean))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ("sin CDC", "apagado", "con CDC"):
+            con = sqlite3.connect(Path(tmp) / f"{label[:3]}.db")
+            storage.apply_schema(con, Path(tmp) / "shards")
+            if label == "sin CDC":
+                con.executescript(CDC_DROP_VENTAS)
+            elif label == "apagado":
+                cdc.set_enabled(con, False)  # cdc --disable: los triggers siguen, con su WHEN
+            times = []
+            for df in (first, second):
+                t0 = time.perf_counter()
+                if label == "sin CDC":
+                    persist_plain(con, df)
+                else:
+                    persist_ventas(con, df, upsert, run_id=label)
+                con.commit()
+                times.append(time.perf_counter() - t0)
+                if df is first:
+                    cursor = cdc.last_seq(con)
+                    snapshot = pd.read_sql_query(query, con)
+            mib = con.execute("PRAGMA page_count").fetchone()[0] * con.execute("PRAGMA page_size").fetchone()[0] / 2**20
+            print(f"{label:<10} {times[0]:8.2f}s {times[1]:8.2f}s {mib:7.1f}")
+            if label == "con CDC":
+                def rescan():
+                    now = pd.read_sql_query(query, con)
+                    diff = now.merge(snapshot, how="left", indicator=True)
+                    return int((diff["_merge"] == "left_only").sum())
+                ops = ["insert", "update", "delete"]
+                n_skip = sum(n for _, _, op, n in cdc.summary(con) if op == "skip")
+                t_delta = _best_ms(lambda: cdc.read(con, cursor, ops=ops), repeat)
+                t_rescan = _best_ms(rescan, repeat)
+                print(f"feed: {cdc.last_seq(con)} cambios ({n_skip} skip)")
+                print(
+                    f"consumidor: deltas {t_delta:.1f} ms ({len(cdc.read(con, cursor, ops=ops))} sin skip) · "
+                    f"releer y comparar {t_rescan:.1f} ms ({rescan()} cambiadas)"
+                )
+            con.close()
+
+def bench_lookup(repeat: int = 3, rows: int = 3_000_000):
+    """Búsqueda puntual (ut1/lookup.py): Parquet ordenado con estadísticas y Bloom frente al Parquet sin ordenar."""
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    from pathlib import Path
+    from ut1 import lookup
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "fecha": rng.choice(pd.date_range("2024-01-01", periods=730).strftime("%Y-%m-%d").to_numpy(), rows),
+        "id_cliente": rng.choice(np.array([f"C{i:06d}" for i in range(0, 400_000, 2)]), rows),  # impares: no existen
+        "id_producto": rng.choice(np.array([f"P{i:05d}" for i in range(20_000)]), rows),
+        "unidades": rng.integers(1, 10, rows).astype("float64"),
+        "precio_unitario": rng.uniform(1, 500, rows).round(2),
+        "_ingest_ts": "2024-01-01T00:00:00+00:00",
+    })
+    cases = [("id_cliente", "C123456", "cliente"), ("id_cliente", "C123457", "cliente inexistente"), ("id_producto", "P04500", "producto")]
+
+    def scan(path: Path, column: str, value: str) -> tuple[int, int]:
+        with lookup.CountingFile(path) as f:
+            t = pq.ParquetFile(f).read()
+            return len(t.filter(pc.equal(t[column], value))), f.bytes_read
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = Path(tmp) / "plain.parquet"
+        t0 = time.perf_counter()
+        df.to_parquet(plain, index=False)
+        t_plain = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for key, name in lookup.SORTED_FILES.items():
+            lookup.write_sorted(df, Path(tmp) / name, key, "bench")
+        t_sorted = time.perf_counter() - t0
+        mib = lambda p: p.stat().st_size / 2**20
+        print(f"{rows} filas · sin ordenar {mib(plain):.1f} MiB en {t_plain:.2f} s · dos copias ordenadas "
+              f"{sum(mib(Path(tmp) / n) for n in lookup.SORTED_FILES.values()):.1f} MiB en {t_sorted:.2f} s")
+        print(f"{'búsqueda':<20} {'filas':>6} {'escaneo':>10} {'MiB':>7} {'lookup':>9} {'MiB':>7} {'grupos':>7}")
+        for column, value, label in cases:
+            n_scan, b_scan = scan(plain, column, value)
+            t_scan = _best_ms(lambda: scan(plain, column, value), repeat)
+            out, stats = lookup.lookup(column, value, Path(tmp))
+            t_lookup = _best_ms(lambda: lookup.lookup(column, value, Path(tmp)), repeat)
+            assert len(out) == n_scan, (label, len(out), n_scan)
+            print(f"{label:<20} {n_scan:>6} {t_scan:8.1f}ms {b_scan / 2**20:7.2f} {t_lookup:7.1f}ms "
+                  f"{stats['bytes'] / 2**20:7.2f} {stats['leidos']:>3}/{stats['grupos']}")
+
+def bench_autotune(repeat: int = 1, rows: int = 300_000, jobs: int = 2, runs: int = 3):
+    """Autoajuste (ut1/autotune.py): clean.chunk_rows fijado a mano frente a aprendido, en dos runs seguidos."""
+    import shutil
+    import sqlite3
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+    from ut1 import autotune, parallel, paths, storage
+
+    rng = np.random.default_rng(0)
+    raw = pd.DataFrame({
+        "fecha": rng.choice(pd.date_range("2024-01-01", periods=400).strftime("%Y-%m-%d").to_numpy(), rows),
+        "id_cliente": rng.choice(np.array([f"C{i:06d}" for i in range(50_000)]), rows),
+        "id_producto": rng.choice(np.array([f"P{i:05d}" for i in range(5000)]), rows),
+        "unidades": rng.integers(1, 10, rows).astype(str),
+        "precio_unitario": rng.uniform(1, 500, rows).round(2).astype(str),
+        "_ingest_ts": "2024-01-01T00:00:00+00:00",
+        "_source_file": "bench.csv",
+        "_batch_id": "bench",
+    })
+    old_out, old_quality, old_chunk = paths.OUT, paths.QUALITY_DIR, parallel.CHUNK_ROWS
+    with tempfile.TemporaryDirectory() as tmp:
+        paths.OUT = paths.QUALITY_DIR = Path(tmp)
+        try:
+            base_db = Path(tmp) / "base.db"
+            con = sqlite3.connect(base_db)
+            storage.apply_schema(con, Path(tmp) / "shards")
+            raw.to_sql("raw_ventas", con, if_exists="append", index=False)
+            con.close()
+            upsert = storage.load_upsert_sqls()["fact_ventas"]
+            tune_db = Path(tmp) / "tune.db"  # lo aprendido pasa de un run al siguiente
+            shutil.copy(base_db, tune_db)
+            limits = autotune.default_limits()
+
+            def run(label: str, tune: bool) -> float:
+                db = Path(tmp) / "run.db"
+                shutil.copy(base_db, db)
+                con = sqlite3.connect(db)
+                tcon = sqlite3.connect(tune_db)
+                session = autotune.Session(tcon, limits) if tune else None
+                start = session.tuner("clean.chunk_rows").value if session else parallel.CHUNK_ROWS
+                t0 = time.perf_counter()
+                with ProcessPoolExecutor(jobs) as pool:
+                    parallel.clean_ventas_parallel(con, upsert, pool, jobs, tune=session)
+                secs = time.perf_counter() - t0
+                extra = ""
+                if session:
+                    t = session.tuner("clean.chunk_rows")
+                    session.save(tcon)
+                    extra = f"  empieza en {start}, siguiente {t.value}, RSS máx {max(s.rss_mib for s in t.stats.values()):.0f} MiB"
+                print(f"{label:<28} {secs:7.2f} s {rows / secs:10.0f} filas/s{extra}")
+                con.close()
+                tcon.close()
+                return secs
+
+            print(f"{rows} filas raw · jobs={jobs} · límites {limits.mem_mib:.0f} MiB, {limits.cpus} CPU")
+            fixed = {}
+            for chunk in autotune.KNOBS["clean.chunk_rows"].ladder:
+                parallel.CHUNK_ROWS = chunk
+                fixed[chunk] = run(f"chunk_rows={chunk}", False)
+            parallel.CHUNK_ROWS = old_chunk
+            best = min(fixed, key=fixed.get)
+            tuned = [run(f"autoajuste (run {i + 1})", True) for i in range(runs)]
+            print(f"mejor a mano: chunk_rows={best} {fixed[best]:.2f} s · autoajuste " + " → ".join(f"{t:.2f} s" for t in tuned))
+        finally:
+            paths.OUT, paths.QUALITY_DIR, parallel.CHUNK_ROWS = old_out, old_quality, old_chunk
+
+def bench_fleet(repeat: int = 1, tenants: int = 12, rows: int = 20_000, workers: int | None = None):
+    """Muchos tenants (ut1/fleet.py): un `python -m ut1 --root T run` por tenant frente a `fleet` con pool compartido."""
+    import os
+    import shutil
+    import sqlite3
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from concurrent.futures import ThreadPoolExecutor
+    from pathlib import Path
+    from ut1 import fleet
+
+    workers = workers or os.cpu_count() or 1
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        def make() -> list[Path]:
+            roots = []
+            for i in range(tenants):
+                root = Path(tmp) / "procesos" / f"tienda_{i:03d}"
+                (root / "data").mkdir(parents=True)
+                shutil.copytree(paths.ROOT / "data" / "drops", root / "data" / "drops")
+                n = rows * (1 + i % 3)  # tiendas de tres tamaños
+                pd.DataFrame({
+                    "fecha_venta": rng.choice(pd.date_range("2025-01-01", periods=180).strftime("%Y-%m-%d").to_numpy(), n),
+                    "id_cliente": rng.choice(np.array([f"C{k:03d}" for k in range(1, 120)]), n),
+                    "id_producto": rng.choice(np.array([f"P{k:03d}" for k in range(1, 120)]), n),
+                    "unidades": rng.integers(1, 10, n),
+                    "precio_unitario": rng.uniform(1, 500, n).round(2),
+                }).to_csv(root / "data" / "drops" / "ventas.csv", index=False)
+                roots.append(root)
+            return roots
+
+        def fact_rows(roots: list[Path]) -> int:
+            total = 0
+            for r in roots:
+                con = sqlite3.connect(r / "output" / "ut1.db")
+                total += con.execute("SELECT COUNT(*) FROM fact_ventas").fetchone()[0]
+                con.close()
+            return total
+
+        procs = make()
+        shutil.copytree(Path(tmp) / "procesos", Path(tmp) / "fleet")  # los mismos drops para los dos
+        pooled = [Path(tmp) / "fleet" / r.name for r in procs]
+        print(f"{tenants} tenants × {rows}-{3 * rows} filas de ventas · {workers} workers · {os.cpu_count()} CPU")
+        cmd = [sys.executable, "-m", "ut1", "--root"]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(workers) as ex:  # como lanzar un proceso por tienda, `workers` a la vez
+            list(ex.map(lambda r: subprocess.run(cmd + [str(r), "run"], cwd=paths.ROOT, check=True, stdout=subprocess.DEVNULL), procs))
+        t_procs = time.perf_counter() - t0
+        results, t_fleet = fleet.run_fleet(pooled, {"shard_ventas": False, "full": False, "resume": False, "arrow": None, "keep_repeats": False,
+                                                    "preflight": False, "jobs": None, "autotune": False}, workers, progress=None)
+        summary = fleet.summarize(results, t_fleet, workers)
+        n_procs, n_fleet = fact_rows(procs), fact_rows(pooled)
+        print(f"un proceso por tenant {t_procs:8.2f} s  {tenants / t_procs:6.2f} tenants/s  fact_ventas={n_procs}")
+        print(f"fleet                 {t_fleet:8.2f} s  {tenants / t_fleet:6.2f} tenants/s  fact_ventas={n_fleet}"
+              f"  {summary['filas_s']:,} filas/s  {'OK' if n_procs == n_fleet and not summary['error'] else 'ERROR'}")
+        print(f"x{t_procs / t_fleet:.2f} · por tenant en fleet: mediana {summary['tenant_p50_s']:.2f} s, máximo {summary['tenant_max_s']:.2f} s")
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "coerce": bench_coerce,
+    "asof": bench_asof,
+    "arrow": bench_arrow,
+    "keys": bench_keys,
+    "workers": bench_workers,
+    "parallel": bench_parallel,
+    "rowdedup": bench_rowdedup,
+    "publish": bench_publish,
+    "preflight": bench_preflight,
+    "staged": bench_staged,
+    "cdc": bench_cdc,
+    "lookup": bench_lookup,
+    "autotune": bench_autotune,
+    "fleet": bench_fleet,
+}
+
+def run_benchmarks(names: list[str] | None = None, repeat: int = 5) -> int:
+    names = names or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        print(f"[ERROR] Benchmarks desconocidos: {unknown} (disponibles: {list(BENCHMARKS)})")
+        return 1
+    for n in names:
+        print(f"== {n} ==")
+        BENCHMARKS[n](repeat=repeat)
+    return 0
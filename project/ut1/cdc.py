@@ -0,0 +1,197 @@
+"""
+Feed de cambios (CDC) de clean_ventas, clean_clientes y clean_productos.
+
+Los triggers de sql/40_cdc.sql anotan en cdc_changes cada insert/update/delete con la
+clave natural y los valores de antes y después (JSON), etiquetados con el run de
+cdc_context, que clean fija con begin() en la misma transacción que sus UPSERTs. Una
+fila que llega y pierde la comparación de _ingest_ts no dispara nada: record_skips
+la anota como `skip` (clave del batch sin cambio desde begin), solo si es de la última
+ingesta del batch: relimpiar lo ya limpio (--full) no repite skips. Con --shard-ventas,
+fact_ventas vive en los shards: sus triggers dejan los cambios en cdc_pending y
+drain_shards los copia aquí una sola vez (cdc_shard_marks guarda hasta qué seq),
+con la clave formada desde los diccionarios de ut1.db.
+
+Un consumidor lee por seq desde su cursor (cdc_cursors) y lo avanza al terminar. SQLite
+serializa las transacciones de escritura, así que nunca se confirma un seq menor que
+otro ya visible: basta con recordar el último procesado.
+
+El feed se apaga con set_enabled(False) (`cdc --disable`): los triggers no escriben nada
+y clean no anota skips. Lo que cambie mientras tanto no queda en el feed: al volver a
+encenderlo, los consumidores deben releer las tablas una vez.
+"""
+from __future__ import annotations
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from ut1 import paths
+
+# entidad → (columnas de la clave, columnas de valores) en el orden de los JSON de los triggers
+ENTITIES = {
+    "ventas": (["fecha", "id_cliente", "id_producto"], ["unidades", "precio_unitario", "_ingest_ts"]),
+    "clientes": (["id_cliente"], ["fecha", "nombre", "apellido", "_ingest_ts"]),
+    "productos": (["id_producto"], ["fecha_entrada", "nombre_producto", "unidades", "precio_unitario", "categoria", "_ingest_ts"]),
+}
+REAL_COLS = {"unidades", "precio_unitario"}  # REAL en las tablas: mismo JSON (3 → 3.0) que los triggers
+COLUMNS = ["seq", "run_id", "entity", "op", "key", "before", "after"]
+
+def begin(con: sqlite3.Connection, run_id: str | None) -> int:
+    """Fija el run de los cambios que vienen (abre la transacción si no lo estaba). Devuelve el seq actual."""
+    con.execute(
+        "INSERT INTO cdc_context (id, run_id) VALUES (1, ?) ON CONFLICT(id) DO UPDATE SET run_id = excluded.run_id",
+        (run_id,),
+    )
+    return con.execute("SELECT COALESCE(MAX(seq), 0) FROM cdc_changes").fetchone()[0]
+
+def enabled(con: sqlite3.Connection) -> bool:
+    row = con.execute("SELECT enabled FROM cdc_context WHERE id = 1").fetchone()
+    return row is None or bool(row[0])
+
+def set_enabled(con: sqlite3.Connection, on: bool):
+    con.execute(
+        "INSERT INTO cdc_context (id, enabled) VALUES (1, ?) ON CONFLICT(id) DO UPDATE SET enabled = excluded.enabled",
+        (int(on),),
+    )
+    con.commit()
+
+def _json(cols: list[str], alias: str) -> str:
+    return "json_object(" + ", ".join(f"'{c}', {alias}.{c}" for c in cols) + ")"
+
+def record_skips(con: sqlite3.Connection, entity: str, since: int, rows: list[tuple], fresh_since: str | None = None) -> int:
+    """
+    `rows` = versiones enviadas al UPSERT (columnas de ENTITIES, clave + valores, una por clave).
+    Las que no dejaron cambio después de `since` se anotan como skip. Con `fresh_since`, solo
+    las de _ingest_ts >= fresh_since (la última ingesta del batch). Sin commit.
+    """
+    if fresh_since is not None:
+        rows = [r for r in rows if (r[-1] or "") >= fresh_since]
+    if not rows or not enabled(con):
+        return 0
+    key_cols, value_cols = ENTITIES[entity]
+    cols = key_cols + value_cols
+    table = f"cdc_in_{entity}"
+    con.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {table}("
+        + ", ".join(f"{c} {'REAL' if c in REAL_COLS else 'TEXT'}" for c in cols) + ")"
+    )
+    con.execute(f"DELETE FROM temp.{table}")
+    con.executemany(f"INSERT INTO temp.{table} VALUES ({', '.join('?' * len(cols))})", rows)
+    # Claves cambiadas desde `since`: un recorrido por seq (PK), sin índice por clave en cdc_changes
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS cdc_changed(key TEXT PRIMARY KEY) WITHOUT ROWID")
+    con.execute("DELETE FROM temp.cdc_changed")
+    con.execute("INSERT OR IGNORE INTO temp.cdc_changed SELECT key FROM cdc_changes WHERE seq > ? AND entity = ?", (since, entity))
+    return con.execute(
+        f"""
+        INSERT INTO cdc_changes (run_id, entity, op, key, before, after)
+        SELECT (SELECT run_id FROM cdc_context WHERE id = 1), ?, 'skip', i.k, NULL, i.v
+        FROM (SELECT {_json(key_cols, 'x')} AS k, {_json(value_cols, 'x')} AS v FROM temp.{table} x) i
+        WHERE NOT EXISTS (SELECT 1 FROM temp.cdc_changed c WHERE c.key = i.k)
+        """,
+        (entity,),
+    ).rowcount
+
+DRAIN_SQL = """
+INSERT INTO cdc_changes (run_id, entity, op, key, before, after) VALUES (
+  (SELECT run_id FROM cdc_context WHERE id = 1), 'ventas', ?,
+  json_object('fecha', date(? * 86400, 'unixepoch'),
+              'id_cliente', (SELECT id_cliente FROM dim_cliente WHERE cliente_sk = ?),
+              'id_producto', (SELECT id_producto FROM dim_producto WHERE producto_sk = ?)),
+  ?, ?
+)
+"""
+
+def drain_shards(con: sqlite3.Connection, shard_dir: Path, keys: list[str] | None = None) -> int:
+    """
+    Copia a cdc_changes los cambios pendientes de los shards `keys` (todos si None), sin
+    commit: la marca avanza en la misma transacción, así que lo copiado no se repite aunque
+    el proceso muera antes de borrarlo del shard (se borra en el siguiente drain).
+    """
+    from ut1.shards import list_shards, open_shard
+    n = 0
+    for key in keys if keys is not None else list_shards(shard_dir):
+        row = con.execute("SELECT seq FROM cdc_shard_marks WHERE shard = ?", (key,)).fetchone()
+        mark = row[0] if row else 0
+        sc = open_shard(shard_dir, key)
+        try:
+            sc.execute("DELETE FROM cdc_pending WHERE seq <= ?", (mark,))
+            sc.commit()
+            rows = sc.execute(
+                "SELECT seq, op, fecha_dia, cliente_sk, producto_sk, before, after FROM cdc_pending ORDER BY seq"
+            ).fetchall()
+        finally:
+            sc.close()
+        if rows:
+            con.executemany(DRAIN_SQL, [r[1:] for r in rows])
+            con.execute("INSERT OR REPLACE INTO cdc_shard_marks (shard, seq) VALUES (?, ?)", (key, rows[-1][0]))
+            n += len(rows)
+    return n
+
+def read(
+    con: sqlite3.Connection,
+    since: int = 0,
+    limit: int | None = None,
+    entity: str | None = None,
+    ops: list[str] | None = None,
+) -> list[tuple]:
+    """Cambios con seq > since, en orden (filas con COLUMNS); `ops` filtra, p. ej. sin los skip."""
+    sql = f"SELECT {', '.join(COLUMNS)} FROM cdc_changes WHERE seq > ?"
+    params: list = [since]
+    if entity:
+        sql += " AND entity = ?"
+        params.append(entity)
+    if ops:
+        sql += f" AND op IN ({','.join('?' * len(ops))})"
+        params += ops
+    sql += " ORDER BY seq"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return con.execute(sql, params).fetchall()
+
+def cursor(con: sqlite3.Connection, consumer: str) -> int:
+    row = con.execute("SELECT seq FROM cdc_cursors WHERE consumer = ?", (consumer,)).fetchone()
+    return row[0] if row else 0
+
+def ack(con: sqlite3.Connection, consumer: str, seq: int):
+    """Avanza el cursor de `consumer` hasta `seq` (nunca hacia atrás)."""
+    con.execute(
+        "INSERT INTO cdc_cursors (consumer, seq, updated_ts) VALUES (?, ?, ?) "
+        "ON CONFLICT(consumer) DO UPDATE SET seq = MAX(seq, excluded.seq), updated_ts = excluded.updated_ts",
+        (consumer, seq, datetime.now(timezone.utc).isoformat()),
+    )
+    con.commit()
+
+def last_seq(con: sqlite3.Connection) -> int:
+    return con.execute("SELECT COALESCE(MAX(seq), 0) FROM cdc_changes").fetchone()[0]
+
+def summary(con: sqlite3.Connection, run_id: str | None = None) -> list[tuple]:
+    """(run_id, entity, op, filas) por run, del más reciente al más antiguo."""
+    where, params = ("WHERE run_id = ?", (run_id,)) if run_id else ("", ())
+    return con.execute(
+        f"SELECT run_id, entity, op, COUNT(*) FROM cdc_changes {where} "
+        "GROUP BY run_id, entity, op ORDER BY MAX(seq) DESC, entity, op",
+        params,
+    ).fetchall()
+
+def prune(con: sqlite3.Connection) -> int:
+    """Borra lo que ya han procesado todos los consumidores registrados (nada si no hay ninguno)."""
+    row = con.execute("SELECT MIN(seq) FROM cdc_cursors").fetchone()
+    if row[0] is None:
+        return 0
+    n = con.execute("DELETE FROM cdc_changes WHERE seq <= ?", (row[0],)).rowcount
+    con.commit()
+    return n
+
+def export_run(con: sqlite3.Connection, run_id: str, out_dir: Path | None = None) -> Path | None:
+    """Cambios del run en out_dir/<run_id>.parquet (nada si el run no cambió nada)."""
+    import pandas as pd
+    from ut1.outputs import write_parquet
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(COLUMNS)} FROM cdc_changes WHERE run_id = ? ORDER BY seq", con, params=(run_id,)
+    )
+    if df.empty:
+        return None
+    out_dir = out_dir or paths.CDC_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{run_id}.parquet"
+    write_parquet(df, path, "cdc")
+    return path
@@ -0,0 +1,388 @@
+"""Plata: validación, cuarentena, dedupe "último gana" y UPSERT en clean_* (ventas: fact_ventas)."""
+import sqlite3
+import time
+from concurrent.futures import Executor
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+from ut1 import cdc, coerce, journal, keys, paths, quality, scd
+from ut1.outputs import append_quarantine, write_parquet
+from ut1.shards import fact_params, query_all, read_clean_ventas, read_raw_ventas, shard_key, upsert_clean_ventas
+from ut1.storage import load_upsert_sqls
+from ut1.utils import serialize_row_csv_like, strip_strings
+
+# Validaciones de clientes (coerciones memoizadas por valor único, ver ut1/coerce.py)
+def validate_clientes(df: pd.DataFrame) -> pd.Series:
+    fecha_ok = coerce.is_date(df["fecha"])
+    nombre_ok = coerce.is_name(df["nombre"])
+    apellido_ok = coerce.is_name(df["apellido"])
+    id_norm = coerce.norm_id(df["id_cliente"])
+    id_ok = id_norm.str.match(r"^C\d{3}$")
+    return fecha_ok & nombre_ok & apellido_ok & id_ok
+
+def validate_productos(df: pd.DataFrame) -> pd.Series:
+    """Sobre unidades/precio_unitario ya coercionados."""
+    return (
+        df["id_producto"].fillna("").ne("")
+        & df["precio_unitario"].notna() & (df["precio_unitario"] >= 0)
+        & df["unidades"].notna() & (df["unidades"] >= 0)
+    )
+
+def _batch_filter(source_file: str | None) -> tuple[str, tuple]:
+    return ("WHERE _source_file = ?", (source_file,)) if source_file else ("", ())
+
+# Validación y dedupe de ventas sin tocar la BD (la usan también los workers de ut1/parallel.py)
+VENTAS_COLS = ["fecha", "id_cliente", "id_producto", "unidades", "precio_unitario", "_ingest_ts", "_source_file", "_batch_id"]
+VENTAS_KEY = ["fecha", "id_cliente", "id_producto"]
+
+def prepare_ventas(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Filas raw → (limpias con "último gana" por VENTAS_KEY, inválidas tal cual llegaron)."""
+    df = strip_strings(df)
+    for c in VENTAS_COLS:
+        if c not in df.columns:
+            df[c] = None
+    src = df.copy()  # valores tal cual llegaron: la cuarentena los guarda así para poder reprocesarlos
+    df["fecha"] = coerce.to_date(df["fecha"])
+    df["unidades"] = coerce.to_number(df["unidades"])
+    df["precio_unitario"] = coerce.to_money(df["precio_unitario"])
+    valid = (
+        pd.notna(df["fecha"])
+        & df["unidades"].notna() & (df["unidades"] >= 0)
+        & df["precio_unitario"].notna() & (df["precio_unitario"] >= 0)
+        & df["id_cliente"].fillna("").ne("")
+        & df["id_producto"].fillna("").ne("")
+    )
+    clean = df.loc[valid]
+    # Orden estable: a igual _ingest_ts gana la fila posterior del fichero
+    clean = clean.sort_values("_ingest_ts", kind="stable").drop_duplicates(subset=VENTAS_KEY, keep="last")
+    return clean, src.loc[~valid]
+
+def ventas_quarantine_rows(invalid: pd.DataFrame) -> list[tuple[str, str, str, str, str]]:
+    cols_src = ["fecha", "id_cliente", "id_producto", "unidades", "precio_unitario"]
+    now = datetime.now(timezone.utc).isoformat()
+    # Por columnas (tolist) en vez de iterrows: con muchas inválidas construir cada Series domina el coste
+    cols = cols_src + ["_source_file", "_batch_id"]
+    return [
+        ("validation_failed", serialize_row_csv_like(r, cols_src), now, r["_source_file"], r["_batch_id"])
+        for r in (dict(zip(cols, v)) for v in zip(*(invalid[c].tolist() for c in cols)))
+    ]
+
+def persist_ventas(
+    con: sqlite3.Connection,
+    clean: pd.DataFrame,
+    upsert_sql: str,
+    shard_dir: Path | None = None,
+    run_id: str | None = None,
+    fresh_since: str | None = None,
+) -> None:
+    """
+    UPSERT de filas limpias en fact_ventas (o en sus shards) y su rastro en cdc_changes (skips solo
+    desde `fresh_since`, ver cdc.record_skips). Sin commit en ut1.db salvo con shards.
+    """
+    clean = clean.copy()
+    # Claves enteras: día y sk de los diccionarios (los ids nuevos se dan de alta aquí)
+    clean["fecha_dia"] = keys.day_number(clean["fecha"])
+    clean["cliente_sk"] = keys.resolve(con, "cliente", clean["id_cliente"])
+    clean["producto_sk"] = keys.resolve(con, "producto", clean["id_producto"])
+    # En orden de PK: fact_ventas es WITHOUT ROWID y así cada UPSERT cae junto al anterior
+    clean = clean.sort_values(["fecha_dia", "cliente_sk", "producto_sk"])
+    feed = cdc.enabled(con)
+    if shard_dir is not None:
+        con.commit()  # las claves, confirmadas antes de que las referencie ningún shard
+        upsert_clean_ventas(clean, shard_dir, upsert_sql, feed)
+        since = cdc.begin(con, run_id)
+        if feed:
+            cdc.drain_shards(con, shard_dir, sorted(shard_key(clean["fecha"]).dropna().unique()))
+    else:
+        since = cdc.begin(con, run_id)
+        con.executemany(upsert_sql, fact_params(clean))
+    if feed:
+        # Por columnas (tolist): iterar las columnas de texto fila a fila cuesta más que el UPSERT
+        sent = list(zip(
+            [str(d) for d in clean["fecha"].tolist()],
+            *(clean[c].tolist() for c in ["id_cliente", "id_producto", "unidades", "precio_unitario", "_ingest_ts"]),
+        ))
+        cdc.record_skips(con, "ventas", since, sent, fresh_since)
+
+# Limpieza: Ventas (source_file=None → todo raw_ventas; si no, solo ese batch;
+# `df` = filas ya leídas con el esquema de raw, p. ej. el replay de cuarentena)
+def clean_and_persist_ventas_from_raw(
+    con: sqlite3.Connection,
+    upsert_sql: str,
+    shard_dir: Path | None = None,
+    source_file: str | None = None,
+    df: pd.DataFrame | None = None,
+    run_id: str | None = None,
+    fresh_since: str | None = None,
+) -> tuple[int, int, int]:
+    where, params = _batch_filter(source_file)
+    if df is None and shard_dir is not None:
+        df = read_raw_ventas(con, shard_dir, where, params)
+    elif df is None:
+        df = pd.read_sql_query(f"SELECT * FROM raw_ventas {where}", con, params=params)
+    raw_rows = len(df)
+    if df.empty:
+        (paths.QUALITY_DIR / "ventas_quarantine.csv").touch(exist_ok=True)
+        return 0, 0, 0
+    clean, invalid = prepare_ventas(df)
+    if not invalid.empty:
+        append_quarantine(con, "ventas", ventas_quarantine_rows(invalid))
+    if not clean.empty:
+        persist_ventas(con, clean, upsert_sql, shard_dir, run_id, fresh_since)
+        con.commit()
+    return raw_rows, len(clean), len(invalid)
+
+def _valid_from(fechas: pd.Series) -> list[str]:
+    """Fecha de negocio → valid_from ISO de la historia (sin fecha válida: scd.MIN_DATE)."""
+    return [d.isoformat() if pd.notna(d) else scd.MIN_DATE for d in coerce.to_date(fechas)]
+
+# Limpieza: Clientes
+def clean_and_persist_clientes_from_raw(
+    con: sqlite3.Connection,
+    upsert_sql: str,
+    source_file: str | None = None,
+    hist_sql: str | None = None,
+    df: pd.DataFrame | None = None,
+    run_id: str | None = None,
+    fresh_since: str | None = None,
+) -> tuple[int, int, int]:
+    where, params = _batch_filter(source_file)
+    if df is None:
+        df = pd.read_sql_query(f"SELECT * FROM raw_clientes {where}", con, params=params)
+    raw_rows = len(df)
+    if df.empty:
+        (paths.QUALITY_DIR / "clientes_quarantine.csv").touch(exist_ok=True)
+        return 0, 0, 0
+    df = strip_strings(df)
+    for c in ["fecha", "nombre", "apellido", "id_cliente", "_ingest_ts", "_source_file", "_batch_id"]:
+        if c not in df.columns:
+            df[c] = None
+    valid = validate_clientes(df)
+    quarantine = df.loc[~valid].copy()
+    clean = df.loc[valid].copy()
+    clean["_valid_from"] = _valid_from(clean["fecha"])
+    if not quarantine.empty:
+        cols_src = ["fecha", "nombre", "apellido", "id_cliente"]
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for _, r in quarantine.iterrows():
+            rows.append(("validation_failed_clientes", serialize_row_csv_like(r, cols_src), now, r.get("_source_file", ""), r.get("_batch_id", "")))
+        append_quarantine(con, "clientes", rows)
+    if not clean.empty:
+        clean = clean.sort_values("_ingest_ts", kind="stable")
+        params = [
+            {
+                "fecha": str(r["fecha"]) if pd.notna(r["fecha"]) else None,
+                "nombre": r["nombre"],
+                "apellido": r["apellido"],
+                "idc": idc,
+                "ts": r["_ingest_ts"],
+            }
+            for (_, r), idc in zip(clean.iterrows(), coerce.norm_id(clean["id_cliente"]))
+        ]
+        # Estado actual: último por id; historia: una versión por cambio, en la misma transacción
+        last = ~clean.duplicated(subset=["id_cliente"], keep="last").to_numpy()
+        since = cdc.begin(con, run_id)
+        sent = []
+        for p, is_last in zip(params, last):
+            if is_last:
+                con.execute(upsert_sql, p)
+                sent.append((p["idc"], p["fecha"], p["nombre"], p["apellido"], p["ts"]))
+        cdc.record_skips(con, "clientes", since, sent, fresh_since)
+        if hist_sql:
+            versions = {(p["idc"], vf, p["ts"]): {**p, "valid_from": vf} for p, vf in zip(params, clean["_valid_from"])}
+            con.executemany(hist_sql, sorted(versions.values(), key=lambda p: (p["valid_from"], p["ts"] or "")))
+            scd.close_versions(con, "clientes", {p["idc"] for p in params})
+        con.commit()
+        return raw_rows, int(last.sum()), len(quarantine)
+    return raw_rows, len(clean), len(quarantine)
+
+# Limpieza: Productos
+def clean_and_persist_productos_from_raw(
+    con: sqlite3.Connection,
+    upsert_sql: str,
+    source_file: str | None = None,
+    hist_sql: str | None = None,
+    df: pd.DataFrame | None = None,
+    run_id: str | None = None,
+    fresh_since: str | None = None,
+) -> tuple[int, int, int]:
+    where, params = _batch_filter(source_file)
+    if df is None:
+        df = pd.read_sql_query(f"SELECT * FROM raw_productos {where}", con, params=params)
+    raw_rows = len(df)
+    if df.empty:
+        (paths.QUALITY_DIR / "productos_quarantine.csv").touch(exist_ok=True)
+        return 0, 0, 0
+    df = strip_strings(df)
+    for c in ["fecha_entrada", "nombre_producto", "id_producto", "unidades", "precio_unitario", "categoria", "_ingest_ts", "_source_file", "_batch_id"]:
+        if c not in df.columns:
+            df[c] = None
+    src = df.copy()
+    df["_valid_from"] = _valid_from(df["fecha_entrada"])
+    df["fecha_entrada"] = coerce.to_date(df["fecha_entrada"])
+    df["unidades"] = coerce.to_number(df["unidades"])
+    df["precio_unitario"] = coerce.to_money(df["precio_unitario"])
+    valid = validate_productos(df)
+    quarantine = df.loc[~valid].copy()
+    clean = df.loc[valid].copy()
+    if not quarantine.empty:
+        cols_src = ["fecha_entrada", "nombre_producto", "id_producto", "unidades", "precio_unitario", "categoria"]
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for _, r in src.loc[~valid].iterrows():
+            rows.append(("validation_failed", serialize_row_csv_like(r, cols_src), now, r.get("_source_file", ""), r.get("_batch_id", "")))
+        append_quarantine(con, "productos", rows)
+    if not clean.empty:
+        clean = clean.sort_values("_ingest_ts", kind="stable")
+        params = [
+            {
+                "fecha_entrada": str(r["fecha_entrada"]) if pd.notna(r["fecha_entrada"]) else None,
+                "nombre_producto": r["nombre_producto"],
+                "idp": r["id_producto"],
+                "u": float(r["unidades"]),
+                "p": float(r["precio_unitario"]),
+                "cat": r["categoria"],
+                "ts": r["_ingest_ts"],
+            }
+            for _, r in clean.iterrows()
+        ]
+        last = ~clean.duplicated(subset=["id_producto"], keep="last").to_numpy()
+        since = cdc.begin(con, run_id)
+        sent = []
+        for p, is_last in zip(params, last):
+            if is_last:
+                con.execute(upsert_sql, p)
+                sent.append((p["idp"], p["fecha_entrada"], p["nombre_producto"], p["u"], p["p"], p["cat"], p["ts"]))
+        cdc.record_skips(con, "productos", since, sent, fresh_since)
+        if hist_sql:
+            versions = {(p["idp"], vf, p["ts"]): {**p, "valid_from": vf} for p, vf in zip(params, clean["_valid_from"])}
+            con.executemany(hist_sql, sorted(versions.values(), key=lambda p: (p["valid_from"], p["ts"] or "")))
+            scd.close_versions(con, "productos", {p["idp"] for p in params})
+        con.commit()
+        return raw_rows, int(last.sum()), len(quarantine)
+    return raw_rows, len(clean), len(quarantine)
+
+# Parquet = instantánea de las tablas clean_* (fuente de verdad del reporte)
+PARQUET_EXPORTS = {
+    "ventas": ("clean_ventas", ["fecha", "id_cliente", "id_producto", "unidades", "precio_unitario", "_ingest_ts"]),
+    "clientes": ("clean_clientes", ["id_cliente", "nombre", "apellido", "fecha"]),
+    "productos": ("clean_productos", ["id_producto", "nombre_producto", "categoria", "precio_unitario", "unidades", "fecha_entrada"]),
+}
+
+def export_parquet(con: sqlite3.Connection, shard_dir: Path | None = None):
+    for kind, (table, cols) in PARQUET_EXPORTS.items():
+        if kind == "ventas" and shard_dir is not None:
+            df = read_clean_ventas(con, shard_dir)[cols]
+        else:
+            df = pd.read_sql_query(f"SELECT {', '.join(cols)} FROM {table}", con)
+        if kind == "ventas":
+            # Dos copias ordenadas (por cliente y por producto) para búsquedas puntuales (ut1/lookup.py)
+            from ut1 import lookup
+            for key, name in lookup.SORTED_FILES.items():
+                lookup.write_sorted(df, paths.PARQUET_DIR / name, key, kind)
+        else:
+            write_parquet(df, paths.PARQUET_DIR / f"{table}.parquet", kind)
+
+def raw_batches(con: sqlite3.Connection, shard_dir: Path | None = None) -> list[tuple[str, str]]:
+    """(kind, _source_file) de todo lo que hay en raw_*, en orden de ingesta."""
+    out = []
+    for kind in ("ventas", "clientes", "productos"):
+        sql = f"SELECT _source_file, MIN(_ingest_ts) AS ts FROM raw_{kind} GROUP BY _source_file"
+        if kind == "ventas" and shard_dir is not None:
+            df = query_all(con, shard_dir, sql)
+            rows = df.groupby("_source_file")["ts"].min().reset_index().itertuples(index=False)
+        else:
+            rows = con.execute(sql).fetchall()
+        out += [(ts, kind, src) for src, ts in rows]
+    return [(kind, src) for _, kind, src in sorted(out, key=lambda r: str(r[0]))]
+
+def clean_all(
+    con: sqlite3.Connection,
+    shard_dir: Path | None = None,
+    run_id: str | None = None,
+    full: bool = False,
+    jobs: int | None = 1,
+    tune=None,
+) -> dict[str, tuple[int, int, int]]:
+    """
+    Limpia batch a batch (una transacción por drop) con los UPSERTs de sql/10_upserts.sql
+    y marca cada uno como `cleaned` en run_journal. Solo limpia los batches que quedaron en
+    `ingested` (nuevos o con otra huella); con `full`, todo lo que hay en raw_*. Con `jobs` > 1, ventas se valida en `jobs` procesos por
+    particiones hash (ut1/parallel.py). Con `tune` (autotune.Session) y sin `jobs`, los
+    procesos los elige el tuner clean.jobs (medido en los batches grandes de ventas, se
+    ajusta de un run al siguiente). Los cambios de clean_* quedan en cdc_changes con
+    `run_id` y en output/cdc/<run_id>.parquet (ut1/cdc.py). Devuelve (raw, clean, quar) acumulado por dominio.
+    """
+    run_id = run_id or journal.new_run_id()
+    upserts = load_upsert_sqls()
+    entries = journal.entries(con)
+    if full:
+        batches = raw_batches(con, shard_dir)
+    else:
+        todo = sorted((e for e in entries.values() if e["state"] == "ingested"), key=lambda e: e["updated_ts"])
+        batches = [(e["kind"], e["_source_file"]) for e in todo]
+    totals = {kind: (0, 0, 0) for kind in ("ventas", "clientes", "productos")}
+    jobs_tuner = tune.tuner("clean.jobs") if tune is not None and jobs is None else None
+    jobs = jobs_tuner.value if jobs_tuner is not None else jobs or 1
+    pool = None
+    if jobs > 1 and any(kind == "ventas" for kind, _ in batches):
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(jobs)
+    try:
+        for kind, src in batches:
+            t0 = time.perf_counter()
+            res = clean_batch(con, kind, src, run_id, shard_dir, upserts, entries.get(src), pool, jobs, tune)
+            totals[kind] = tuple(a + b for a, b in zip(totals[kind], res))
+            if jobs_tuner is not None and kind == "ventas":
+                from ut1.parallel import MIN_ROWS
+                if res[0] >= MIN_ROWS:  # los pequeños se limpian en secuencia con cualquier jobs
+                    jobs_tuner.observe(res[0], time.perf_counter() - t0)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if tune is not None:
+        tune.save(con)
+    for kind in totals:
+        (paths.QUALITY_DIR / f"{kind}_quarantine.csv").touch(exist_ok=True)
+    if batches or not (paths.PARQUET_DIR / "clean_ventas.parquet").exists():
+        export_parquet(con, shard_dir)
+    cdc.export_run(con, run_id)
+    return totals
+
+def clean_batch(
+    con: sqlite3.Connection,
+    kind: str,
+    src: str,
+    run_id: str,
+    shard_dir: Path | None = None,
+    upserts: dict[str, str] | None = None,
+    entry: dict | None = None,
+    pool: Executor | None = None,
+    jobs: int = 1,
+    tune=None,
+) -> tuple[int, int, int]:
+    """Limpia un batch (`_source_file`) y lo marca `cleaned` en run_journal (ventas en `pool` si lo hay)."""
+    upserts = upserts or load_upsert_sqls()
+    if entry and entry["state"] == "ingested":
+        # Reintento tras fallo: fuera la cuarentena de validación del intento anterior
+        con.execute(
+            f"DELETE FROM quarantine_{kind} WHERE _source_file = ? AND _reason LIKE 'validation_failed%' AND _ingest_ts >= ?",
+            (src, entry["updated_ts"]),
+        )
+    # Skips del feed solo de la última ingesta; al relimpiar un batch ya limpio (--full), de nada
+    fresh = (entry["ingest_ts"] or "") if entry and entry["state"] == "ingested" else journal.now_iso()
+    if kind == "ventas" and pool is not None:
+        from ut1.parallel import clean_ventas_parallel
+        res = clean_ventas_parallel(con, upserts["fact_ventas"], pool, jobs, shard_dir, src, run_id, tune, fresh)
+    elif kind == "ventas":
+        res = clean_and_persist_ventas_from_raw(con, upserts["fact_ventas"], shard_dir, src, run_id=run_id, fresh_since=fresh)
+    elif kind == "clientes":
+        res = clean_and_persist_clientes_from_raw(con, upserts["clean_clientes"], src, upserts["hist_clientes"], run_id=run_id, fresh_since=fresh)
+    else:
+        res = clean_and_persist_productos_from_raw(con, upserts["clean_productos"], src, upserts["hist_productos"], run_id=run_id, fresh_since=fresh)
+    if entry:
+        quality.set_failures(con, src, "validation_failed", res[2], checked=res[0], fingerprint=entry["fingerprint"])
+    journal.mark(con, src, "cleaned", run_id, kind=kind)
+    con.commit()
+    return res
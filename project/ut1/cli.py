@@ -0,0 +1,453 @@
+"""
+CLI única del pipeline: `python -m ut1 <subcomando>` (o `python ingest/run.py`).
+
+Al arrancar solo se importa la biblioteca estándar; pandas/pyarrow se cargan
+dentro de los subcomandos que los necesitan (ingest, clean, report, run), así
+`--help`, `status` y los ticks de `watch` sin cambios no pagan ese coste.
+"""
+import argparse
+import json
+import os
+import time
+from contextlib import closing
+from pathlib import Path
+from ut1 import journal, paths, storage
+from ut1.drops import list_drops
+
+def _shard_dir(args):
+    return paths.SHARD_DIR if getattr(args, "shard_ventas", False) else None
+
+def _stage_ingest(con, args):
+    from ut1.ingest import ingest_all_csvs_to_raw
+    counters = ingest_all_csvs_to_raw(
+        con, _shard_dir(args), run_id=args.run_id, full=args.full, dedup=not args.keep_repeats,
+        preflight=args.preflight, tune=args.tune,
+    )
+    con.commit()
+    args.counters = counters
+    print("RAW counters:", counters)
+
+def _stage_clean(con, args):
+    from ut1.clean import clean_all
+    args.clean_counts = clean_all(con, _shard_dir(args), run_id=args.run_id, full=args.full, jobs=args.jobs, tune=args.tune)
+    for kind, res in args.clean_counts.items():
+        print(f"{kind.capitalize()} (raw, clean, quar):", res)
+    from ut1 import rollup
+    print("Cubo oro: días recalculados =", rollup.refresh(con, _shard_dir(args)))
+    if args.arrow:
+        _stage_export(con, args)
+
+def _stage_export(con, args):
+    from ut1.arrow_io import export_all
+    export_all(con, _shard_dir(args), args.arrow or "uncompressed")
+
+def _stage_profile(con, args):
+    from ut1 import quality
+    out = paths.QUALITY_DIR / "profile.json"
+    alerts = quality.write_summary(con, out)
+    print("Perfil de calidad:", out.name, f"({len(alerts)} alertas de deriva)")
+    for a in alerts:
+        print(f"  [DERIVA] {a['kind']}/{a['_source_file']} {a['metric']}: {a['value']:.4g} (ventana {a['baseline']:.4g})")
+
+def _stage_views(con, args):
+    storage.create_views(con)
+    print("Vistas finales:", storage.list_objects(con, "view"))
+    # Con shards, las vistas de ut1.db no ven ventas: oro vía UNION de los shards
+    shard_dir = _shard_dir(args)
+    if shard_dir is not None:
+        from ut1.shards import gold_query, list_shards, shards_range
+        if keys := list_shards(shard_dir):
+            print("Shards de ventas:", keys)
+            print(gold_query(con, shard_dir, "ventas_diarias", *shards_range(keys)).to_string(index=False))
+
+def _stage_report(con, args):
+    from ut1.report import write_report
+    write_report(con)
+    n = journal.advance(con, "cleaned", "published", args.run_id)
+    con.commit()
+    print("Batches publicados:", n)
+
+STAGES = {
+    "ingest": _stage_ingest,
+    "clean": _stage_clean,
+    "export": _stage_export,
+    "profile": _stage_profile,
+    "views": _stage_views,
+    "report": _stage_report,
+}
+PIPELINE = ["ingest", "clean", "profile", "views", "report"]
+
+def run_stages(names: list[str], args) -> int:
+    paths.ensure_output_dirs()
+    args.run_id = journal.new_run_id()
+    print("run_id:", args.run_id)
+    with closing(storage.connect()) as con:
+        storage.apply_schema(con)
+        args.tune = None
+        if getattr(args, "autotune", False):
+            from ut1 import autotune
+            args.tune = autotune.Session(con, autotune.default_limits(args.max_mem, args.max_cpus))
+        for name in names:
+            t0 = time.perf_counter()
+            STAGES[name](con, args)
+            print(f"[{name}] {time.perf_counter() - t0:.2f} s")
+        if args.tune is not None and args.tune.tuners:
+            print("Autoajuste (siguiente valor):", args.tune.summary())
+    return 0
+
+def cmd_status(args) -> int:
+    print("DB:", paths.DB, "(no existe)" if not paths.DB.exists() else "")
+    if paths.DB.exists():
+        with closing(storage.connect()) as con:
+            for t, n in storage.table_counts(con).items():
+                print(f"  {t:<24} {n:>10}")
+            print("  vistas:", storage.list_objects(con, "view"))
+            if "run_journal" in storage.list_objects(con, "table"):
+                print("  journal:", journal.summary(con))
+            if "work_queue" in storage.list_objects(con, "table"):
+                from ut1 import workers
+                if any(q := workers.summary(con)):
+                    print("  cola:", q)
+    drops = [p.name for p in list_drops(paths.DATA)]
+    print("Drops:", drops)
+    shards = sorted(p.name for p in paths.SHARD_DIR.glob("ventas_*.db")) if paths.SHARD_DIR.exists() else []
+    if shards:
+        print("Shards:", shards)
+    return 0
+
+# watch: cada tick solo hace stat() de los drops; el pipeline se lanza si algo cambió
+WATCH_STATE = ".watch_state.json"  # en output/
+
+def _drops_snapshot() -> dict[str, list[int]]:
+    return {p.name: [p.stat().st_size, p.stat().st_mtime_ns] for p in list_drops(paths.DATA)}
+
+def cmd_watch(args) -> int:
+    state = paths.OUT / WATCH_STATE
+    seen = json.loads(state.read_text(encoding="utf-8")) if state.exists() else {}
+    while True:
+        snap = _drops_snapshot()
+        if snap != seen:
+            changed = sorted(n for n in snap if seen.get(n) != snap[n])
+            print("Cambios en drops:", changed)
+            run_stages(PIPELINE, args)
+            seen = snap
+            state.write_text(json.dumps(seen), encoding="utf-8")
+        if args.once:
+            return 0
+        time.sleep(args.interval)
+
+def cmd_kpis(args) -> int:
+    from ut1 import rollup
+    try:
+        args.desde, args.hasta = rollup.check_range(args.desde, args.hasta)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 1
+    with closing(storage.connect()) as con:
+        storage.apply_schema(con)
+        if args.rebuild:
+            print("Cubo oro reconstruido: días =", rollup.rebuild(con, _shard_dir(args)))
+        elif n := rollup.refresh(con, _shard_dir(args)):  # p. ej. cubo vacío tras migrar a claves enteras
+            print("Cubo oro: días recalculados =", n)
+        k = rollup.range_kpis(con, args.desde, args.hasta)
+        print(f"{k['desde']} → {k['hasta']}: ingresos={k['ingresos']:.2f} unidades={k['unidades']:g} "
+              f"líneas={k['lineas']} ticket_medio={k['ticket_medio']:.2f}")
+        print(f"Top {args.top} productos por {args.by}:")
+        for idp, cat, u, imp, n in rollup.top_productos(con, args.desde, args.hasta, args.top, args.by):
+            print(f"  {idp:<10} {cat or '-':<16} unidades={u:g} importe={imp:.2f} líneas={n}")
+        print("Por categoría:")
+        for cat, u, imp, n in rollup.por_categoria(con, args.desde, args.hasta):
+            print(f"  {cat:<16} unidades={u:g} importe={imp:.2f} líneas={n}")
+    return 0
+
+def cmd_publish(args) -> int:
+    from ut1 import publish, rollup
+    with closing(storage.connect()) as con:
+        storage.apply_schema(con)
+        rollup.refresh(con)  # páginas de lo que haya quedado sin agregar
+        stats = publish.publish(con, site_dir=args.site_dir, jobs=args.jobs, full=args.full)
+    print(f"Páginas en {args.site_dir}:", stats)
+    return 0
+
+def cmd_profile(args) -> int:
+    from ut1 import quality
+    with closing(storage.connect()) as con:
+        storage.apply_schema(con)
+        profiles = quality.load(con, args.kind, args.batches or None)
+        if not profiles:
+            print("Sin perfiles (ejecuta ingest primero)")
+            return 0
+        for kind in sorted({p.kind for p in profiles}):
+            ps = [p for p in profiles if p.kind == kind]
+            print(f"{kind} ({len(ps)} batches):")
+            print("  " + quality.format_metrics(quality.merge_all(ps).metrics()))
+        for a in quality.drift(quality.load(con, args.kind), args.window):
+            if not args.batches or {a["_batch_id"], a["_source_file"]} & set(args.batches):
+                print(f"[DERIVA] {a['kind']}/{a['_source_file']} {a['metric']}: {a['value']:.4g} (ventana {a['baseline']:.4g})")
+    return 0
+
+def cmd_replay(args) -> int:
+    from ut1 import replay
+    paths.ensure_output_dirs()
+    with closing(storage.connect()) as con:
+        storage.apply_schema(con)
+        if args.list:
+            for reason, batch, n in replay.summary(con, args.kind):
+                print(f"  {reason:<32} {batch:<24} {n:>8}")
+            return 0
+        res = replay.replay(con, args.kind, args.reason, args.batch, args.source, _shard_dir(args), args.dry_run, args.rewrite_csv)
+        print(f"Replay {args.kind}:", res)
+    return 0
+
+def cmd_worker(args) -> int:
+    from ut1 import workers
+    paths.ensure_output_dirs()
+    kwargs = {"shard_dir": _shard_dir(args), "lease_s": args.lease, "max_files": args.max_files, "wal": args.wal}
+    if args.processes > 1:
+        stats = workers.run_pool(args.processes, **kwargs)
+    else:
+        stats = [workers.run_worker(owner=args.id, **kwargs)]
+    for s in stats:
+        print("Worker:", s)
+    with closing(storage.connect()) as con:
+        print("Cola:", workers.summary(con))
+    print("Para exportar y publicar: python -m ut1 run")
+    return 0
+
+def cmd_cdc(args) -> int:
+    from ut1 import cdc
+    with closing(storage.connect()) as con:
+        storage.apply_schema(con)
+        if args.enable or args.disable:
+            cdc.set_enabled(con, args.enable)
+            print("Feed CDC:", "encendido" if args.enable else "apagado (los consumidores releen las tablas al encenderlo)")
+            return 0
+        if _shard_dir(args) is not None:
+            cdc.drain_shards(con, _shard_dir(args))
+            con.commit()
+        if args.export:
+            print("Exportado:", cdc.export_run(con, args.export))
+            return 0
+        if args.prune:
+            print("Filas borradas (ya procesadas por todos los consumidores):", cdc.prune(con))
+            return 0
+        if not args.consumer:
+            for run_id, entity, op, n in cdc.summary(con, args.run):
+                print(f"  {run_id or '-':<24} {entity:<10} {op:<7} {n:>9}")
+            return 0
+        if args.from_now:
+            cdc.ack(con, args.consumer, cdc.last_seq(con))
+            print(f"Cursor de {args.consumer} en seq {cdc.cursor(con, args.consumer)}")
+            return 0
+        rows = cdc.read(con, cdc.cursor(con, args.consumer), args.limit, args.entity, args.op)
+        for r in rows:
+            if args.json:
+                print(json.dumps(dict(zip(cdc.COLUMNS, r)), ensure_ascii=False))
+            else:
+                print(" ".join(str(v) for v in r))
+        if rows and args.ack:
+            cdc.ack(con, args.consumer, rows[-1][0])
+        print(f"{len(rows)} cambios" + (f"; cursor de {args.consumer} en seq {rows[-1][0]}" if rows and args.ack else ""))
+    return 0
+
+def cmd_lookup(args) -> int:
+    from ut1 import lookup
+    column, value = ("id_cliente", args.cliente) if args.cliente else ("id_producto", args.producto)
+    args.parquet_dir = args.parquet_dir or paths.PARQUET_DIR
+    if not (args.parquet_dir / lookup.SORTED_FILES[column]).exists():
+        print(f"[ERROR] No existe {lookup.SORTED_FILES[column]} en {args.parquet_dir}: ejecuta antes `python -m ut1 clean`")
+        return 1
+    df, stats = lookup.lookup(column, value, args.parquet_dir)
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+        print(f"{len(df)} filas → {args.csv}")
+    else:
+        print(df.to_string(index=False) if not df.empty else f"Sin ventas para {value}")
+    print(lookup.format_stats(stats))
+    return 0
+
+def cmd_tune(args) -> int:
+    from ut1 import autotune
+    with closing(storage.connect()) as con:
+        storage.apply_schema(con)
+        host = None if args.all_hosts else autotune.host_id()
+        if args.reset:
+            print("Medidas borradas:", autotune.reset(con, host))
+            return 0
+        rows = autotune.learned(con, host)
+        if not rows:
+            print("Sin medidas (ejecuta ingest/clean/run con --autotune)")
+            return 0
+        limits = autotune.default_limits()
+        session = autotune.Session(con, limits)
+        for h, knob, value, rate, rss, samples, ts in rows:
+            mark = " *" if h == session.host and session.tuner(knob).best() == value else ""
+            print(f"  {h:<16} {knob:<22} {value:>8} {rate or 0:>12,.0f} filas/s {rss:>8.0f} MiB {samples:>4} muestras{mark}")
+        print(f"* = mejor valor en este host (límites por defecto: {limits.mem_mib:.0f} MiB, {limits.cpus} CPUs)")
+    return 0
+
+def cmd_fleet(args) -> int:
+    from ut1 import fleet
+    roots = fleet.tenant_roots(args.roots, args.from_file)
+    if not roots:
+        print("[ERROR] Sin tenants: pasa raíces o --from-file")
+        return 1
+    # Las mismas opciones que `run` para cada tenant (sin lo propio de fleet, que no se serializa)
+    options = {k: v for k, v in vars(args).items() if k not in ("cmd", "func", "root", "roots", "from_file", "workers", "summary")}
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(roots)))
+    results, wall = fleet.run_fleet(roots, options, workers)
+    summary = fleet.summarize(results, wall, workers)
+    print(fleet.format_summary(summary))
+    print("Resumen:", fleet.write_summary(results, summary, args.summary or paths.OUT / "fleet.json"))
+    return 1 if summary["error"] else 0
+
+def cmd_preflight(args) -> int:
+    from ut1 import preflight
+    files = args.files or list_drops(paths.DATA)
+    results = [preflight.check(f, reject=args.reject, flag=args.flag) for f in files]
+    for r in results:
+        print(json.dumps(r, ensure_ascii=False) if args.json else preflight.format_result(r))
+    return 1 if any(r["estado"] == "rechazar" for r in results) else 0
+
+def cmd_bench(args) -> int:
+    from ut1.bench import run_benchmarks
+    return run_benchmarks(args.names, repeat=args.repeat)
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="ut1", description="Pipeline UT1: bronce → plata → oro → reporte")
+    ap.add_argument("--root", type=Path, help="Raíz de un tenant: usa <root>/data/drops y <root>/output en vez de los del proyecto")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    # Opciones compartidas, agrupadas por lo que tocan: cada subcomando hereda solo las que usa
+    def parent() -> argparse.ArgumentParser:
+        return argparse.ArgumentParser(add_help=False)
+    shard = parent()
+    shard.add_argument("--shard-ventas", action="store_true", help="Guarda raw/clean de ventas en un SQLite por mes (output/shards/)")
+    full = parent()
+    full.add_argument("--full", action="store_true", help="Reingiere y relimpia todo (por defecto, solo los drops nuevos o cambiados)")
+    full.add_argument("--resume", action="store_true", help=argparse.SUPPRESS)  # ya es lo normal; se acepta por compatibilidad
+    ingest = parent()
+    ingest.add_argument("--keep-repeats", action="store_true", help="Guarda también las filas idénticas a otras ya ingeridas")
+    ingest.add_argument("--preflight", action="store_true", help="No ingiere los drops que el preflight por muestreo rechaza")
+    clean = parent()
+    clean.add_argument("--jobs", type=int, help="Procesos para limpiar ventas por particiones hash (por defecto 1, o el autoajuste)")
+    arrow = parent()
+    arrow.add_argument("--arrow", choices=["uncompressed", "lz4"], help="Exporta también clean_* y oro a output/arrow/ (Arrow IPC)")
+    tune = parent()
+    tune.add_argument("--autotune", action="store_true", help="Ajusta trozos y workers midiendo filas/s y RSS; aprende por host en ut1.db")
+    tune.add_argument("--max-mem", type=float, help="Límite de RSS para el autoajuste, en MiB (por defecto, la mitad de la RAM)")
+    tune.add_argument("--max-cpus", type=int, help="Límite de CPUs para el autoajuste (por defecto, todas)")
+    pipeline = [shard, full, ingest, clean, arrow, tune]
+
+    for name, parents, help_ in [
+        ("ingest", [shard, full, ingest, tune], "Drops CSV → raw_* (+ cuarentena de parseo)"),
+        ("clean", [shard, full, clean, arrow, tune], "raw_* → clean_* + Parquet (+ cuarentena de validación)"),
+        ("export", [shard, arrow], "clean_* y tablas oro → output/arrow/*.arrow (Arrow IPC, para leer con mmap)"),
+        ("views", [shard], "Crea las vistas oro (sql/20_views.sql)"),
+        ("report", [], "Genera output/reporte.md desde Parquet"),
+    ]:
+        p = sub.add_parser(name, parents=parents, help=help_)
+        p.set_defaults(func=lambda a, n=name: run_stages([n], a))
+    p = sub.add_parser("run", parents=pipeline, help="Pipeline completo: ingest → clean → profile → views → report")
+    p.set_defaults(func=lambda a: run_stages(PIPELINE, a))
+
+    p = sub.add_parser("status", help="Resumen de tablas, drops y shards (sin pandas)")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("watch", parents=pipeline, help="Relanza el pipeline cuando cambian los drops")
+    p.add_argument("--interval", type=float, default=5.0, help="Segundos entre ticks")
+    p.add_argument("--once", action="store_true", help="Un solo tick y salir")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("profile", help="Perfil de calidad fusionado y alertas de deriva (sin pandas)")
+    p.add_argument("batches", nargs="*", help="_batch_id o fichero a fusionar (por defecto, todos)")
+    p.add_argument("--kind", choices=["ventas", "clientes", "productos"])
+    p.add_argument("--window", type=int, default=5, help="Batches anteriores con los que comparar")
+    p.set_defaults(func=cmd_profile)
+
+    p = sub.add_parser("replay", parents=[shard], help="Reprocesa filas de cuarentena con las reglas actuales")
+    p.add_argument("kind", choices=["ventas", "clientes", "productos"])
+    p.add_argument("--reason", action="append", help="_reason exacto (repetible)")
+    p.add_argument("--batch", action="append", help="_batch_id (repetible)")
+    p.add_argument("--source", action="append", help="_source_file (repetible)")
+    p.add_argument("--dry-run", action="store_true", help="Solo cuenta lo seleccionado y lo que sigue mal formado")
+    p.add_argument("--list", action="store_true", help="Filas en cuarentena por motivo y batch")
+    p.add_argument("--rewrite-csv", action="store_true", help="Regenera output/quality/<kind>_quarantine.csv desde la tabla")
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser("kpis", parents=[shard], help="KPIs y top-N de un rango de fechas desde el cubo oro (sin pandas)")
+    p.add_argument("--desde", default="0001-01-01", help="Fecha inicial AAAA-MM-DD (incluida)")
+    p.add_argument("--hasta", default="9999-12-31", help="Fecha final AAAA-MM-DD (incluida)")
+    p.add_argument("--top", type=int, default=5)
+    p.add_argument("--by", choices=["importe", "unidades", "lineas"], default="importe")
+    p.add_argument("--rebuild", action="store_true", help="Recalcula el cubo entero desde clean_ventas")
+    p.set_defaults(func=cmd_kpis)
+
+    p = sub.add_parser("publish", help="Páginas por día, mes y categoría en site/content/reportes/ (solo las que cambiaron)")
+    p.add_argument("--full", action="store_true", help="Rehace todas las páginas y borra las de periodos que ya no existen")
+    p.add_argument("--jobs", type=int, help="Procesos para renderizar (por defecto, hasta 4)")
+    p.add_argument("--site-dir", type=Path, default=paths.SITE_REPORTS, help="Carpeta destino")
+    p.set_defaults(func=cmd_publish)
+
+    p = sub.add_parser("worker", parents=[shard], help="Reclama drops de la cola compartida y los pasa por ingest + clean")
+    p.add_argument("--processes", type=int, default=1, help="Workers locales en procesos separados")
+    p.add_argument("--lease", type=float, default=60.0, help="Segundos de lease (se renueva cada tercio)")
+    p.add_argument("--max-files", type=int, help="Sale tras completar este número de drops")
+    p.add_argument("--id", help="Identificador del worker (por defecto host:pid)")
+    p.add_argument("--wal", action="store_true", help="journal_mode=WAL (solo si todos los workers están en este host)")
+    p.set_defaults(func=cmd_worker)
+
+    p = sub.add_parser("cdc", parents=[shard], help="Feed de cambios de clean_*: resumen por run o deltas desde el cursor de un consumidor")
+    p.add_argument("--consumer", help="Nombre del consumidor: lista los cambios posteriores a su cursor")
+    p.add_argument("--ack", action="store_true", help="Avanza el cursor hasta el último cambio listado")
+    p.add_argument("--from-now", action="store_true", help="Pone el cursor del consumidor en el último cambio (tras cargar la instantánea Parquet)")
+    p.add_argument("--limit", type=int, help="Máximo de cambios por lectura")
+    p.add_argument("--entity", choices=["ventas", "clientes", "productos"])
+    p.add_argument("--op", action="append", choices=["insert", "update", "delete", "skip"], help="Solo estas operaciones (repetible)")
+    p.add_argument("--run", help="Resumen de un solo run_id")
+    p.add_argument("--export", metavar="RUN_ID", help="Escribe output/cdc/<RUN_ID>.parquet")
+    p.add_argument("--prune", action="store_true", help="Borra lo que ya han procesado todos los consumidores")
+    p.add_argument("--json", action="store_true", help="Un objeto JSON por cambio")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--enable", action="store_true", help="Enciende el feed (por defecto lo está)")
+    g.add_argument("--disable", action="store_true", help="Apaga el feed: clean deja de anotar cambios y no paga los triggers")
+    p.set_defaults(func=cmd_cdc)
+
+    p = sub.add_parser("lookup", help="Ventas de un cliente o producto desde el Parquet ordenado (poda por estadísticas y Bloom)")
+    g = p.add_mutually_exclusive_group(required=True)
+    g.add_argument("--cliente", help="id_cliente, p. ej. C123")
+    g.add_argument("--producto", help="id_producto, p. ej. P045")
+    p.add_argument("--parquet-dir", type=Path, help="Por defecto, output/parquet")
+    p.add_argument("--csv", type=Path, help="Escribe las filas en este CSV en lugar de mostrarlas")
+    p.set_defaults(func=cmd_lookup)
+
+    p = sub.add_parser("tune", help="Lo aprendido por el autoajuste (--autotune) en este host")
+    p.add_argument("--all-hosts", action="store_true", help="Todos los hosts que comparten ut1.db")
+    p.add_argument("--reset", action="store_true", help="Borra lo medido (vuelve a explorar en el siguiente run)")
+    p.set_defaults(func=cmd_tune)
+
+    p = sub.add_parser("fleet", parents=pipeline, help="Pipeline completo de muchos tenants (raíces con data/drops) sobre un pool compartido")
+    p.add_argument("roots", nargs="*", type=Path, help="Raíces de los tenants: <raíz>/data/drops → <raíz>/output/")
+    p.add_argument("--from-file", type=Path, help="Fichero con una raíz por línea")
+    p.add_argument("--workers", type=int, help="Procesos del pool (por defecto, uno por CPU)")
+    p.add_argument("--summary", type=Path, help="JSON con el resumen por tenant y de la flota (por defecto, output/fleet.json)")
+    p.set_defaults(func=cmd_fleet)
+
+    p = sub.add_parser("preflight", help="Estima por muestreo la cuarentena de cada drop antes de ingerirlo (sin leerlo entero)")
+    p.add_argument("files", nargs="*", type=Path, help="Drops a revisar (por defecto, los de data/drops)")
+    p.add_argument("--reject", type=float, default=0.5, help="Rechaza si el límite inferior del IC95 supera esta tasa")
+    p.add_argument("--flag", type=float, default=0.05, help="Marca para revisar si la tasa estimada supera esta")
+    p.add_argument("--json", action="store_true", help="Un objeto JSON por drop")
+    p.set_defaults(func=cmd_preflight)
+
+    p = sub.add_parser("bench", help="Microbenchmarks (por defecto, todos)")
+    p.add_argument("names", nargs="*", help="Benchmarks a ejecutar")
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=cmd_bench)
+    return ap
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.root:
+        paths.set_root(args.root)
+    return args.func(args)
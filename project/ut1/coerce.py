@@ -0,0 +1,83 @@
+"""
+Coerción memoizada de valores muy repetidos (fechas, ids, nombres, precios).
+
+Un lote de ventas tiene millones de filas pero solo cientos de fechas y miles de
+ids distintos. Cada MemoCoercer factoriza la columna, aplica la transformación
+vectorizada solo a los valores únicos que no están en su LRU y reexpande el
+resultado con los códigos. La LRU vive en el proceso, así que se mantiene
+caliente entre trozos y entre ejecuciones de `watch`.
+
+Por eso cada transformación tiene que dar lo mismo para un valor sea cual sea el lote
+en que llegue: las fechas no dejan que pandas deduzca el formato del primer valor del
+lote (parse_dates), o lo cacheado dependería de los drops anteriores.
+"""
+import re
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from ut1.utils import to_float_money
+
+NAME_RE = re.compile(r"^[A-Za-zÁÉÍÓÚÜÑáéíóúüñ\s'-]+$")
+_NA = object()  # clave de caché para nulos (NaN != NaN)
+
+class MemoCoercer:
+    def __init__(self, fn, dtype: str | None = None, maxsize: int = 100_000):
+        self.fn = fn  # Series de únicos → Series de resultados (misma longitud y orden)
+        self.dtype = dtype
+        self.maxsize = maxsize
+        self.cache: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, s: pd.Series) -> pd.Series:
+        codes, uniques = pd.factorize(s, use_na_sentinel=False)
+        uniques = pd.Series(uniques, dtype=object)
+        keys = [_NA if pd.isna(u) else u for u in uniques]
+        out = np.empty(len(keys), dtype=object)
+        miss = []
+        for i, k in enumerate(keys):
+            if k in self.cache:
+                out[i] = self.cache[k]
+                self.cache.move_to_end(k)
+            else:
+                miss.append(i)
+        if miss:
+            computed = self.fn(uniques.iloc[miss].reset_index(drop=True)).tolist()
+            for i, v in zip(miss, computed):
+                out[i] = v
+                self.cache[keys[i]] = v
+            while len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+        self.hits += len(keys) - len(miss)
+        self.misses += len(miss)
+        return pd.Series(out.take(codes), index=s.index, name=s.name, dtype=self.dtype)
+
+    def clear(self):
+        self.cache.clear()
+        self.hits = self.misses = 0
+
+def parse_dates(u: pd.Series) -> pd.Series:
+    """Fechas valor a valor: ISO 8601 vectorizado y, para el resto, formato deducido por elemento (con zona → UTC)."""
+    out = pd.to_datetime(u, errors="coerce", format="ISO8601", utc=True)
+    rest = out.isna() & u.notna()
+    if rest.any():
+        out[rest] = pd.to_datetime(u[rest], errors="coerce", format="mixed", utc=True)
+    return out.dt.tz_localize(None)
+
+def _name_ok(u: pd.Series) -> pd.Series:
+    u = u.fillna("")
+    return u.str.len().gt(0) & u.str.match(NAME_RE)
+
+# Transformaciones compartidas por las tres limpiezas (equivalentes a las versiones fila a fila)
+to_date = MemoCoercer(lambda u: parse_dates(u).dt.date)
+is_date = MemoCoercer(lambda u: parse_dates(u).notna(), dtype="bool")
+to_number = MemoCoercer(lambda u: pd.to_numeric(u, errors="coerce"), dtype="float64")
+to_money = MemoCoercer(lambda u: u.map(to_float_money), dtype="float64")
+norm_id = MemoCoercer(lambda u: u.fillna("").str.upper().str.strip())
+is_name = MemoCoercer(_name_ok, dtype="bool")
+
+ALL = {"to_date": to_date, "is_date": is_date, "to_number": to_number, "to_money": to_money, "norm_id": norm_id, "is_name": is_name}
+
+def clear_caches():
+    for c in ALL.values():
+        c.clear()
@@ -0,0 +1,46 @@
+"""
+Ficheros de data/drops: CSV planos o comprimidos (.gz, .bz2, .zst).
+
+Solo biblioteca estándar (zstd usa el paquete opcional `zstandard`), para que
+`status` y `watch` puedan listar drops sin importar pandas. Los comprimidos se
+leen en streaming: nunca se descomprimen a disco.
+"""
+import bz2
+import gzip
+import io
+from pathlib import Path
+
+COMPRESSED_SUFFIXES = {".gz": "gzip", ".gzip": "gzip", ".bz2": "bz2", ".zst": "zstd", ".zstd": "zstd"}
+
+def codec(f: Path) -> str | None:
+    return COMPRESSED_SUFFIXES.get(f.suffix.lower())
+
+def inner_name(f: Path) -> str:
+    """Nombre del CSV de dentro: 'ventas.csv.gz' → 'ventas.csv'."""
+    return f.stem if codec(f) else f.name
+
+def is_drop(f: Path) -> bool:
+    return f.is_file() and Path(inner_name(f)).suffix.lower() == ".csv"
+
+def list_drops(data_dir: Path) -> list[Path]:
+    if not data_dir.exists():
+        return []
+    return sorted(p for p in data_dir.iterdir() if is_drop(p))
+
+def _open_zstd(f: Path):
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(f"{f.name}: para leer .zst instala 'zstandard'") from e
+    return zstandard.ZstdDecompressor().stream_reader(open(f, "rb"), read_across_frames=True, closefd=True)
+
+def open_drop(f: Path, encoding: str = "utf-8") -> io.TextIOBase:
+    """Abre un drop como texto, descomprimiendo al vuelo según la extensión."""
+    c = codec(f)
+    if c == "gzip":
+        return gzip.open(f, "rt", encoding=encoding)
+    if c == "bz2":
+        return bz2.open(f, "rt", encoding=encoding)
+    if c == "zstd":
+        return io.TextIOWrapper(io.BufferedReader(_open_zstd(f)), encoding=encoding)
+    return open(f, "r", encoding=encoding)
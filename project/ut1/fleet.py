@@ -0,0 +1,153 @@
+"""
+Varios tenants (tiendas) en un solo proceso lanzador: `python -m ut1 fleet RAIZ ...`.
+
+Cada raíz tiene la estructura del proyecto (data/drops → output/ut1.db, output/parquet/...).
+Los tenants se reparten por un pool de procesos compartido, los más pesados primero
+(bytes de drops) para que el último en acabar no sea uno grande. Cada worker importa
+pandas/pyarrow una vez y pasa tenant tras tenant: apunta paths a la raíz (paths.set_root)
+y ejecuta el mismo pipeline que `run`, con su salida en <raíz>/output/run.log.
+
+Un tenant que falla no para a los demás: queda como "error" en el resumen de la flota
+(por tenant y agregado), que se escribe en JSON.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+import traceback
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from ut1 import paths
+from ut1.drops import list_drops
+
+LOG_NAME = "run.log"
+
+def tenant_roots(roots: list[Path], from_file: Path | None = None) -> list[Path]:
+    """Raíces de la línea de comandos y de `from_file` (una por línea, # comenta), sin repetir."""
+    roots = list(roots)
+    if from_file is not None:
+        for line in from_file.read_text(encoding="utf-8").splitlines():
+            if line := line.split("#", 1)[0].strip():
+                roots.append(Path(line))
+    seen, out = set(), []
+    for r in roots:
+        r = r.resolve()
+        if r not in seen:
+            seen.add(r)
+            out.append(r)
+    return out
+
+def drop_bytes(root: Path) -> int:
+    return sum(f.stat().st_size for f in list_drops(root / "data" / "drops"))
+
+def _warm():
+    """Inicializador del pool: las importaciones pesadas, una vez por worker."""
+    import ut1.clean, ut1.ingest, ut1.report  # noqa: F401
+
+def run_tenant(root: Path, options: dict) -> dict:
+    """Pipeline completo de un tenant en este proceso; salida a <raíz>/output/run.log."""
+    from ut1.cli import PIPELINE, run_stages
+    res = {"tenant": root.name, "root": str(root), "estado": "ok", "pid": os.getpid(), "drops": 0, "mib": 0.0,
+           "filas": 0, "limpias": 0, "cuarentena": 0, "segundos": 0.0, "error": None}
+    t0 = time.perf_counter()
+    if not (root / "data" / "drops").is_dir():
+        res.update(estado="error", error="sin data/drops")
+        return res
+    paths.set_root(root)
+    paths.ensure_output_dirs()
+    drops = list_drops(paths.DATA)
+    res.update(drops=len(drops), mib=round(sum(f.stat().st_size for f in drops) / 2**20, 3))
+    args = Namespace(**options)
+    # stdout/stderr a nivel de descriptor: también recoge lo que escriban los procesos hijos (--jobs)
+    with open(paths.OUT / LOG_NAME, "w", encoding="utf-8") as log:
+        saved = [os.dup(1), os.dup(2)]
+        try:
+            for fd in (1, 2):
+                os.dup2(log.fileno(), fd)
+            run_stages(PIPELINE, args)
+        except Exception as e:
+            traceback.print_exc()
+            res.update(estado="error", error=f"{type(e).__name__}: {e}")
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, s in zip((1, 2), saved):
+                os.dup2(s, fd)
+                os.close(s)
+    res["filas"] = sum(getattr(args, "counters", {}).values())
+    for raw, clean, quar in getattr(args, "clean_counts", {}).values():
+        res["limpias"] += clean
+        res["cuarentena"] += quar
+    res["segundos"] = round(time.perf_counter() - t0, 3)
+    return res
+
+def run_fleet(roots: list[Path], options: dict, workers: int | None = None, progress=print) -> tuple[list[dict], float]:
+    """Todos los tenants sobre `workers` procesos. Devuelve (resultados por tenant, segundos de pared)."""
+    workers = max(1, min(workers or os.cpu_count() or 1, len(roots)))
+    order = sorted(roots, key=drop_bytes, reverse=True)
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(workers, initializer=_warm) as ex:
+        futs = {ex.submit(run_tenant, r, options): r for r in order}
+        for fut in as_completed(futs):
+            try:
+                res = fut.result()
+            except Exception as e:  # el worker murió (p. ej. sin memoria)
+                r = futs[fut]
+                res = {"tenant": r.name, "root": str(r), "estado": "error", "error": f"{type(e).__name__}: {e}"}
+            results.append(res)
+            if progress:
+                progress(format_tenant(res, len(results), len(roots)))
+    return results, time.perf_counter() - t0
+
+def format_tenant(res: dict, i: int, n: int) -> str:
+    if res["estado"] != "ok":
+        log = Path(res["root"]) / "output" / LOG_NAME
+        return f"[{i}/{n}] {res['tenant']:<20} ERROR {res['error']}" + (f" (ver {log})" if log.exists() else "")
+    return (f"[{i}/{n}] {res['tenant']:<20} {res['segundos']:7.2f} s {res['filas']:>10,} filas "
+            f"{res['cuarentena']:>7,} en cuarentena  (pid {res['pid']})")
+
+def summarize(results: list[dict], wall_s: float, workers: int) -> dict:
+    """Agregado de la flota: tenants ok/error, filas, filas/s de pared y reparto de tiempos por tenant."""
+    ok = [r for r in results if r["estado"] == "ok"]
+    secs = sorted(r["segundos"] for r in ok)
+    rows = sum(r["filas"] for r in ok)
+    return {
+        "tenants": len(results),
+        "ok": len(ok),
+        "error": len(results) - len(ok),
+        "workers": workers,
+        "segundos_pared": round(wall_s, 3),
+        "segundos_tenants": round(sum(secs), 3),
+        "filas": rows,
+        "limpias": sum(r["limpias"] for r in ok),
+        "cuarentena": sum(r["cuarentena"] for r in ok),
+        "mib": round(sum(r["mib"] for r in ok), 3),
+        "filas_s": round(rows / wall_s) if wall_s > 0 else 0,
+        "tenant_p50_s": round(statistics.median(secs), 3) if secs else None,
+        "tenant_max_s": secs[-1] if secs else None,
+        "mas_lentos": [r["tenant"] for r in sorted(ok, key=lambda r: r["segundos"], reverse=True)[:5]],
+        "fallidos": {r["tenant"]: r["error"] for r in results if r["estado"] != "ok"},
+    }
+
+def write_summary(results: list[dict], fleet: dict, out: Path) -> Path:
+    out.parent.mkdir(parents=True, exist_ok=True)
+    doc = {"flota": fleet, "tenants": sorted(results, key=lambda r: r["tenant"])}
+    out.write_text(json.dumps(doc, ensure_ascii=False, indent=2), encoding="utf-8")
+    return out
+
+def format_summary(fleet: dict) -> str:
+    lines = [
+        f"Tenants: {fleet['ok']}/{fleet['tenants']} ok · {fleet['workers']} workers · "
+        f"{fleet['segundos_pared']:.2f} s de pared ({fleet['segundos_tenants']:.2f} s sumando tenants)",
+        f"Filas: {fleet['filas']:,} ({fleet['filas_s']:,} filas/s de la flota) · limpias {fleet['limpias']:,} · "
+        f"cuarentena {fleet['cuarentena']:,} · {fleet['mib']:.1f} MiB de drops",
+    ]
+    if fleet["tenant_p50_s"] is not None:
+        lines.append(f"Por tenant: mediana {fleet['tenant_p50_s']:.2f} s, máximo {fleet['tenant_max_s']:.2f} s "
+                     f"(más lentos: {', '.join(fleet['mas_lentos'])})")
+    for t, err in fleet["fallidos"].items():
+        lines.append(f"[ERROR] {t}: {err}")
+    return "\n".join(lines)
@@ -0,0 +1,260 @@
+"""Bronce: lectura de drops CSV, cuarentena de parseo y carga en raw_*."""
+import sqlite3
+from datetime import datetime, timezone
+from io import StringIO
+from itertools import chain
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from ut1 import journal, keys, paths, quality, rowdedup
+from ut1.drops import inner_name, list_drops, open_drop
+from ut1.outputs import append_quarantine
+from ut1.shards import delete_from_shards, write_raw_ventas
+from ut1.utils import strip_strings
+
+def classify_file(fname: str) -> str | None:
+    n = fname.lower()
+    if any(k in n for k in ["ventas", "venta"]):
+        return "ventas"
+    if any(k in n for k in ["clientes", "cliente"]):
+        return "clientes"
+    if any(k in n for k in ["productos", "producto"]):
+        return "productos"
+    return None
+
+# Detección de líneas mal formadas por conteo de separadores (en streaming, también comprimidos)
+def split_good_bad_lines(f: Path) -> tuple[list[str], list[str]]:
+    with open_drop(f) as fh:
+        return _split_lines(line.rstrip("\r\n") for line in fh)
+
+def split_text(text: str, header: str | None = None) -> tuple[list[str], list[str]]:
+    """Como split_good_bad_lines, sobre texto ya leído; con `header`, un trozo del drop sin su cabecera."""
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    return _split_lines(iter(lines) if header is None else chain([header], lines))
+
+def _split_lines(lines) -> tuple[list[str], list[str]]:
+    header = next(lines, None)
+    if header is None:
+        return [], []
+    expected_cols = header.count(",") + 1
+    good = [header]
+    bad = []
+    for line in lines:
+        cols = line.count(",") + 1
+        if cols == expected_cols and line.strip():
+            good.append(line)
+        else:
+            bad.append(line)
+    return good, bad
+
+def parse_lines(good_lines: list[str]) -> pd.DataFrame:
+    """Cabecera + líneas buenas → DataFrame de texto recortado (también lo usa ut1/preflight.py)."""
+    if len(good_lines) <= 1:
+        return pd.DataFrame()
+    buf = StringIO("\n".join(good_lines))
+    df = pd.read_csv(buf, dtype=str, engine="python", on_bad_lines="skip")
+    df = strip_strings(df)
+    if "fecha_venta" in df.columns:
+        df = df.rename(columns={"fecha_venta": "fecha"})
+    return df
+
+def ingest_one(
+    f: Path,
+    con: sqlite3.Connection,
+    kind: str,
+    split: tuple[list[str], list[str]] | None = None,
+    parsed: pd.DataFrame | None = None,
+    ts: str | None = None,
+) -> pd.DataFrame:
+    """
+    Cuarentena de parseo + DataFrame con metadatos. Con `parsed` (parse_lines ya hecho), split solo aporta
+    cabecera y malas. `ts` = _ingest_ts del batch (por defecto, ahora).
+    """
+    batch_id = Path(inner_name(f)).stem.lower()
+    good_lines, bad_lines = split if split is not None else split_good_bad_lines(f)
+    now = ts or datetime.now(timezone.utc).isoformat()
+    if bad_lines:
+        rows = [("parse_error_bad_field_count", bl, now, f.name, batch_id) for bl in bad_lines]
+        append_quarantine(con, kind, rows, header=good_lines[0])
+    df = parse_lines(good_lines) if parsed is None else parsed
+    if df.empty:
+        return df
+    df["_source_file"] = f.name
+    df["_ingest_ts"] = now
+    df["_batch_id"] = batch_id
+    return df
+
+RAW_COLS = {
+    "ventas": ["fecha", "id_cliente", "id_producto", "unidades", "precio_unitario"],
+    "clientes": ["fecha", "nombre", "apellido", "id_cliente"],
+    "productos": ["fecha_entrada", "nombre_producto", "id_producto", "unidades", "precio_unitario", "categoria"],
+}
+META_COLS = ["_ingest_ts", "_source_file", "_batch_id"]
+
+def write_raw(df: pd.DataFrame, con: sqlite3.Connection, kind: str, shard_dir: Path | None = None) -> int:
+    cols = RAW_COLS[kind] + META_COLS
+    for c in cols:
+        if c not in df.columns:
+            df[c] = None
+    df_raw = df[cols].copy()
+    if df_raw.empty:
+        return 0
+    if kind == "ventas" and shard_dir is not None:
+        write_raw_ventas(df_raw, con, shard_dir)
+    else:
+        df_raw.to_sql(f"raw_{kind}", con, if_exists="append", index=False)
+    return len(df_raw)
+
+def purge_batch(con: sqlite3.Connection, kind: str, source_file: str, since: str, shard_dir: Path | None = None):
+    """Borra lo que dejó a medias un intento interrumpido (filas de `source_file` con _ingest_ts >= since)."""
+    where = "WHERE _source_file = ? AND _ingest_ts >= ?"
+    n = con.execute(f"DELETE FROM raw_{kind} {where}", (source_file, since)).rowcount
+    n += con.execute(f"DELETE FROM quarantine_{kind} {where}", (source_file, since)).rowcount
+    rowdedup.forget(con, kind, source_file, since)
+    if kind == "ventas" and shard_dir is not None:
+        n += delete_from_shards(shard_dir, "raw_ventas", where, (source_file, since))
+    con.commit()
+    print(f"Purgado intento previo de {source_file}: {n} filas")
+
+def ingest_all_csvs_to_raw(
+    con: sqlite3.Connection,
+    shard_dir: Path | None = None,
+    data_dir: Path | None = None,
+    io_workers: int | None = None,
+    run_id: str | None = None,
+    full: bool = False,
+    dedup: bool = True,
+    preflight: bool = False,
+    tune=None,
+) -> dict:
+    """
+    Un batch por drop, cada uno en su transacción y anotado en run_journal.
+    Salta los drops ya ingeridos con la misma huella (tamaño + mtime); con `full`, los vuelve a
+    ingerir todos (las filas ya guardadas las descarta el dedupe).
+    Con `dedup`, los reenvíos exactos y las filas iguales a la versión vigente de su clave no se
+    escriben (ut1/rowdedup.py).
+    Con `preflight`, los drops que ut1/preflight.py rechaza se quedan sin ingerir (ni en run_journal).
+    Lectura, parseo y escritura van solapados en etapas (ut1/staged.py), en el orden de los drops.
+    Con `tune` (autotune.Session), los parseos en vuelo se autoajustan y lo medido se guarda.
+    """
+    run_id = run_id or journal.new_run_id()
+    counters = {"ventas": 0, "clientes": 0, "productos": 0}
+    detected = list_drops(data_dir or paths.DATA)
+    print("CSV detectados:", [p.name for p in detected])
+    prev = journal.entries(con)
+    todo, skipped = {}, []
+    for f in detected:
+        kind = classify_file(inner_name(f))
+        if not kind:
+            print("Ignorado (sin match):", f.name)
+            continue
+        fp = journal.fingerprint(f)
+        e = prev.get(f.name)
+        if not full and e and e["fingerprint"] == fp and e["state"] != "pending":
+            skipped.append(f.name)
+            continue
+        if preflight:
+            from ut1.preflight import check, format_result
+            r = check(f, kind)
+            if r["estado"] != "ok":
+                print(format_result(r))
+            if r["estado"] == "rechazar":
+                continue
+        if e and e["state"] == "pending":
+            purge_batch(con, kind, f.name, e["updated_ts"], shard_dir)
+        todo[f] = (kind, fp)
+    if skipped:
+        print("Sin cambios (misma huella):", skipped)
+    if todo:
+        from ut1.staged import format_stats, ingest_staged
+        written, stats = ingest_staged(con, [(f, *v) for f, v in todo.items()], run_id, shard_dir, dedup, io_workers, tune=tune)
+        counters = {k: counters[k] + written[k] for k in counters}
+        print(format_stats(stats))
+        if tune is not None:
+            tune.save(con)
+    return counters
+
+class DropBatch:
+    """
+    Un drop → raw_* por trozos, en la transacción de su batch: al crearlo queda `pending` en run_journal,
+    add() guarda un trozo (cuarentena, dedupe, raw, claves, perfil) y finish() lo deja `ingested`.
+    Todos los trozos llevan el mismo _ingest_ts: purga y replay van por drop.
+    """
+
+    def __init__(
+        self,
+        con: sqlite3.Connection,
+        f: Path,
+        kind: str,
+        fp: str,
+        run_id: str,
+        shard_dir: Path | None = None,
+        dedup: bool = True,
+        blooms: rowdedup.BloomCache | None = None,
+    ):
+        self.con, self.f, self.kind, self.run_id = con, f, kind, run_id
+        self.shard_dir, self.dedup, self.blooms = shard_dir, dedup, blooms
+        batch_id = Path(inner_name(f)).stem.lower()
+        # _ingest_ts de todos los trozos = el de la marca pending (desde ahí purga un reintento)
+        self.ts = journal.mark(con, f.name, "pending", run_id, _batch_id=batch_id, kind=kind, fingerprint=fp)
+        con.commit()
+        self.prof = quality.BatchProfile(kind, batch_id, f.name, fp)
+        self.rows = self.bad = self.repeated = 0
+
+    def add(self, split: tuple[list[str], list[str]], parsed: tuple[pd.DataFrame, np.ndarray] | None = None) -> int:
+        """Un trozo: `split` = ([cabecera, buenas...], malas); `parsed` = (parse_lines, huellas) si ya se calcularon."""
+        con, kind = self.con, self.kind
+        df, fps = parsed if parsed is not None else (None, None)
+        df = ingest_one(self.f, con, kind, split, df, self.ts)
+        repeated = 0
+        if self.dedup:
+            df, repeated = rowdedup.filter_repeats(con, kind, df, RAW_COLS[kind], fps, self.blooms)
+        elif not df.empty:
+            rowdedup.forget_current(con, kind)
+        n = write_raw(df, con, kind, self.shard_dir)
+        if kind == "ventas" and not df.empty:
+            # Claves sustitutas de los ids de la venta, en la transacción del batch
+            keys.ensure(con, "cliente", df["id_cliente"])
+            keys.ensure(con, "producto", df["id_producto"])
+        self.prof.update(df, RAW_COLS[kind])
+        self.rows += n
+        self.bad += len(split[1])
+        self.repeated += repeated
+        return n
+
+    def finish(self) -> int:
+        """Perfil y `ingested`, con commit. Devuelve filas escritas."""
+        if self.repeated:
+            print(f"{self.f.name}: {self.repeated} filas repetidas: reenvíos o iguales a la versión vigente (no se guardan)")
+        self.prof.set_failures("parse_error_bad_field_count", self.bad)
+        if self.repeated:
+            self.prof.set_failures(rowdedup.REASON, self.repeated)
+        quality.save(self.con, self.prof)
+        journal.mark(self.con, self.f.name, "ingested", self.run_id, ingest_ts=self.ts)
+        self.con.commit()
+        return self.rows
+
+def ingest_file(
+    con: sqlite3.Connection,
+    f: Path,
+    kind: str,
+    fp: str,
+    run_id: str,
+    shard_dir: Path | None = None,
+    split: tuple[list[str], list[str]] | None = None,
+    dedup: bool = True,
+    parsed: tuple[pd.DataFrame, np.ndarray] | None = None,
+    blooms: rowdedup.BloomCache | None = None,
+) -> int:
+    """
+    Un drop → raw_* con su perfil, de `pending` a `ingested` en run_journal, en un solo trozo
+    (DropBatch). Devuelve filas escritas.
+    `parsed` = (parse_lines, huellas de fila) ya calculados.
+    `blooms` = filtros de dedupe del run (los guarda quien lo creó, con flush()).
+    """
+    split = split if split is not None else split_good_bad_lines(f)
+    batch = DropBatch(con, f, kind, fp, run_id, shard_dir, dedup, blooms)
+    batch.add(split, parsed)
+    return batch.finish()
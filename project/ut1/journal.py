@@ -0,0 +1,58 @@
+"""
+Diario de ejecución (tabla run_journal): estado de cada batch por etapa.
+
+pending → ingested → cleaned → published. Cada batch (un drop) se procesa en su
+propia transacción y su estado se actualiza en ella, así que un run solo rehace los
+batches nuevos, cambiados (otra huella) o que no llegaron al final de la etapa.
+Solo biblioteca estándar (lo usa `status`).
+"""
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+STATES = ("pending", "ingested", "cleaned", "published")
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def new_run_id() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+def fingerprint(f: Path) -> str:
+    st = f.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def entries(con: sqlite3.Connection) -> dict[str, dict]:
+    cur = con.execute("SELECT _source_file, _batch_id, kind, fingerprint, state, run_id, updated_ts, ingest_ts FROM run_journal")
+    cols = [d[0] for d in cur.description]
+    return {r[0]: dict(zip(cols, r)) for r in cur}
+
+def mark(con: sqlite3.Connection, source_file: str, state: str, run_id: str, **fields) -> str:
+    """Fija el estado de un batch (sin commit: va en la transacción del batch)."""
+    if state not in STATES:
+        raise ValueError(f"Estado desconocido: {state}")
+    ts = now_iso()
+    row = {"_source_file": source_file, "state": state, "run_id": run_id, "updated_ts": ts, **fields}
+    cols = ", ".join(row)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in row if c != "_source_file")
+    con.execute(
+        f"INSERT INTO run_journal ({cols}) VALUES ({', '.join('?' * len(row))}) "
+        f"ON CONFLICT(_source_file) DO UPDATE SET {updates}",
+        tuple(row.values()),
+    )
+    return ts
+
+def in_state(con: sqlite3.Connection, state: str) -> list[dict]:
+    return [e for e in entries(con).values() if e["state"] == state]
+
+def advance(con: sqlite3.Connection, from_state: str, to_state: str, run_id: str) -> int:
+    cur = con.execute(
+        "UPDATE run_journal SET state = ?, run_id = ?, updated_ts = ? WHERE state = ?",
+        (to_state, run_id, now_iso(), from_state),
+    )
+    return cur.rowcount
+
+def summary(con: sqlite3.Connection) -> dict[str, int]:
+    counts = dict(con.execute("SELECT state, COUNT(*) FROM run_journal GROUP BY state").fetchall())
+    return {s: counts.get(s, 0) for s in STATES}
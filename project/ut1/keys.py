@@ -0,0 +1,74 @@
+"""
+Claves sustitutas enteras: diccionarios dim_cliente/dim_producto y `fecha` como número de día.
+
+Los ids de negocio (TEXT) se registran en ingest (ensure) y clean los traduce en bloque
+(resolve): factoriza la columna, busca solo los valores únicos y reexpande con los
+códigos. `fecha_dia` = días desde 1970-01-01, igual que date(fecha_dia * 86400, 'unixepoch')
+en las vistas. La vista clean_ventas (sql/00_schema.sql) devuelve las claves naturales.
+"""
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# kind → (tabla diccionario, columna sk, columna natural)
+DIMS = {
+    "cliente": ("dim_cliente", "cliente_sk", "id_cliente"),
+    "producto": ("dim_producto", "producto_sk", "id_producto"),
+}
+BATCH = 500  # ids por consulta IN (...), por debajo del límite de parámetros de SQLite
+
+def ensure(con: sqlite3.Connection, dim: str, ids) -> int:
+    """Da de alta los ids que aún no tienen clave (sin commit). Devuelve cuántos eran nuevos."""
+    table, _, natural = DIMS[dim]
+    values = pd.unique(pd.Series(ids, dtype=object).dropna())
+    values = [v for v in values if v != ""]
+    before = con.total_changes
+    con.executemany(f"INSERT OR IGNORE INTO {table} ({natural}) VALUES (?)", ((v,) for v in values))
+    return con.total_changes - before
+
+def load(con: sqlite3.Connection, dim: str) -> pd.Series:
+    """sk → id natural (Series indexada por sk)."""
+    table, sk, natural = DIMS[dim]
+    rows = con.execute(f"SELECT {sk}, {natural} FROM {table}").fetchall()
+    return pd.Series([r[1] for r in rows], index=pd.Index([r[0] for r in rows], dtype="int64"), dtype=object)
+
+def resolve(con: sqlite3.Connection, dim: str, ids: pd.Series) -> np.ndarray:
+    """ids naturales → sk (int64), dando de alta los que falten. Solo consulta los valores únicos."""
+    table, sk, natural = DIMS[dim]
+    codes, uniques = pd.factorize(ids)
+    uniques = list(uniques)
+    ensure(con, dim, uniques)
+    found = {}
+    for i in range(0, len(uniques), BATCH):
+        part = uniques[i:i + BATCH]
+        q = f"SELECT {natural}, {sk} FROM {table} WHERE {natural} IN ({','.join('?' * len(part))})"
+        found.update(con.execute(q, part).fetchall())
+    return np.array([found[u] for u in uniques], dtype="int64")[codes]
+
+def decode(s: pd.Series, names: pd.Series) -> pd.Series:
+    """sk → id natural en bloque con el diccionario de load()."""
+    return pd.Series(names.reindex(s.to_numpy()).to_numpy(), index=s.index, name=s.name, dtype=object)
+
+def day_number(fechas: pd.Series) -> np.ndarray:
+    """Fechas (date o 'AAAA-MM-DD') → días desde 1970-01-01 (int64). Solo parsea las únicas."""
+    codes, uniques = pd.factorize(fechas)
+    days = np.array([str(u)[:10] for u in uniques], dtype="datetime64[D]").astype("int64")
+    return days[codes]
+
+def day_label(dias: pd.Series) -> pd.Series:
+    """Días desde 1970-01-01 → 'AAAA-MM-DD', como date(fecha_dia * 86400, 'unixepoch')."""
+    codes, uniques = pd.factorize(dias)
+    labels = np.datetime_as_string(np.asarray(uniques, dtype="int64").astype("datetime64[D]"))
+    return pd.Series(labels.astype(object)[codes], index=dias.index, dtype=object)
+
+def decode_ventas(df: pd.DataFrame, clientes: pd.Series, productos: pd.Series) -> pd.DataFrame:
+    """Filas de fact_ventas → columnas de la vista clean_ventas (fecha, id_cliente, id_producto, ...)."""
+    out = pd.DataFrame({
+        "fecha": day_label(df["fecha_dia"]),
+        "id_cliente": decode(df["cliente_sk"], clientes),
+        "id_producto": decode(df["producto_sk"], productos),
+    }, index=df.index)
+    for c in df.columns:
+        if c not in ("fecha_dia", "cliente_sk", "producto_sk"):
+            out[c] = df[c]
+    return out
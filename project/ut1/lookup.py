@@ -0,0 +1,222 @@
+"""
+Búsqueda puntual de ventas por cliente o producto en el Parquet de plata.
+
+export_parquet escribe clean_ventas dos veces: clean_ventas.parquet ordenado por
+id_cliente y clean_ventas_por_producto.parquet ordenado por id_producto. Así las
+ventas de una misma entidad caen juntas, en uno o dos grupos de filas (row groups de
+ROW_GROUP_ROWS filas). Cada fichero lleva estadísticas min/max por grupo y por página
+(índice de páginas), un filtro Bloom por grupo para id_cliente e id_producto y los
+sorting_columns en el pie.
+
+lookup() elige la copia ordenada por la columna buscada, lee solo el pie y descarta:
+1) los grupos cuyo rango min/max no incluye el valor;
+2) los que quedan, si su filtro Bloom dice que el valor no está (un id que cae dentro
+   del rango pero no existe no lee ningún dato).
+Después lee los grupos supervivientes y filtra las filas. pyarrow no ofrece desde
+Python la lectura del índice de páginas, así que aquí la unidad de poda es el grupo de
+filas; el índice queda escrito para motores que sí lo usan (DuckDB, Spark, Trino). El
+filtro Bloom sigue el formato de Parquet (split block, xxHash64 del valor) y se
+consulta leyendo solo la cabecera y el bloque de 32 bytes que toca.
+"""
+import io
+import struct
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from ut1 import paths
+
+ROW_GROUP_ROWS = 128_000  # filas por grupo: lo que lee como mínimo una búsqueda
+PAGE_ROWS = 8_000  # filas por página de datos (granularidad del índice de páginas)
+BLOOM_FPP = 0.01  # falsos positivos del filtro Bloom
+BLOOM_COLS = ("id_cliente", "id_producto")
+
+# columna de búsqueda → fichero ordenado por ella
+SORTED_FILES = {
+    "id_cliente": "clean_ventas.parquet",
+    "id_producto": "clean_ventas_por_producto.parquet",
+}
+
+def write_sorted(df: pd.DataFrame, path: Path, key: str, label: str):
+    """Escribe `df` ordenado por `key` (estable: dentro de cada id, el orden de entrada) con estadísticas por página y filtros Bloom."""
+    # Ordenar los distintos y luego códigos enteros: mucho más rápido que sort_values sobre texto
+    codes, uniques = pd.factorize(df[key])
+    rank = np.argsort(np.argsort(uniques, kind="stable"))
+    table = pa.Table.from_pandas(df, preserve_index=False).take(np.argsort(rank[codes], kind="stable"))
+    bloom = {
+        c: {"ndv": max(1, min(df[c].nunique(), ROW_GROUP_ROWS)), "fpp": BLOOM_FPP}  # sin filas la columna es null y count_distinct falla
+        for c in BLOOM_COLS if c in table.column_names
+    }
+    pq.write_table(
+        table, path,
+        row_group_size=ROW_GROUP_ROWS,
+        max_rows_per_page=PAGE_ROWS,
+        write_statistics=True,
+        write_page_index=True,
+        bloom_filter_options=bloom,
+        sorting_columns=[pq.SortingColumn(table.schema.get_field_index(key))],
+    )
+    print(f"Parquet escrito: {path.name} ({table.num_rows} filas, por {key}) para {label}")
+
+# xxHash64 (semilla 0), el hash de los filtros Bloom de Parquet
+_M = 0xFFFFFFFFFFFFFFFF
+_P1, _P2, _P3, _P4, _P5 = (
+    11400714785074694791, 14029467366897019727, 1609587929392839161, 9650029242287828579, 2870177450012600261,
+)
+
+def _rotl(x: int, r: int) -> int:
+    return ((x << r) | (x >> (64 - r))) & _M
+
+def _round(acc: int, v: int) -> int:
+    return _rotl((acc + v * _P2) & _M, 31) * _P1 & _M
+
+def xxh64(data: bytes) -> int:
+    n, i = len(data), 0
+    if n >= 32:
+        v = [(_P1 + _P2) & _M, _P2, 0, (-_P1) & _M]
+        while i + 32 <= n:
+            for j in range(4):
+                v[j] = _round(v[j], struct.unpack_from("<Q", data, i + 8 * j)[0])
+            i += 32
+        h = (_rotl(v[0], 1) + _rotl(v[1], 7) + _rotl(v[2], 12) + _rotl(v[3], 18)) & _M
+        for x in v:
+            h = ((h ^ _round(0, x)) * _P1 + _P4) & _M
+    else:
+        h = _P5
+    h = (h + n) & _M
+    while i + 8 <= n:
+        h = (_rotl(h ^ _round(0, struct.unpack_from("<Q", data, i)[0]), 27) * _P1 + _P4) & _M
+        i += 8
+    if i + 4 <= n:
+        h = (_rotl(h ^ (struct.unpack_from("<I", data, i)[0] * _P1 & _M), 23) * _P2 + _P3) & _M
+        i += 4
+    while i < n:
+        h = _rotl(h ^ (data[i] * _P5 & _M), 11) * _P1 & _M
+        i += 1
+    h ^= h >> 33
+    h = h * _P2 & _M
+    h ^= h >> 29
+    h = h * _P3 & _M
+    return h ^ (h >> 32)
+
+# Filtro Bloom "split block": bloques de 8 palabras de 32 bits, un bit por palabra
+_SALT = (0x47B6137B, 0x44974D91, 0x8824AD5B, 0xA2B7289D, 0x705495C7, 0x2DF1424B, 0x9EFC4947, 0x5C6BFB31)
+_HEADER_PEEK = 64  # la cabecera Thrift (BloomFilterHeader) ocupa unos 15 bytes
+
+def _varint(buf: bytes, i: int) -> tuple[int, int]:
+    out = shift = 0
+    while True:
+        b = buf[i]
+        i += 1
+        out |= (b & 0x7F) << shift
+        if b < 0x80:
+            return out, i
+        shift += 7
+
+def _skip_struct(buf: bytes, i: int, fields: dict | None = None) -> int:
+    """Recorre un struct Thrift compacto desde `i`; guarda en `fields` los enteros de primer nivel."""
+    fid = 0
+    while True:
+        b = buf[i]
+        i += 1
+        if b == 0:
+            return i
+        kind, delta = b & 0x0F, b >> 4
+        if delta:
+            fid += delta
+        else:
+            z, i = _varint(buf, i)
+            fid = (z >> 1) ^ -(z & 1)
+        if kind in (1, 2):  # bool
+            continue
+        if kind == 3:
+            i += 1
+        elif kind in (4, 5, 6):
+            z, i = _varint(buf, i)
+            if fields is not None:
+                fields[fid] = (z >> 1) ^ -(z & 1)
+        elif kind == 7:
+            i += 8
+        elif kind == 8:
+            n, i = _varint(buf, i)
+            i += n
+        elif kind == 12:
+            i = _skip_struct(buf, i)
+        else:
+            raise ValueError(f"Tipo Thrift {kind} inesperado en la cabecera del filtro Bloom")
+
+def bloom_might_contain(f, offset: int, h: int) -> bool:
+    """¿Puede estar el valor de hash `h` en el filtro que empieza en `offset`? (lee ~100 bytes)"""
+    f.seek(offset)
+    head = f.read(_HEADER_PEEK)
+    fields: dict = {}
+    start = _skip_struct(head, 0, fields)
+    n_blocks = fields[1] // 32  # campo 1: numBytes del bitset
+    block = ((h >> 32) * n_blocks) >> 32
+    f.seek(offset + start + block * 32)
+    words = struct.unpack("<8I", f.read(32))
+    key = h & 0xFFFFFFFF
+    return all(words[j] >> (((key * _SALT[j]) & 0xFFFFFFFF) >> 27) & 1 for j in range(8))
+
+class CountingFile(io.FileIO):
+    """Fichero que cuenta los bytes leídos (para saber cuánto toca de disco una búsqueda)."""
+    bytes_read = 0
+
+    def readinto(self, b) -> int:
+        n = super().readinto(b)
+        self.bytes_read += n or 0
+        return n
+
+    def read(self, size: int = -1) -> bytes:
+        out = super().read(size)
+        self.bytes_read += len(out)
+        return out
+
+def prune(pf: pq.ParquetFile, f, column: str, value: str) -> tuple[list[int], int]:
+    """Grupos de filas que pueden contener `value` en `column` y cuántos descartó el filtro Bloom."""
+    meta = pf.metadata
+    col = pf.schema_arrow.get_field_index(column)
+    h = xxh64(value.encode("utf-8"))
+    keep, by_bloom = [], 0
+    for g in range(meta.num_row_groups):
+        chunk = meta.row_group(g).column(col)
+        st = chunk.statistics
+        if st is not None and st.has_min_max and not (st.min <= value <= st.max):
+            continue
+        if chunk.bloom_filter_offset and not bloom_might_contain(f, chunk.bloom_filter_offset, h):
+            by_bloom += 1
+            continue
+        keep.append(g)
+    return keep, by_bloom
+
+def lookup(column: str, value: str, parquet_dir: Path | None = None, path: Path | None = None) -> tuple[pd.DataFrame, dict]:
+    """Ventas con `column` == `value` y métricas (grupos leídos/descartados, bytes leídos, segundos)."""
+    if column not in SORTED_FILES:
+        raise ValueError(f"Búsqueda no soportada por {column} (usa {list(SORTED_FILES)})")
+    path = path or (parquet_dir or paths.PARQUET_DIR) / SORTED_FILES[column]
+    t0 = time.perf_counter()
+    with CountingFile(path) as f:
+        pf = pq.ParquetFile(f)
+        groups, by_bloom = prune(pf, f, column, value)
+        table = pf.read_row_groups(groups) if groups else pf.schema_arrow.empty_table()
+        df = table.filter(pc.equal(table[column], value)).to_pandas()
+        stats = {
+            "fichero": path.name,
+            "grupos": pf.metadata.num_row_groups,
+            "leidos": len(groups),
+            "descartados_bloom": by_bloom,
+            "bytes": f.bytes_read,
+            "tamano": path.stat().st_size,
+            "segundos": time.perf_counter() - t0,
+        }
+    return df, stats
+
+def format_stats(stats: dict) -> str:
+    return (
+        f"{stats['fichero']}: {stats['leidos']}/{stats['grupos']} grupos leídos "
+        f"({stats['descartados_bloom']} descartados por Bloom) · "
+        f"{stats['bytes'] / 2**20:.2f} de {stats['tamano'] / 2**20:.2f} MiB · {stats['segundos'] * 1000:.1f} ms"
+    )
@@ -0,0 +1,53 @@
+"""Salidas en disco: Parquet de plata y cuarentena unificada (SQLite + CSV)."""
+import sqlite3
+from pathlib import Path
+import pandas as pd
+from ut1 import paths
+
+def write_parquet(df: pd.DataFrame, path: Path, label: str):
+    try:
+        df.to_parquet(path, index=False)  # requiere pyarrow o fastparquet
+        print(f"Parquet escrito: {path.name} ({len(df)} filas) para {label}")
+    except ImportError as e:
+        print(f"[AVISO] No se pudo escribir {path.name} (instala 'pyarrow' o 'fastparquet'): {e}")
+
+# Cuarentena unificada (malformadas + inválidas) por dominio
+def append_quarantine(
+    con: sqlite3.Connection, kind: str, reasons_rows: list[tuple[str, str, str, str, str]], header: str | None = None,
+):
+    """
+    Una fila por (_source_file, _row): si la línea ya estaba en cuarentena (relimpieza con
+    --full, reintento de un batch) solo se actualiza su motivo, y al CSV van solo las nuevas.
+    `header` = cabecera del drop de las líneas (se guarda en _header para el replay; no va al CSV).
+    """
+    if not reasons_rows:
+        return
+    dfq = pd.DataFrame(reasons_rows, columns=["_reason", "_row", "_ingest_ts", "_source_file", "_batch_id"])
+    dfq = dfq.drop_duplicates(["_source_file", "_row"], keep="last")
+    table = f"quarantine_{kind}"
+    seen = set()
+    for src in dfq["_source_file"].dropna().unique():
+        seen.update((src, r) for (r,) in con.execute(f"SELECT _row FROM {table} WHERE _source_file = ?", (src,)))
+    old = pd.Series([k in seen for k in zip(dfq["_source_file"], dfq["_row"])], index=dfq.index, dtype=bool)
+    if old.any():
+        con.executemany(
+            f"UPDATE {table} SET _reason = ? WHERE _source_file = ? AND _row = ? AND _reason <> ?",
+            [(r, s, row, r) for r, row, s in zip(dfq.loc[old, "_reason"], dfq.loc[old, "_row"], dfq.loc[old, "_source_file"])],
+        )
+    dfq = dfq.loc[~old]
+    if dfq.empty:
+        return
+    dfq.assign(_header=header).to_sql(table, con, if_exists="append", index=False)
+    out_csv = paths.QUALITY_DIR / f"{kind}_quarantine.csv"
+    mode = "a" if out_csv.exists() else "w"
+    dfq.to_csv(out_csv, index=False, mode=mode, header=not out_csv.exists())
+
+def append_replayed(kind: str, dfr: pd.DataFrame):
+    """Registro de filas recuperadas de cuarentena por un replay (output/quality/<kind>_replayed.csv)."""
+    out_csv = paths.QUALITY_DIR / f"{kind}_replayed.csv"
+    dfr.to_csv(out_csv, index=False, mode="a" if out_csv.exists() else "w", header=not out_csv.exists())
+
+def rewrite_quarantine_csv(con: sqlite3.Connection, kind: str):
+    """Regenera el CSV de cuarentena desde la tabla (recorre todo el histórico)."""
+    dfq = pd.read_sql_query(f"SELECT _reason, _row, _ingest_ts, _source_file, _batch_id FROM quarantine_{kind}", con)
+    dfq.to_csv(paths.QUALITY_DIR / f"{kind}_quarantine.csv", index=False)
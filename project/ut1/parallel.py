@@ -0,0 +1,106 @@
+"""
+Limpieza de ventas en paralelo por particiones hash (`clean --jobs N`).
+
+El proceso principal lee raw_ventas en trozos y reparte cada fila en una partición
+según un hash de (id_cliente, id_producto): todas las filas con la misma clave de
+dedupe (fecha, id_cliente, id_producto) caen en la misma partición, así que cada
+worker valida y aplica "último gana" por su cuenta. Las particiones se vuelcan a
+disco (pickle) y tienen como mucho ~PART_ROWS filas, que es lo que cabe en memoria
+por worker. El principal recoge los resultados en orden de partición: junta la
+cuarentena (en el orden original de las filas) y hace de único escritor (claves
+sustitutas + UPSERT en fact_ventas), en una sola transacción por batch.
+"""
+import math
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import Executor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from ut1 import paths
+from ut1.clean import _batch_filter, clean_and_persist_ventas_from_raw, persist_ventas, prepare_ventas, ventas_quarantine_rows
+from ut1.outputs import append_quarantine
+from ut1.shards import iter_raw_ventas, query_all
+
+CHUNK_ROWS = 200_000  # filas por lectura de raw_ventas
+PART_ROWS = 500_000  # tope de filas por partición (memoria de cada worker)
+MIN_ROWS = 100_000  # por debajo, el batch se limpia en secuencia: no compensa repartir
+
+def partition_of(df: pd.DataFrame, n: int) -> np.ndarray:
+    """Partición de cada fila: hash de los ids ya sin espacios (como los ve prepare_ventas)."""
+    ids = pd.DataFrame({c: df[c].astype(str).str.strip() for c in ("id_cliente", "id_producto")})
+    return (pd.util.hash_pandas_object(ids, index=False).to_numpy() % np.uint64(n)).astype("int64")
+
+def count_raw(con: sqlite3.Connection, shard_dir: Path | None, where: str, params: tuple) -> int:
+    sql = f"SELECT COUNT(*) AS n FROM raw_ventas {where}"
+    if shard_dir is not None:
+        return int(query_all(con, shard_dir, sql, params)["n"].sum())
+    return con.execute(sql, params).fetchone()[0]
+
+def _clean_partition(files: list[Path]) -> tuple[Path | None, Path | None]:
+    """Worker: valida y deduplica una partición. Devuelve los pickles de limpias e inválidas."""
+    if not files:
+        return None, None
+    df = pd.concat([pd.read_pickle(f) for f in files], ignore_index=True)
+    for f in files:
+        f.unlink()
+    clean, invalid = prepare_ventas(df)
+    out = files[0].with_suffix(".clean.pkl"), files[0].with_suffix(".invalid.pkl")
+    clean.to_pickle(out[0])
+    invalid.to_pickle(out[1])
+    return out
+
+def clean_ventas_parallel(
+    con: sqlite3.Connection,
+    upsert_sql: str,
+    pool: Executor,
+    jobs: int,
+    shard_dir: Path | None = None,
+    source_file: str | None = None,
+    run_id: str | None = None,
+    tune=None,
+    fresh_since: str | None = None,
+) -> tuple[int, int, int]:
+    """
+    Como clean_and_persist_ventas_from_raw, con validación y dedupe repartidos en `pool`.
+    Con `tune` (autotune.Session), las filas por lectura de raw_ventas las decide el tuner
+    clean.chunk_rows, trozo a trozo (filas/s de lectura + reparto, y RSS).
+    """
+    where, params = _batch_filter(source_file)
+    total = count_raw(con, shard_dir, where, params)
+    if total < MIN_ROWS:
+        return clean_and_persist_ventas_from_raw(con, upsert_sql, shard_dir, source_file, run_id=run_id, fresh_since=fresh_since)
+    n = max(jobs, math.ceil(total / PART_ROWS))
+    with tempfile.TemporaryDirectory(prefix=".clean_", dir=paths.OUT) as tmp:
+        parts: list[list[Path]] = [[] for _ in range(n)]
+        pos = 0
+        tuner = tune.tuner("clean.chunk_rows") if tune is not None else None
+        chunksize = (lambda: tuner.value) if tuner is not None else CHUNK_ROWS
+        last = time.perf_counter()
+        for i, chunk in enumerate(iter_raw_ventas(con, shard_dir, where, params, chunksize)):
+            chunk["_pos"] = np.arange(pos, pos + len(chunk))  # orden original, para la cuarentena
+            pos += len(chunk)
+            part = partition_of(chunk, n)
+            for k in np.unique(part):
+                f = Path(tmp) / f"p{k:05d}_{i:06d}.pkl"
+                chunk.loc[part == k].to_pickle(f)
+                parts[k].append(f)
+            if tuner is not None:
+                now = time.perf_counter()
+                tuner.observe(len(chunk), now - last)
+                last = now
+        n_clean, invalid = 0, []
+        for clean_f, invalid_f in pool.map(_clean_partition, parts):
+            if clean_f is None:
+                continue
+            clean = pd.read_pickle(clean_f)
+            if not clean.empty:
+                persist_ventas(con, clean.drop(columns="_pos"), upsert_sql, shard_dir, run_id, fresh_since)
+                n_clean += len(clean)
+            invalid.append(pd.read_pickle(invalid_f))
+    invalid = pd.concat(invalid, ignore_index=True).sort_values("_pos")
+    if not invalid.empty:
+        append_quarantine(con, "ventas", ventas_quarantine_rows(invalid))
+    con.commit()
+    return pos, n_clean, len(invalid)
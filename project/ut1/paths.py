@@ -0,0 +1,39 @@
+"""
+Rutas del proyecto. Solo constantes: los directorios se crean con ensure_output_dirs().
+
+Los datos (data/drops) y las salidas (output/) cuelgan de ROOT. set_root() los lleva
+a otra raíz con la misma estructura (un tenant: `python -m ut1 --root`, `fleet`).
+Las funciones leen paths.X al llamarse, no al importarse, para que el cambio se vea.
+"""
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA = ROOT / "data" / "drops"
+SQL_DIR = ROOT / "sql"
+OUT = ROOT / "output"
+PARQUET_DIR = OUT / "parquet"
+ARROW_DIR = OUT / "arrow"  # exportación Arrow IPC opcional (--arrow)
+QUALITY_DIR = OUT / "quality"
+DB = OUT / "ut1.db"
+SHARD_DIR = OUT / "shards"  # shards mensuales de ventas (modo --shard-ventas)
+REPORT = OUT / "reporte.md"
+CDC_DIR = OUT / "cdc"  # cambios de cada run (output/cdc/<run_id>.parquet)
+SITE_REPORTS = ROOT.parent / "site" / "content" / "reportes"  # páginas por periodo (subcomando publish)
+
+def set_root(root: Path):
+    """data/drops y output/ bajo `root` (sql/ y el sitio siguen siendo los del proyecto)."""
+    global DATA, OUT, PARQUET_DIR, ARROW_DIR, QUALITY_DIR, DB, SHARD_DIR, REPORT, CDC_DIR
+    root = Path(root).resolve()
+    DATA = root / "data" / "drops"
+    OUT = root / "output"
+    PARQUET_DIR = OUT / "parquet"
+    ARROW_DIR = OUT / "arrow"
+    QUALITY_DIR = OUT / "quality"
+    DB = OUT / "ut1.db"
+    SHARD_DIR = OUT / "shards"
+    REPORT = OUT / "reporte.md"
+    CDC_DIR = OUT / "cdc"
+
+def ensure_output_dirs():
+    for d in (OUT, PARQUET_DIR, QUALITY_DIR):
+        d.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,179 @@
+"""
+Preflight de drops por muestreo (subcomando `preflight`): ¿merece la pena ingerir este fichero?
+
+No lee el drop entero. De un CSV plano lee la cabecera y STRATA tramos de BLOCK bytes,
+uno en una posición al azar dentro de cada estrato (fichero partido en STRATA trozos
+iguales), con seek: se descarta la primera línea de cada tramo (cortada) y la última
+si no termina en salto de línea. Un comprimido no admite seek, así que de él se lee
+solo el principio (SAMPLE_BYTES descomprimidos) y el informe lo marca como "prefijo".
+Los ficheros pequeños se leen enteros y la estimación es exacta.
+
+A la muestra se le aplican las mismas reglas que a un batch: conteo de campos de
+ingest._split_lines, parseo de ingest.parse_lines y validación de clean. La tasa de
+cuarentena se estima con intervalo de confianza del 95%: Wilson y, con varios tramos,
+el de un estimador de razón por conglomerados (las líneas de un mismo tramo se
+parecen entre sí); se da el más ancho de los dos. Decisión:
+  - rechazar: faltan columnas, o el límite inferior supera `reject`;
+  - revisar: la estimación supera `flag`, o el límite superior supera `reject`;
+  - ok: el resto.
+"""
+import math
+import random
+import time
+from pathlib import Path
+import pandas as pd
+from ut1 import coerce
+from ut1.clean import prepare_ventas, validate_clientes, validate_productos
+from ut1.drops import codec, inner_name, open_drop
+from ut1.ingest import RAW_COLS, _split_lines, classify_file, parse_lines
+
+STRATA = 32
+BLOCK = 16 * 1024
+SAMPLE_BYTES = STRATA * BLOCK  # por debajo de esto, el fichero se lee entero
+REJECT_RATE = 0.5
+FLAG_RATE = 0.05
+Z = 1.96  # 95%
+
+# Columnas que la validación interpreta, para decir cuál falla
+CHECKS = {
+    "ventas": {"fecha": coerce.to_date, "unidades": coerce.to_number, "precio_unitario": coerce.to_money},
+    "clientes": {"fecha": coerce.to_date},
+    "productos": {"unidades": coerce.to_number, "precio_unitario": coerce.to_money},
+}
+
+def _decode(data: bytes) -> list[str]:
+    return data.decode("utf-8", errors="replace").splitlines()
+
+def sample_lines(f: Path, strata: int = STRATA, block: int = BLOCK) -> tuple[str, list[list[str]], str]:
+    """(cabecera, líneas por tramo, método: completo/estratos/prefijo)."""
+    if codec(f):
+        with open_drop(f) as fh:
+            text = fh.read(strata * block)
+            complete = fh.read(1) == ""
+        lines = text.splitlines()
+        if not complete:
+            lines = lines[:-1]  # la última puede estar cortada
+        return (lines[0] if lines else ""), [lines[1:]], "completo" if complete else "prefijo"
+    size = f.stat().st_size
+    with open(f, "rb") as fh:
+        header = fh.readline()
+        start = fh.tell()
+        if size - start <= strata * block:
+            return header.decode("utf-8", errors="replace").rstrip("\r\n"), [_decode(fh.read())], "completo"
+        rng = random.Random(f"{f.name}:{size}")  # misma muestra para el mismo fichero
+        step = (size - start) / strata
+        blocks = []
+        for i in range(strata):
+            off = start + int(i * step + rng.random() * max(step - block, 0))
+            fh.seek(off)
+            data = fh.read(block)
+            cut = data.find(b"\n") + 1 if off > start else 0
+            end = data.rfind(b"\n") + 1
+            if 0 < cut < end:
+                blocks.append(_decode(data[cut:end]))
+            elif cut == 0 and end:
+                blocks.append(_decode(data[:end]))
+    return header.decode("utf-8", errors="replace").rstrip("\r\n"), blocks, "estratos"
+
+def wilson(bad: int, n: int, z: float = Z) -> tuple[float, float]:
+    if n == 0:
+        return 0.0, 1.0
+    p = bad / n
+    d = 1 + z * z / n
+    c = (p + z * z / (2 * n)) / d
+    h = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / d
+    return max(0.0, c - h), min(1.0, c + h)
+
+def rate_interval(bad: list[int], n: list[int], z: float = Z) -> tuple[float, float, float]:
+    """Tasa total y su intervalo: el más ancho entre Wilson y el de razón por conglomerados."""
+    tb, tn = sum(bad), sum(n)
+    p = tb / tn if tn else 0.0
+    lo, hi = wilson(tb, tn, z)
+    k = sum(1 for x in n if x)
+    if k > 1:
+        mean_n = tn / k
+        var = sum(((b - p * m) / mean_n) ** 2 for b, m in zip(bad, n) if m) / (k * (k - 1))
+        h = z * math.sqrt(var)
+        lo, hi = min(lo, max(0.0, p - h)), max(hi, min(1.0, p + h))
+    return p, lo, hi
+
+def _invalid_mask(kind: str, df: pd.DataFrame) -> pd.Series:
+    if kind == "ventas":
+        _, invalid = prepare_ventas(df.copy())
+        return df.index.isin(invalid.index)
+    if kind == "clientes":
+        return ~validate_clientes(df).to_numpy()
+    df = df.copy()
+    df["unidades"] = coerce.to_number(df["unidades"])
+    df["precio_unitario"] = coerce.to_money(df["precio_unitario"])
+    return ~validate_productos(df).to_numpy()
+
+def check(f: Path, kind: str | None = None, reject: float = REJECT_RATE, flag: float = FLAG_RATE) -> dict:
+    """Informe de preflight de un drop; `estado` es ok/revisar/rechazar."""
+    t0 = time.perf_counter()
+    kind = kind or classify_file(inner_name(f))
+    header, blocks, method = sample_lines(f)
+    res = {"fichero": f.name, "kind": kind, "muestra": method, "estado": "ok", "motivos": []}
+    if kind is None:
+        res.update(estado="rechazar", motivos=["nombre sin tipo (ventas/clientes/productos)"])
+        return res
+    cols = [c.strip() for c in header.split(",")]
+    cols = ["fecha" if c == "fecha_venta" else c for c in cols]
+    missing = [c for c in RAW_COLS[kind] if c not in cols]
+    if missing:
+        res["motivos"].append(f"faltan columnas {missing}")
+        for sep in (";", "\t", "|"):
+            if header.count(sep) and not header.count(","):
+                res["motivos"].append(f"la cabecera parece separada por {sep!r}")
+    # Tramo a tramo: conteo de campos y validación, para el intervalo por conglomerados
+    bad_parse, bad_valid, n_lines, bad_by_block = 0, 0, [], []
+    frames = []
+    for i, lines in enumerate(blocks):
+        good, bad = _split_lines(iter([header, *lines]))
+        n_lines.append(len(lines))
+        bad_parse += len(bad)
+        bad_by_block.append(len(bad))
+        df = parse_lines(good)
+        if not df.empty:
+            df["_block"] = i
+            frames.append(df)
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[*cols, "_block"])
+    if not missing and not df.empty:
+        invalid = _invalid_mask(kind, df)
+        bad_valid = int(invalid.sum())
+        for i, n in df.loc[invalid, "_block"].value_counts().items():
+            bad_by_block[i] += int(n)
+        res["columnas"] = {
+            c: round(float(fn(df[c]).isna().mean()), 4)
+            for c, fn in CHECKS[kind].items()
+        }
+    elif missing:
+        bad_by_block = list(n_lines)  # sin esas columnas, todo acabaría en cuarentena
+    p, lo, hi = rate_interval(bad_by_block, n_lines)
+    res.update(
+        lineas=sum(n_lines), tramos=len(blocks), parseo=bad_parse, validacion=bad_valid,
+        tasa=round(p, 4), ic95=[round(lo, 4), round(hi, 4)],
+    )
+    if sum(n_lines) == 0:
+        res["motivos"].append("sin filas de datos en la muestra")
+    if missing or lo > reject:
+        res["estado"] = "rechazar"
+    elif p > flag or hi > reject or not sum(n_lines):
+        res["estado"] = "revisar"
+    if lo > reject or p > flag:
+        res["motivos"].append(f"cuarentena estimada {p:.1%} (IC95 {lo:.1%}–{hi:.1%})")
+    for c, r in res.get("columnas", {}).items():
+        if r > flag:
+            res["motivos"].append(f"{c}: {r:.1%} sin interpretar")
+    res["segundos"] = round(time.perf_counter() - t0, 3)
+    return res
+
+def format_result(r: dict) -> str:
+    head = f"[{r['estado'].upper()}] {r['fichero']} ({r['kind']}, {r['muestra']}"
+    if "lineas" in r:
+        head += f", {r['lineas']} líneas en {r['tramos']} tramos, {r['segundos']:.2f} s)"
+        head += f": cuarentena {r['tasa']:.1%} [{r['ic95'][0]:.1%}, {r['ic95'][1]:.1%}]"
+        head += f" (parseo {r['parseo']}, validación {r['validacion']})"
+    else:
+        head += ")"
+    return "\n".join([head, *(f"  - {m}" for m in r["motivos"])])
@@ -0,0 +1,230 @@
+"""
+Páginas de informe por día, mes y categoría en site/content/reportes/ (subcomando `publish`).
+
+rollup.refresh() anota en report_dirty las páginas cuyos datos cambiaron; publish solo
+rehace esas, repartidas en un pool de procesos (cada uno con su conexión de solo
+lectura al cubo oro), y escribe un fichero solo si su contenido cambió (temporal +
+os.replace, como tools/site_sync.py): Quartz no ve ficheros a medias ni mtimes nuevos
+sin cambios. Las páginas no llevan fecha de generación para que rehacer una página
+idéntica no cuente como cambio. El índice (index.md) se rehace siempre: es una consulta.
+"""
+import calendar
+import os
+import re
+import sqlite3
+import tempfile
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from ut1 import paths, rollup
+
+KINDS = {"dia": "dias", "mes": "meses", "categoria": "categorias"}  # kind → subcarpeta
+POOL_MIN_PAGES = 64  # por debajo no compensa arrancar procesos
+SIN_CATEGORIA = "(sin categoría)"  # como rollup.por_categoria
+
+def slug(text: str) -> str:
+    ascii_ = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", ascii_.lower()).strip("-") or "sin-categoria"
+
+def page_path(kind: str, key: str) -> Path:
+    return Path(KINDS[kind]) / f"{slug(key) if kind == 'categoria' else key}.md"
+
+def write_if_changed(dst: Path, text: str) -> bool:
+    data = text.encode("utf-8")
+    try:
+        if dst.stat().st_size == len(data) and dst.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{dst.name}.", suffix=".tmp", dir=dst.parent)
+    os.close(fd)
+    try:
+        Path(tmp).write_bytes(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, dst)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return True
+
+def _table(headers: list[str], rows: list[tuple]) -> str:
+    """Tabla Markdown sin pandas (los workers solo necesitan sqlite3)."""
+    def fmt(v):
+        return f"{v:.2f}" if isinstance(v, float) else str(v)
+    lines = ["| " + " | ".join(headers) + " |", "|" + "|".join("---" for _ in headers) + "|"]
+    lines += ["| " + " | ".join(fmt(v) for v in r) + " |" for r in rows]
+    return "\n".join(lines)
+
+def _front(title: str) -> list[str]:
+    return ["---", f"title: {title}", "---", f"# {title}", ""]
+
+def _kpis(unidades, importe, lineas) -> list[str]:
+    ticket = importe / lineas if lineas else 0.0
+    return [f"- **Ingresos:** {importe:.2f} €", f"- **Unidades:** {unidades:g}", f"- **Líneas:** {lineas}", f"- **Ticket medio:** {ticket:.2f} €", ""]
+
+def _month_bounds(mes: str) -> tuple[str, str]:
+    y, m = map(int, mes.split("-"))
+    return f"{mes}-01", f"{mes}-{calendar.monthrange(y, m)[1]:02d}"
+
+def render_dia(con: sqlite3.Connection, fecha: str) -> str | None:
+    # Por la PK (fecha_dia), no por las vistas vw_gold_*: esas calculan date() en cada fila
+    row = con.execute("SELECT unidades, importe, lineas FROM gold_ventas_dia WHERE fecha_dia = unixepoch(?) / 86400", (fecha,)).fetchone()
+    if row is None:
+        return None
+    productos = con.execute(
+        "SELECT d.id_producto, COALESCE(g.categoria, ?), g.unidades, g.importe, g.lineas FROM gold_ventas_dia_producto g "
+        "JOIN dim_producto d ON d.producto_sk = g.producto_sk "
+        "WHERE g.fecha_dia = unixepoch(?) / 86400 ORDER BY g.importe DESC, d.id_producto",
+        (SIN_CATEGORIA, fecha),
+    ).fetchall()
+    return "\n".join([
+        *_front(f"Ventas del {fecha}"),
+        f"[Mes {fecha[:7]}](../meses/{fecha[:7]}) · [Índice](../)",
+        "",
+        *_kpis(*row),
+        "## Productos",
+        _table(["id_producto", "categoría", "unidades", "importe", "líneas"], productos),
+        "",
+    ])
+
+def render_mes(con: sqlite3.Connection, mes: str) -> str | None:
+    desde, hasta = _month_bounds(mes)
+    dias = con.execute(
+        "SELECT date(fecha_dia * 86400, 'unixepoch'), unidades, importe, lineas FROM gold_ventas_dia "
+        "WHERE fecha_dia BETWEEN unixepoch(?) / 86400 AND unixepoch(?) / 86400 ORDER BY fecha_dia",
+        (desde, hasta),
+    ).fetchall()
+    if not dias:
+        return None
+    k = rollup.range_kpis(con, desde, hasta)
+    top = [(p, c or SIN_CATEGORIA, u, i, n) for p, c, u, i, n in rollup.top_productos(con, desde, hasta, 10)]
+    return "\n".join([
+        *_front(f"Ventas de {mes}"),
+        "[Índice](../)",
+        "",
+        *_kpis(k["unidades"], k["ingresos"], k["lineas"]),
+        "## Días",
+        _table(["fecha", "unidades", "importe", "líneas"], [(f"[{d}](../dias/{d})", u, i, n) for d, u, i, n in dias]),
+        "",
+        "## Top 10 productos",
+        _table(["id_producto", "categoría", "unidades", "importe", "líneas"], top),
+        "",
+        "## Por categoría",
+        _table(["categoría", "unidades", "importe", "líneas"], rollup.por_categoria(con, desde, hasta)),
+        "",
+    ])
+
+def render_categoria(con: sqlite3.Connection, categoria: str) -> str | None:
+    cat = categoria or None
+    meses = con.execute(
+        "SELECT strftime('%Y-%m', fecha_dia * 86400, 'unixepoch') AS mes, SUM(unidades), SUM(importe), SUM(lineas) "
+        "FROM gold_ventas_dia_producto WHERE categoria IS ? GROUP BY mes ORDER BY mes",
+        (cat,),
+    ).fetchall()
+    if not meses:
+        return None
+    productos = con.execute(
+        "SELECT d.id_producto, SUM(g.unidades), SUM(g.importe) AS imp, SUM(g.lineas) FROM gold_ventas_dia_producto g "
+        "JOIN dim_producto d ON d.producto_sk = g.producto_sk WHERE g.categoria IS ? "
+        "GROUP BY d.id_producto ORDER BY imp DESC, d.id_producto LIMIT 20",
+        (cat,),
+    ).fetchall()
+    totals = [sum(r[i] for r in meses) for i in (1, 2, 3)]
+    return "\n".join([
+        *_front(f"Categoría {categoria or SIN_CATEGORIA}"),
+        "[Índice](../)",
+        "",
+        *_kpis(*totals),
+        "## Por mes",
+        _table(["mes", "unidades", "importe", "líneas"], [(f"[{m}](../meses/{m})", u, i, n) for m, u, i, n in meses]),
+        "",
+        "## Top 20 productos",
+        _table(["id_producto", "unidades", "importe", "líneas"], productos),
+        "",
+    ])
+
+RENDER = {"dia": render_dia, "mes": render_mes, "categoria": render_categoria}
+
+def render_index(con: sqlite3.Connection) -> str:
+    meses = con.execute(
+        "SELECT strftime('%Y-%m', fecha_dia * 86400, 'unixepoch') AS mes, COUNT(*), SUM(importe), SUM(lineas) "
+        "FROM gold_ventas_dia GROUP BY mes ORDER BY mes DESC"
+    ).fetchall()
+    # Totales por categoría con los acumulados del cubo: un acceso por producto, no un recorrido
+    cats = [(c, i, n) for c, _, i, n in rollup.por_categoria(con, "0000-01-01", "9999-12-31")]
+    return "\n".join([
+        *_front("Reportes por periodo"),
+        "- [Reporte UT1 (periodo completo)](./reporte-UT1)",
+        "",
+        "## Meses",
+        _table(["mes", "días con ventas", "importe", "líneas"], [(f"[{m}](./meses/{m})", d, i, n) for m, d, i, n in meses]),
+        "",
+        "## Categorías",
+        _table(
+            ["categoría", "importe", "líneas"],
+            [(f"[{c}](./{page_path('categoria', '' if c == SIN_CATEGORIA else c).with_suffix('').as_posix()})", i, n) for c, i, n in cats],
+        ),
+        "",
+    ])
+
+def render_pages(db: Path, pages: list[tuple[str, str]], site_dir: Path) -> list[str]:
+    """Rehace `pages` [(kind, key)] con su propia conexión. Devuelve 'escrita'/'igual'/'borrada' por página."""
+    con = sqlite3.connect(f"{Path(db).resolve().as_uri()}?mode=ro", uri=True)
+    out = []
+    try:
+        for kind, key in pages:
+            dst = site_dir / page_path(kind, key)
+            text = RENDER[kind](con, key)
+            if text is None:  # el periodo se quedó sin ventas
+                out.append("borrada" if dst.exists() else "igual")
+                dst.unlink(missing_ok=True)
+            else:
+                out.append("escrita" if write_if_changed(dst, text) else "igual")
+    finally:
+        con.close()
+    return out
+
+def all_pages(con: sqlite3.Connection) -> list[tuple[str, str]]:
+    dias = [r[0] for r in con.execute("SELECT date(fecha_dia * 86400, 'unixepoch') FROM gold_ventas_dia ORDER BY fecha_dia")]
+    cats = [r[0] for r in con.execute("SELECT DISTINCT COALESCE(categoria, '') FROM gold_ventas_dia_producto")]
+    return [("dia", d) for d in dias] + [("mes", m) for m in sorted({d[:7] for d in dias})] + [("categoria", c) for c in cats]
+
+def publish(
+    con: sqlite3.Connection,
+    db: Path | None = None,
+    site_dir: Path = paths.SITE_REPORTS,
+    jobs: int | None = None,
+    full: bool = False,
+) -> dict[str, int]:
+    """
+    Rehace las páginas de report_dirty (o todas con `full`, o si aún no hay índice) y el índice.
+    Las marcas se borran al final, así que si algo falla se vuelven a intentar en el siguiente publish.
+    """
+    db = db or paths.DB
+    con.commit()  # los workers leen ut1.db con su propia conexión: el cubo tiene que estar confirmado
+    full = full or not (site_dir / "index.md").exists()
+    pages = all_pages(con) if full else [tuple(r) for r in con.execute("SELECT kind, key FROM report_dirty ORDER BY kind, key")]
+    jobs = jobs or min(4, os.cpu_count() or 1)
+    if jobs > 1 and len(pages) >= POOL_MIN_PAGES:
+        step = -(-len(pages) // (jobs * 4))  # ~4 tandas por proceso para repartir bien
+        chunks = [pages[i:i + step] for i in range(0, len(pages), step)]
+        with ProcessPoolExecutor(jobs) as ex:
+            results = [s for part in ex.map(render_pages, [db] * len(chunks), chunks, [site_dir] * len(chunks)) for s in part]
+    else:
+        results = render_pages(db, pages, site_dir)
+    stats = {s: results.count(s) for s in ("escrita", "igual", "borrada")}
+    if full:  # páginas de periodos que ya no existen (p. ej. otra ut1.db)
+        keep = {site_dir / page_path(kind, key) for kind, key in pages}
+        for sub in KINDS.values():
+            for f in (site_dir / sub).glob("*.md"):
+                if f not in keep:
+                    f.unlink()
+                    stats["borrada"] += 1
+    stats["índice"] = int(write_if_changed(site_dir / "index.md", render_index(con)))
+    if full:
+        con.execute("DELETE FROM report_dirty")
+    else:
+        con.executemany("DELETE FROM report_dirty WHERE kind = ? AND key = ?", pages)
+    con.commit()
+    return stats
@@ -0,0 +1,259 @@
+"""
+Perfil de calidad por batch de ingesta (tabla quality_profile, clave = drop + huella),
+calculado en streaming en ingest.
+
+Cada trozo que entra actualiza: filas, nulos por columna, HyperLogLog de ids
+(normalizados) y t-digest de precio/unidades; parseo y validación añaden sus
+fallos por motivo. Los perfiles se fusionan (merge) para cualquier conjunto de
+batches y drift() compara cada batch con la fusión de los anteriores de su
+dominio. El subcomando `profile` solo necesita numpy (pandas se carga al perfilar).
+
+Un reenvío que no deja filas nuevas no guarda perfil si el drop ya tenía uno (no pisa
+ni añade un batch vacío a la deriva). fail_rate se mide sobre las líneas vistas en el
+drop: las guardadas, las repetidas y las mal formadas.
+"""
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+from ut1.sketches import HyperLogLog, TDigest
+
+# kind → (columnas id para distintos, columnas numéricas con su coerción en ut1/coerce.py)
+SPEC = {
+    "ventas": (["id_cliente", "id_producto"], {"precio_unitario": "to_money", "unidades": "to_number"}),
+    "clientes": (["id_cliente"], {}),
+    "productos": (["id_producto"], {"precio_unitario": "to_money", "unidades": "to_number"}),
+}
+QUANTILES = {"p50": 0.5, "p95": 0.95}
+QUARANTINE_REASONS = ("parse_error_bad_field_count", "validation_failed")  # fallos que acaban en quarantine_*
+REPEATED = "repeated_row"  # ut1/rowdedup.REASON: filas vistas pero no guardadas
+
+# Alertas de deriva: prefijo de métrica → (modo, umbral). abs = puntos; rel = cambio relativo
+DRIFT_RULES = {
+    "fail_rate": ("abs", 0.05),
+    "null_rate": ("abs", 0.05),
+    "no_numerico": ("abs", 0.05),
+    "p50": ("rel", 0.25),
+    "p95": ("rel", 0.25),
+    "distinct": ("rel", 0.5),
+}
+
+class BatchProfile:
+    def __init__(self, kind: str, batch_id: str, source_file: str | None = None, fingerprint: str | None = None):
+        self.kind = kind
+        self.batch_id = batch_id
+        self.source_file = source_file
+        self.fingerprint = fingerprint
+        self.created_ts = datetime.now(timezone.utc).isoformat()
+        self.rows = 0
+        self.checked = 0  # filas que pasaron por la validación de clean
+        self.nulls: dict[str, int] = {}
+        self.failures: dict[str, int] = {}
+        ids, nums = SPEC[kind]
+        self.hll = {c: HyperLogLog() for c in ids}
+        self.digests = {c: TDigest() for c in nums}
+
+    def update(self, df, cols: list[str]):
+        """Añade un trozo de raw (strings ya recortados)."""
+        import pandas as pd
+        from ut1 import coerce
+        self.rows += len(df)
+        for c in cols:
+            s = df[c] if c in df.columns else pd.Series([None] * len(df), dtype=object)
+            n = int((s.isna() | s.eq("")).sum())
+            self.nulls[c] = self.nulls.get(c, 0) + n
+        for c, hll in self.hll.items():
+            if c in df.columns:
+                u = pd.unique(coerce.norm_id(df[c].dropna()))
+                hll.add_hashes(pd.util.hash_array(np.asarray(u, dtype=object)))
+        for c, digest in self.digests.items():
+            if c in df.columns:
+                v = getattr(coerce, SPEC[self.kind][1][c])(df[c])
+                bad = int((v.isna() & df[c].notna() & df[c].ne("")).sum())
+                if bad:
+                    self.failures[f"no_numerico:{c}"] = self.failures.get(f"no_numerico:{c}", 0) + bad
+                digest.add(v.to_numpy(dtype="float64", na_value=np.nan))
+
+    @property
+    def label(self) -> str:
+        return f"{self.source_file}@{self.fingerprint}" if self.source_file else self.batch_id
+
+    def set_failures(self, reason: str, n: int, checked: int | None = None):
+        self.failures[reason] = int(n)
+        if checked is not None:
+            self.checked = int(checked)
+
+    def merge(self, other: "BatchProfile") -> "BatchProfile":
+        out = BatchProfile(self.kind, f"{self.batch_id}+{other.batch_id}")
+        out.created_ts = min(self.created_ts, other.created_ts)
+        out.rows = self.rows + other.rows
+        out.checked = self.checked + other.checked
+        for mine, theirs, dst in [(self.nulls, other.nulls, out.nulls), (self.failures, other.failures, out.failures)]:
+            for k in mine.keys() | theirs.keys():
+                dst[k] = mine.get(k, 0) + theirs.get(k, 0)
+        out.hll = {c: h.merge(other.hll[c]) for c, h in self.hll.items()}
+        out.digests = {c: d.merge(other.digests[c]) for c, d in self.digests.items()}
+        return out
+
+    def metrics(self) -> dict[str, float]:
+        bad_lines, invalid = (self.failures.get(r, 0) for r in QUARANTINE_REASONS)
+        parsed = self.rows + self.failures.get(REPEATED, 0)
+        seen = parsed + bad_lines
+        # La validación de clean puede cubrir otro número de filas: entra como tasa sobre las parseadas
+        checked = self.checked or parsed
+        invalid_rate = min(invalid / checked, 1.0) if checked else 0.0
+        m = {"rows": self.rows, "fail_rate": (bad_lines + invalid_rate * parsed) / seen if seen else 0.0}
+        for c, n in self.nulls.items():
+            m[f"null_rate:{c}"] = n / self.rows if self.rows else 0.0
+        for reason, n in self.failures.items():
+            if reason not in QUARANTINE_REASONS:
+                m[reason] = n / self.rows if self.rows else 0.0
+        for c, h in self.hll.items():
+            m[f"distinct:{c}"] = round(h.estimate())
+        for c, d in self.digests.items():
+            for name, q in QUANTILES.items():
+                if (v := d.quantile(q)) is not None:
+                    m[f"{name}:{c}"] = v
+        return m
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "checked": self.checked,
+            "nulls": self.nulls,
+            "failures": self.failures,
+            "hll": {c: h.to_dict() for c, h in self.hll.items()},
+            "digests": {c: d.to_dict() for c, d in self.digests.items()},
+        }
+
+    @classmethod
+    def from_row(cls, batch_id: str, kind: str, source_file: str, fingerprint: str, created_ts: str, payload: str) -> "BatchProfile":
+        d = json.loads(payload)
+        p = cls(kind, batch_id, source_file, fingerprint)
+        p.created_ts = created_ts
+        p.rows = d["rows"]
+        p.checked = d.get("checked", 0)
+        p.nulls = d["nulls"]
+        p.failures = d["failures"]
+        p.hll = {c: HyperLogLog.from_dict(v) for c, v in d["hll"].items()}
+        p.digests = {c: TDigest.from_dict(v) for c, v in d["digests"].items()}
+        return p
+
+# Persistencia (sin commit: va en la transacción del batch, como journal.mark)
+PROFILE_COLS = "_batch_id, kind, _source_file, fingerprint, created_ts, profile"
+
+def save(con: sqlite3.Connection, p: BatchProfile) -> bool:
+    """Guarda el perfil salvo que el batch no dejara filas y el drop ya tenga uno."""
+    if p.rows == 0 and con.execute("SELECT 1 FROM quality_profile WHERE _source_file = ?", (p.source_file,)).fetchone():
+        return False
+    con.execute(
+        """
+        INSERT INTO quality_profile (_source_file, fingerprint, _batch_id, kind, rows, profile, created_ts, updated_ts)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(_source_file, fingerprint) DO UPDATE SET
+          _batch_id = excluded._batch_id, kind = excluded.kind, rows = excluded.rows,
+          profile = excluded.profile, updated_ts = excluded.updated_ts
+        """,
+        (p.source_file, p.fingerprint or "", p.batch_id, p.kind, p.rows, json.dumps(p.to_dict()), p.created_ts,
+         datetime.now(timezone.utc).isoformat()),
+    )
+    return True
+
+def load(con: sqlite3.Connection, kind: str | None = None, batch_ids: list[str] | None = None) -> list[BatchProfile]:
+    """Perfiles guardados, en orden de creación."""
+    where, params = [], []
+    if kind:
+        where.append("kind = ?")
+        params.append(kind)
+    if batch_ids:
+        marks = ",".join("?" * len(batch_ids))
+        where.append(f"(_batch_id IN ({marks}) OR _source_file IN ({marks}))")
+        params += batch_ids * 2
+    sql = f"SELECT {PROFILE_COLS} FROM quality_profile"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return [BatchProfile.from_row(*r) for r in con.execute(sql + " ORDER BY created_ts, _source_file", params)]
+
+def set_failures(
+    con: sqlite3.Connection,
+    source_file: str,
+    reason: str,
+    n: int,
+    checked: int | None = None,
+    fingerprint: str | None = None,
+):
+    """
+    Fija el contador de fallos `reason` del perfil de un drop (p. ej. validación en clean, sobre
+    `checked` filas): el de su huella o, sin ella, el último.
+    """
+    sql = f"SELECT {PROFILE_COLS} FROM quality_profile WHERE _source_file = ?"
+    params = [source_file]
+    if fingerprint is not None:
+        sql += " AND fingerprint = ?"
+        params.append(fingerprint)
+    row = con.execute(sql + " ORDER BY created_ts DESC LIMIT 1", params).fetchone()
+    if row is None:
+        return
+    p = BatchProfile.from_row(*row)
+    p.set_failures(reason, n, checked)
+    con.execute(
+        "UPDATE quality_profile SET profile = ?, updated_ts = ? WHERE _source_file = ? AND fingerprint = ?",
+        (json.dumps(p.to_dict()), datetime.now(timezone.utc).isoformat(), p.source_file, p.fingerprint),
+    )
+
+def merge_all(profiles: list[BatchProfile]) -> BatchProfile | None:
+    if not profiles:
+        return None
+    out = profiles[0]
+    for p in profiles[1:]:
+        out = out.merge(p)
+    return out
+
+# Deriva: cada batch frente a los `window` anteriores del mismo dominio. Alerta si la métrica
+# sale del rango [mín, máx] de la ventana por más del umbral (absoluto o relativo a la
+# referencia); así los cuantiles de valores discretos que oscilan entre batches no disparan.
+def _rule(metric: str):
+    return DRIFT_RULES.get(metric.split(":", 1)[0])
+
+def drift(profiles: list[BatchProfile], window: int = 5, min_window: int = 3) -> list[dict]:
+    alerts = []
+    by_kind: dict[str, list[BatchProfile]] = {}
+    for p in profiles:
+        by_kind.setdefault(p.kind, []).append(p)
+    for kind, ps in by_kind.items():
+        metrics = [p.metrics() for p in ps]
+        for i, p in enumerate(ps):
+            prev = ps[max(0, i - window):i]
+            if len(prev) < min_window:
+                continue
+            prev_m = metrics[max(0, i - window):i]
+            base = merge_all(prev).metrics()  # referencia: la ventana fusionada
+            for k, v in metrics[i].items():
+                rule = _rule(k)
+                vals = [m[k] for m in prev_m if k in m]
+                if rule is None or not vals:
+                    continue
+                # Distintos no son aditivos entre batches: la referencia es la mediana por batch
+                b = float(np.median(vals)) if k.startswith("distinct:") else base.get(k, float(np.median(vals)))
+                out = max(min(vals) - v, v - max(vals), 0.0)
+                mode, thr = rule
+                delta = out if mode == "abs" else out / abs(b) if b else (0.0 if not out else float("inf"))
+                if delta > thr:
+                    alerts.append({"kind": kind, "_batch_id": p.batch_id, "_source_file": p.source_file, "metric": k, "value": v, "baseline": b, "delta": delta})
+    return alerts
+
+def write_summary(con: sqlite3.Connection, path: Path, window: int = 5) -> list[dict]:
+    """Métricas por batch y fusionadas por dominio + alertas de deriva, en JSON."""
+    profiles = load(con)
+    alerts = drift(profiles, window)
+    summary = {
+        "batches": {p.label: {"kind": p.kind, "_batch_id": p.batch_id, **p.metrics()} for p in profiles},
+        "kinds": {k: merge_all([p for p in profiles if p.kind == k]).metrics() for k in sorted({p.kind for p in profiles})},
+        "alerts": alerts,
+    }
+    path.write_text(json.dumps(summary, indent=1, ensure_ascii=False), encoding="utf-8")
+    return alerts
+
+def format_metrics(m: dict[str, float]) -> str:
+    return "  ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}" for k, v in m.items())
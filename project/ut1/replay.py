@@ -0,0 +1,191 @@
+"""
+Replay de cuarentena: vuelve a pasar por clean + UPSERT solo las filas elegidas.
+
+Selección por _reason / _batch_id / _source_file (índices de sql/00_schema.sql), parseo
+en bloque de `_row` y la misma ruta de clean_and_persist_*. Las filas que ahora pasan
+salen de quarantine_*; las que siguen fallando vuelven a entrar con el motivo actual.
+Las líneas de parseo que siguen sin el número de campos esperado no se tocan.
+
+Las líneas de parseo se guardaron tal cual llegaron: se leen con la cabecera de su drop
+(_header; en cuarentenas anteriores, la primera línea del drop si sigue en data/drops) y
+con parse_lines de ingest, y antes de entrar en raw_* pasan por el dedupe de huellas.
+"""
+import csv
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+from ut1 import cdc, journal, paths, quality, rollup, rowdedup
+from ut1.clean import (
+    clean_and_persist_clientes_from_raw,
+    clean_and_persist_productos_from_raw,
+    clean_and_persist_ventas_from_raw,
+)
+from ut1.drops import open_drop
+from ut1.ingest import RAW_COLS, parse_lines, write_raw
+from ut1.outputs import append_replayed, rewrite_quarantine_csv
+from ut1.shards import query_all
+from ut1.storage import load_upsert_sqls
+
+PARSE_REASON = "parse_error_bad_field_count"
+
+def select(
+    con: sqlite3.Connection,
+    kind: str,
+    reasons: list[str] | None = None,
+    batches: list[str] | None = None,
+    sources: list[str] | None = None,
+) -> pd.DataFrame:
+    where, params = [], []
+    for col, vals in (("_reason", reasons), ("_batch_id", batches), ("_source_file", sources)):
+        if vals:
+            where.append(f"{col} IN ({','.join('?' * len(vals))})")
+            params += vals
+    sql = f"SELECT rowid AS _qid, _reason, _row, _ingest_ts, _source_file, _batch_id, _header FROM quarantine_{kind}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return pd.read_sql_query(sql, con, params=params)
+
+def summary(con: sqlite3.Connection, kind: str) -> list[tuple]:
+    return con.execute(
+        f"SELECT _reason, _batch_id, COUNT(*) FROM quarantine_{kind} GROUP BY _reason, _batch_id ORDER BY 1, 2"
+    ).fetchall()
+
+def drop_header(source_file: str) -> str | None:
+    """Primera línea del drop, si sigue en data/drops (cuarentenas guardadas sin _header)."""
+    f = paths.DATA / source_file
+    if not f.is_file():
+        return None
+    with open_drop(f) as fh:
+        return fh.readline().rstrip("\r\n") or None
+
+def _parse_group(header: str, lines: list[str]) -> list[pd.DataFrame | None]:
+    """parse_lines de ingest sobre un grupo; si unas comillas juntan líneas, una a una."""
+    df = parse_lines([header, *lines])
+    if len(df) == len(lines):
+        return [df]
+    return [d if len(d) == 1 else None for d in (parse_lines([header, line]) for line in lines)]
+
+def parse_rows(q: pd.DataFrame, kind: str) -> tuple[pd.DataFrame, pd.Index]:
+    """
+    `_row` → columnas de raw. Devuelve (filas parseadas con sus metadatos, _qid de las
+    que siguen mal formadas). Las de parseo usan la regla de ingest (conteo de comas sobre
+    la cabecera de su drop); las de validación se guardaron con comillas CSV en el orden
+    de RAW_COLS. Todas se leen con parse_lines, como en ingest.
+    """
+    cols = RAW_COLS[kind]
+    default = ",".join(cols)
+    rows = q["_row"].fillna("")
+    is_parse = q["_reason"].eq(PARSE_REASON)
+    headers = pd.Series(default, index=q.index, dtype=object)
+    if is_parse.any():
+        stored = q.loc[is_parse, "_header"]
+        missing = stored.isna()
+        found = {src: drop_header(src) for src in q.loc[is_parse & q["_header"].isna(), "_source_file"].dropna().unique()}
+        stored[missing] = q.loc[stored.index[missing], "_source_file"].map(found)
+        headers[is_parse] = stored.fillna(default)
+    fits = [
+        (r.count(",") == h.count(",") and bool(r.strip())) if parse else len(next(csv.reader([r]), [])) == len(cols)
+        for r, h, parse in zip(rows, headers, is_parse)
+    ]
+    ok = pd.Series(fits, index=q.index, dtype=bool)
+    parts = []
+    for header, idx in q.loc[ok].groupby(headers[ok], sort=False).groups.items():
+        pieces = _parse_group(header, rows[idx].tolist())
+        if len(pieces) == 1:
+            parts.append(pieces[0].set_axis(idx))
+            continue
+        for i, d in zip(idx, pieces):
+            if d is None:
+                ok[i] = False
+            else:
+                parts.append(d.set_axis([i]))
+    good = q.loc[ok]
+    df = pd.concat(parts).reindex(index=good.index, columns=cols) if parts else pd.DataFrame(columns=cols, dtype=object)
+    for c in ("_ingest_ts", "_source_file", "_batch_id", "_qid"):
+        df[c] = good[c]
+    return df, q.loc[~ok, "_qid"]
+
+def _key(row: str) -> tuple:
+    """Campos recortados de un `_row`, para reconocer la misma fila tras volver a cuarentena."""
+    return tuple(f.strip() for f in next(csv.reader([row]), []))
+
+def source_ingest_ts(con: sqlite3.Connection, kind: str, sources: list[str], shard_dir: Path | None = None) -> dict[str, str]:
+    """_ingest_ts de la última ingesta de cada fichero (el de cuarentena es la hora de validar)."""
+    marks = ",".join("?" * len(sources))
+    sql = f"SELECT _source_file, MAX(_ingest_ts) AS ts FROM raw_{kind} WHERE _source_file IN ({marks}) GROUP BY _source_file"
+    if kind == "ventas" and shard_dir is not None:
+        df = query_all(con, shard_dir, sql, tuple(sources))
+        return df.dropna().groupby("_source_file")["ts"].max().to_dict()
+    return dict(con.execute(sql, sources).fetchall())
+
+def replay(
+    con: sqlite3.Connection,
+    kind: str,
+    reasons: list[str] | None = None,
+    batches: list[str] | None = None,
+    sources: list[str] | None = None,
+    shard_dir: Path | None = None,
+    dry_run: bool = False,
+    rewrite_csv: bool = False,
+    run_id: str | None = None,
+) -> dict[str, int]:
+    """
+    El CSV de cuarentena es un registro append-only: por defecto no se reescribe (sería
+    recorrer todo el histórico); las filas recuperadas se anotan en <kind>_replayed.csv.
+    Los cambios que deja en clean_* van al feed CDC con su propio run_id.
+    """
+    started = datetime.now(timezone.utc).isoformat()
+    q = select(con, kind, reasons, batches, sources)
+    df, still_bad = parse_rows(q, kind)
+    res = {"selected": len(q), "malformed": len(still_bad), "recovered": 0, "requarantined": 0}
+    if df.empty or dry_run:
+        return res
+    upserts = load_upsert_sqls()
+    run_id = run_id or journal.new_run_id()
+    # Último gana con la hora de ingesta original, para no pisar versiones posteriores del mismo id
+    ts = source_ingest_ts(con, kind, df["_source_file"].dropna().unique().tolist(), shard_dir)
+    df["_ingest_ts"] = df["_source_file"].map(ts).fillna(df["_ingest_ts"])
+    rows = df.drop(columns="_qid")
+    # Las que fallaron al parsear nunca llegaron a bronce: se añaden ahora a raw_*, con sus huellas
+    parsed = q.loc[df.index, "_reason"].eq(PARSE_REASON)
+    if parsed.any():
+        new, _ = rowdedup.filter_repeats(con, kind, rows.loc[parsed].copy(), RAW_COLS[kind])
+        write_raw(new, con, kind, shard_dir)
+    # Fuera de cuarentena antes de limpiar, sin commit: las que siguen fallando vuelven
+    # a entrar como nuevas, con el motivo y la hora de ahora
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS replay_qids(qid INTEGER PRIMARY KEY)")
+    con.execute("DELETE FROM temp.replay_qids")
+    con.executemany("INSERT INTO temp.replay_qids VALUES (?)", ((int(i),) for i in df["_qid"]))
+    con.execute(f"DELETE FROM quarantine_{kind} WHERE rowid IN (SELECT qid FROM temp.replay_qids)")
+    if kind == "ventas":
+        _, _, quar = clean_and_persist_ventas_from_raw(con, upserts["fact_ventas"], shard_dir, df=rows, run_id=run_id)
+    elif kind == "clientes":
+        _, _, quar = clean_and_persist_clientes_from_raw(con, upserts["clean_clientes"], None, upserts["hist_clientes"], df=rows, run_id=run_id)
+    else:
+        _, _, quar = clean_and_persist_productos_from_raw(con, upserts["clean_productos"], None, upserts["hist_productos"], df=rows, run_id=run_id)
+    batch_ids = df["_batch_id"].dropna().unique().tolist()
+    requeued = {
+        _key(r[0])
+        for r in con.execute(
+            f"SELECT _row FROM quarantine_{kind} WHERE _batch_id IN ({','.join('?' * len(batch_ids))}) "
+            "AND _ingest_ts >= ? AND _reason LIKE 'validation_failed%'",
+            (*batch_ids, started),
+        )
+    }
+    # Contadores del perfil de calidad (el último de cada drop afectado)
+    for src in df["_source_file"].dropna().unique():
+        for reason, like in ((PARSE_REASON, PARSE_REASON), ("validation_failed", "validation_failed%")):
+            n = con.execute(f"SELECT COUNT(*) FROM quarantine_{kind} WHERE _source_file = ? AND _reason LIKE ?", (src, like)).fetchone()[0]
+            quality.set_failures(con, src, reason, n)
+    con.commit()
+    recovered = q.loc[df.index].drop(columns="_header")
+    append_replayed(kind, recovered.loc[[_key(r) not in requeued for r in recovered["_row"]]].drop(columns="_qid"))
+    if rewrite_csv:
+        rewrite_quarantine_csv(con, kind)
+    if kind == "ventas":
+        rollup.refresh(con, shard_dir)
+    cdc.export_run(con, run_id)
+    res["recovered"] = len(df) - quar
+    res["requarantined"] = quar
+    return res
@@ -0,0 +1,81 @@
+"""Reporte Markdown releído desde Parquet (fuente de verdad) → output/reporte.md."""
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+from ut1 import paths
+
+def load_clean_ventas(parquet_dir: Path | None = None, arrow_dir: Path | None = None) -> pd.DataFrame:
+    # La exportación Arrow (--arrow) se lee con mmap; solo si no es más antigua que el Parquet
+    pq = (parquet_dir or paths.PARQUET_DIR) / "clean_ventas.parquet"
+    ipc = (arrow_dir or paths.ARROW_DIR) / "clean_ventas.arrow"
+    if ipc.exists() and (not pq.exists() or ipc.stat().st_mtime_ns >= pq.stat().st_mtime_ns):
+        from ut1.arrow_io import read_pandas
+        df = read_pandas(ipc)
+    else:
+        df = pd.read_parquet(pq)
+    df["fecha"] = pd.to_datetime(df["fecha"]).dt.date
+    df["importe"] = df["unidades"] * df["precio_unitario"]
+    return df
+
+def quality_counts(con: sqlite3.Connection, kind: str = "ventas") -> tuple[int, int, int]:
+    return tuple(
+        con.execute(f"SELECT COUNT(*) FROM {layer}_{kind}").fetchone()[0]
+        for layer in ("raw", "clean", "quarantine")
+    )
+
+def render_report(df: pd.DataFrame, counts: tuple[int, int, int], db: Path | None = None) -> str:
+    total = float(df["importe"].sum())
+    lineas = len(df)
+    ticket = total / lineas if lineas else 0.0
+    top = (
+        df.groupby("id_producto", as_index=False)["importe"].sum()
+        .sort_values(["importe", "id_producto"], ascending=[False, True])
+    )
+    top["pct"] = (top["importe"] / total).map("{:.0%}".format) if total else "0%"
+    diario = (
+        df.groupby("fecha", as_index=False)
+        .agg(importe_total=("importe", "sum"), transacciones=("importe", "size"))
+        .sort_values("fecha")
+    )
+    lider = top["id_producto"].iloc[0] if not top.empty else "-"
+    raw, clean, quar = counts
+    return "\n".join([
+        "# Reporte UT1 · Ventas",
+        f"**Periodo:** {df['fecha'].min()} a {df['fecha'].max()} · **Fuente:** clean_ventas (Parquet) · "
+        f"**Generado:** {datetime.now(timezone.utc).isoformat()}",
+        "",
+        "## 1. Titular",
+        f"Ingresos totales {total:.2f} €; producto líder: {lider}.",
+        "",
+        "## 2. KPIs",
+        f"- **Ingresos netos:** {total:.2f} €",
+        f"- **Ticket medio:** {ticket:.2f} €",
+        f"- **Transacciones:** {lineas}",
+        "",
+        "## 3. Top productos",
+        top.to_markdown(index=False),
+        "",
+        "## 4. Resumen por día",
+        diario.to_markdown(index=False),
+        "",
+        "## 5. Calidad y cobertura",
+        f"- Filas bronce: {raw} · Plata: {clean} · Cuarentena: {quar}",
+        "",
+        "## 6. Persistencia",
+        f"- Parquet: {paths.PARQUET_DIR}",
+        f"- SQLite : {db or paths.DB} (tablas: raw_ventas, clean_ventas; vistas y dims si cargaste clientes/productos)",
+        "",
+        "## 7. Conclusiones",
+        "- Reponer producto líder según demanda.",
+        "- Revisar filas en cuarentena (rangos/tipos).",
+        "- Valorar particionado por fecha para crecer.",
+        "",
+    ])
+
+def write_report(con: sqlite3.Connection, out: Path | None = None) -> Path:
+    out = out or paths.REPORT
+    df = load_clean_ventas()
+    out.write_text(render_report(df, quality_counts(con)), encoding="utf-8")
+    print("Reporte escrito:", out)
+    return out
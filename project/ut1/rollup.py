@@ -0,0 +1,200 @@
+"""
+Cubo oro día × producto (sql/30_rollup.sql) y consultas de rango sin tocar clean_ventas.
+
+Los triggers de fact_ventas anotan en gold_dirty_fechas los días que cambian;
+refresh() reagrega solo esos días (también desde los shards mensuales) y rehace
+las sumas acumuladas a partir del primer día tocado. Con los acumulados, los KPIs
+de cualquier rango son dos búsquedas por índice y el top-N dos por producto.
+El cubo va en claves enteras (fecha_dia, producto_sk); las fechas de las consultas se
+traducen en SQL con unixepoch() / 86400. Cada refresh anota además en report_dirty las
+páginas de informe (día, mes, categoría) que `publish` tiene que rehacer.
+Solo biblioteca estándar (subcomando `kpis`).
+"""
+import sqlite3
+from contextlib import ExitStack
+from datetime import date
+from pathlib import Path
+
+METRICS = ("unidades", "importe", "lineas")
+
+# Páginas afectadas por los días de temp.rollup_dirty (categorías: antes y después de reagregar)
+MARK_PERIODS_SQL = """
+INSERT OR IGNORE INTO report_dirty (kind, key)
+SELECT 'dia', date(fecha_dia * 86400, 'unixepoch') FROM temp.rollup_dirty
+UNION SELECT 'mes', strftime('%Y-%m', fecha_dia * 86400, 'unixepoch') FROM temp.rollup_dirty
+"""
+MARK_CATEGORIAS_SQL = """
+INSERT OR IGNORE INTO report_dirty (kind, key)
+SELECT DISTINCT 'categoria', COALESCE(categoria, '') FROM gold_ventas_dia_producto
+WHERE fecha_dia IN (SELECT fecha_dia FROM temp.rollup_dirty)
+"""
+MARK_CAMBIO_CATEGORIA_SQL = """
+WITH cambios AS (
+  SELECT g.categoria AS antes, cp.categoria AS despues
+  FROM gold_productos g
+  JOIN dim_producto d ON d.producto_sk = g.producto_sk
+  JOIN clean_productos cp ON cp.id_producto = d.id_producto
+  WHERE g.categoria IS NOT cp.categoria
+)
+INSERT OR IGNORE INTO report_dirty (kind, key)
+SELECT 'categoria', COALESCE(antes, '') FROM cambios
+UNION SELECT 'categoria', COALESCE(despues, '') FROM cambios
+"""
+
+def _sources(stack: ExitStack, con: sqlite3.Connection, shard_dir: Path | None) -> list[sqlite3.Connection]:
+    srcs = [con]
+    if shard_dir is not None and shard_dir.exists():
+        for p in sorted(shard_dir.glob("ventas_*.db")):
+            sc = sqlite3.connect(p)
+            stack.callback(sc.close)
+            srcs.append(sc)
+    return srcs
+
+def _dirty(sc: sqlite3.Connection) -> set[int]:
+    try:
+        return {r[0] for r in sc.execute("SELECT fecha_dia FROM gold_dirty_fechas")}
+    except sqlite3.OperationalError:  # shard creado antes de existir el cubo
+        return set()
+
+def _prefix_sums(con: sqlite3.Connection, table: str, keys: list[str], partition: str, since: int):
+    win = f"PARTITION BY {partition} ORDER BY fecha_dia" if partition else "ORDER BY fecha_dia"
+    sums = ", ".join(f"SUM({m}) OVER win AS c_{m}" for m in METRICS)
+    sets = ", ".join(f"cum_{m} = w.c_{m}" for m in METRICS)
+    join = " AND ".join(f"{table}.{k} = w.{k}" for k in keys)
+    con.execute(
+        f"UPDATE {table} SET {sets} "
+        f"FROM (SELECT {', '.join(keys)}, {sums} FROM {table} WINDOW win AS ({win})) AS w "
+        f"WHERE {join} AND {table}.fecha_dia >= ?",
+        (since,),
+    )
+
+def _mark_all(srcs: list[sqlite3.Connection]):
+    for sc in srcs:
+        sc.execute("CREATE TABLE IF NOT EXISTS gold_dirty_fechas(fecha_dia INTEGER PRIMARY KEY)")
+        sc.execute("INSERT OR IGNORE INTO gold_dirty_fechas SELECT DISTINCT fecha_dia FROM fact_ventas")
+        sc.commit()
+
+def refresh(con: sqlite3.Connection, shard_dir: Path | None = None) -> int:
+    """Recalcula los días anotados como sucios. Devuelve cuántos días se tocaron."""
+    with ExitStack() as stack:
+        srcs = _sources(stack, con, shard_dir)
+        # Cubo vacío (BD anterior a los triggers o recién migrada): se arranca desde todo fact_ventas
+        if con.execute("SELECT 1 FROM gold_ventas_dia LIMIT 1").fetchone() is None:
+            _mark_all(srcs)
+        dirty = set().union(*(_dirty(sc) for sc in srcs))
+        if not dirty:
+            refresh_categorias(con)  # un drop solo de productos también puede cambiar categorías
+            con.commit()
+            return 0
+        fechas = sorted(dirty)
+        con.execute("CREATE TEMP TABLE IF NOT EXISTS rollup_dirty(fecha_dia INTEGER PRIMARY KEY)")
+        con.execute("DELETE FROM temp.rollup_dirty")
+        con.executemany("INSERT INTO temp.rollup_dirty VALUES (?)", [(f,) for f in fechas])
+        con.execute(MARK_PERIODS_SQL)
+        con.execute(MARK_CATEGORIAS_SQL)
+        con.execute("DELETE FROM gold_ventas_dia_producto WHERE fecha_dia IN (SELECT fecha_dia FROM temp.rollup_dirty)")
+        con.execute("DELETE FROM gold_ventas_dia WHERE fecha_dia IN (SELECT fecha_dia FROM temp.rollup_dirty)")
+        marks = ",".join("?" * len(fechas))
+        for sc in srcs:
+            rows = sc.execute(
+                "SELECT fecha_dia, producto_sk, SUM(unidades), SUM(unidades * precio_unitario), COUNT(*) "
+                f"FROM fact_ventas WHERE fecha_dia IN ({marks}) GROUP BY fecha_dia, producto_sk",
+                fechas,
+            ).fetchall()
+            con.executemany(
+                "INSERT INTO gold_ventas_dia_producto (fecha_dia, producto_sk, unidades, importe, lineas) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(fecha_dia, producto_sk) DO UPDATE SET unidades = unidades + excluded.unidades, "
+                "importe = importe + excluded.importe, lineas = lineas + excluded.lineas",
+                rows,
+            )
+        con.execute("INSERT OR IGNORE INTO gold_productos (producto_sk) SELECT DISTINCT producto_sk FROM gold_ventas_dia_producto WHERE fecha_dia IN (SELECT fecha_dia FROM temp.rollup_dirty)")
+        refresh_categorias(con)
+        con.execute(MARK_CATEGORIAS_SQL)
+        con.execute(
+            "INSERT INTO gold_ventas_dia (fecha_dia, unidades, importe, lineas) "
+            "SELECT fecha_dia, SUM(unidades), SUM(importe), SUM(lineas) FROM gold_ventas_dia_producto "
+            "WHERE fecha_dia IN (SELECT fecha_dia FROM temp.rollup_dirty) GROUP BY fecha_dia"
+        )
+        _prefix_sums(con, "gold_ventas_dia_producto", ["fecha_dia", "producto_sk"], "producto_sk", fechas[0])
+        _prefix_sums(con, "gold_ventas_dia", ["fecha_dia"], "", fechas[0])
+        con.execute("DELETE FROM gold_dirty_fechas")
+        con.commit()
+        # Los shards se limpian después del commit del cubo: si algo falla antes, se recalculan otra vez
+        for sc in srcs[1:]:
+            if _dirty(sc):
+                sc.execute("DELETE FROM gold_dirty_fechas")
+                sc.commit()
+        return len(fechas)
+
+def refresh_categorias(con: sqlite3.Connection):
+    """Propaga al cubo la categoría vigente en clean_productos (y anota las páginas de ambas categorías)."""
+    con.execute(MARK_CAMBIO_CATEGORIA_SQL)
+    for table in ("gold_productos", "gold_ventas_dia_producto"):
+        con.execute(
+            f"UPDATE {table} SET categoria = cp.categoria "
+            "FROM dim_producto d JOIN clean_productos cp ON cp.id_producto = d.id_producto "
+            f"WHERE {table}.producto_sk = d.producto_sk AND {table}.categoria IS NOT cp.categoria"
+        )
+
+def rebuild(con: sqlite3.Connection, shard_dir: Path | None = None) -> int:
+    """Vacía el cubo y lo recalcula entero desde fact_ventas."""
+    con.execute("DELETE FROM gold_ventas_dia_producto")
+    con.execute("DELETE FROM gold_ventas_dia")
+    con.execute("DELETE FROM gold_productos")
+    return refresh(con, shard_dir)
+
+# Consultas de rango (fechas 'AAAA-MM-DD', ambos extremos incluidos)
+def check_range(desde: str, hasta: str) -> tuple[str, str]:
+    """Rango validado y en ISO. ValueError si una fecha no es AAAA-MM-DD o desde > hasta."""
+    try:
+        d0, d1 = date.fromisoformat(desde), date.fromisoformat(hasta)
+    except ValueError:
+        raise ValueError(f"Fechas no válidas (AAAA-MM-DD): desde={desde!r} hasta={hasta!r}") from None
+    if d0 > d1:
+        raise ValueError(f"Rango vacío: desde {desde} > hasta {hasta}")
+    return d0.isoformat(), d1.isoformat()
+
+def range_kpis(con: sqlite3.Connection, desde: str, hasta: str) -> dict:
+    desde, hasta = check_range(desde, hasta)
+    cols = ", ".join(f"cum_{m}" for m in METRICS)
+    q = f"SELECT {cols} FROM gold_ventas_dia WHERE fecha_dia {{op}} unixepoch(?) / 86400 ORDER BY fecha_dia DESC LIMIT 1"
+    hi = con.execute(q.format(op="<="), (hasta,)).fetchone() or (0, 0, 0)
+    lo = con.execute(q.format(op="<"), (desde,)).fetchone() or (0, 0, 0)
+    unidades, importe, lineas = (h - l for h, l in zip(hi, lo))
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "ingresos": importe,
+        "unidades": unidades,
+        "lineas": lineas,
+        "ticket_medio": importe / lineas if lineas else 0.0,
+    }
+
+def productos_en_rango(con: sqlite3.Connection, desde: str, hasta: str) -> list[tuple]:
+    """(id_producto, categoria, unidades, importe, lineas) de cada producto en el rango."""
+    desde, hasta = check_range(desde, hasta)
+    def delta(m: str) -> str:
+        cum = f"SELECT cum_{m} FROM gold_ventas_dia_producto WHERE producto_sk = p.producto_sk AND fecha_dia {{op}} ORDER BY fecha_dia DESC LIMIT 1"
+        return f"COALESCE(({cum.format(op='<= unixepoch(:hasta) / 86400')}), 0) - COALESCE(({cum.format(op='< unixepoch(:desde) / 86400')}), 0)"
+    sql = (
+        f"SELECT d.id_producto, p.categoria, {', '.join(delta(m) for m in METRICS)} "
+        "FROM gold_productos p JOIN dim_producto d ON d.producto_sk = p.producto_sk"
+    )
+    rows = con.execute(sql, {"desde": desde, "hasta": hasta}).fetchall()
+    return [r for r in rows if r[4]]
+
+def top_productos(con: sqlite3.Connection, desde: str, hasta: str, n: int = 10, by: str = "importe") -> list[tuple]:
+    if by not in METRICS:
+        raise ValueError(f"Métrica desconocida: {by} (disponibles: {METRICS})")
+    idx = 2 + METRICS.index(by)
+    rows = productos_en_rango(con, desde, hasta)
+    return sorted(rows, key=lambda r: (-r[idx], r[0]))[:n]
+
+def por_categoria(con: sqlite3.Connection, desde: str, hasta: str) -> list[tuple]:
+    """(categoria, unidades, importe, lineas) en el rango, ordenado por importe."""
+    acc: dict[str, list[float]] = {}
+    for _, cat, *vals in productos_en_rango(con, desde, hasta):
+        tot = acc.setdefault(cat or "(sin categoría)", [0, 0, 0])
+        for i, v in enumerate(vals):
+            tot[i] += v
+    return sorted(((c, *v) for c, v in acc.items()), key=lambda r: (-r[2], r[0]))
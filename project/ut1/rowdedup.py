@@ -0,0 +1,219 @@
+"""
+Dedupe de filas en ingest: los reenvíos solapados de un proveedor no se vuelven a guardar en raw_*.
+
+Cada fila lleva una huella de 64 bits de sus columnas de negocio (ya recortadas; sin
+_ingest_ts/_source_file). Una fila se salta solo si:
+- es un reenvío exacto de su mismo fichero (huella de fichero + fila ya vista en un batch
+  anterior: --full, un drop tocado), o
+- es igual a la versión vigente de su clave (KEY_COLS) en raw_*: la fila anterior de la
+  misma clave en el batch o, si no hay, la de raw_current.
+Así un A→B→A del mismo id guarda la vuelta a A: no es un reenvío, es un cambio.
+
+Las huellas de fichero + fila viven en raw_fingerprints (PK entera, WITHOUT ROWID) y un
+filtro de Bloom por dominio (raw_fingerprint_bloom) descarta sin consultar la tabla la
+mayoría de filas nuevas; solo las que el filtro da por vistas se confirman con la PK. Las
+repetidas se cuentan en el perfil del batch (repeated_row) pero no se escriben. Con 64
+bits, la probabilidad de colisión con 100M de filas es ~3e-4.
+
+Con un BloomCache (ingest de un run) el filtro se lee una vez por dominio y se guarda al
+final (flush), no en cada drop. Hasta entonces el dominio queda anotado en
+raw_fingerprint_bloom_stale, en la transacción de cada batch: si el run muere antes del
+flush, quien cargue el filtro lo reconstruye desde raw_fingerprints. Sin caché (workers,
+replay: otros procesos pueden estar añadiendo huellas) se lee y guarda por batch.
+Dos workers que ingieren a la vez la misma fila pueden guardarla ambos; clean la
+colapsa igualmente por clave.
+"""
+import sqlite3
+import numpy as np
+import pandas as pd
+from ut1.keys import BATCH
+from ut1.sketches import BloomFilter
+
+MIN_CAPACITY = 1 << 16
+REASON = "repeated_row"
+# Clave de negocio de cada dominio (la del "último gana" de clean)
+KEY_COLS = {
+    "ventas": ["fecha", "id_cliente", "id_producto"],
+    "clientes": ["id_cliente"],
+    "productos": ["id_producto"],
+}
+
+def row_fingerprints(df: pd.DataFrame, cols: list[str]) -> np.ndarray:
+    """Huella int64 por fila; nulos y "" cuentan igual. Estable entre ejecuciones (hash_array con clave fija)."""
+    h = np.zeros(len(df), dtype=np.uint64)
+    for c in cols:
+        if c in df.columns:
+            v = df[c].fillna("").astype(str).to_numpy(dtype=object)
+        else:
+            v = np.full(len(df), "", dtype=object)
+        with np.errstate(over="ignore"):
+            h = (h ^ pd.util.hash_array(v)) * np.uint64(0x100000001B3)  # mezcla FNV: el orden de columnas cuenta
+    return h.view(np.int64)
+
+def source_fingerprints(fps: np.ndarray, sources: pd.Series) -> np.ndarray:
+    """Huella de fichero + fila a partir de la de la fila (reenvíos exactos del mismo _source_file)."""
+    with np.errstate(over="ignore"):
+        h = (fps.view(np.uint64) ^ pd.util.hash_array(sources.fillna("").astype(str).to_numpy(dtype=object))) * np.uint64(0x100000001B3)
+    return h.view(np.int64)
+
+def _load_bloom(con: sqlite3.Connection, kind: str) -> BloomFilter | None:
+    """Filtro guardado; None si no hay o si se quedó por detrás de raw_fingerprints."""
+    if con.execute("SELECT 1 FROM raw_fingerprint_bloom_stale WHERE kind = ?", (kind,)).fetchone():
+        return None
+    row = con.execute("SELECT m, k, n, bits FROM raw_fingerprint_bloom WHERE kind = ?", (kind,)).fetchone()
+    if row is None:
+        return None
+    m, k, n, bits = row
+    return BloomFilter(m, k, np.frombuffer(bits, dtype=np.uint8).copy(), n)
+
+def _save_bloom(con: sqlite3.Connection, kind: str, bloom: BloomFilter):
+    con.execute(
+        "INSERT OR REPLACE INTO raw_fingerprint_bloom (kind, m, k, n, bits) VALUES (?, ?, ?, ?, ?)",
+        (kind, bloom.m, bloom.k, bloom.n, bloom.bits.tobytes()),
+    )
+    con.execute("DELETE FROM raw_fingerprint_bloom_stale WHERE kind = ?", (kind,))
+
+class BloomCache:
+    """Filtros de un run en memoria, por dominio; flush() guarda los que cambiaron (con commit)."""
+
+    def __init__(self):
+        self.blooms: dict[str, BloomFilter] = {}
+        self.dirty: set[str] = set()
+
+    def get(self, con: sqlite3.Connection, kind: str) -> BloomFilter:
+        if kind not in self.blooms:
+            self.blooms[kind] = _load_bloom(con, kind) or rebuild_bloom(con, kind)
+        return self.blooms[kind]
+
+    def changed(self, con: sqlite3.Connection, kind: str, bloom: BloomFilter):
+        """Sin commit: la marca de desfase va en la transacción del batch que añadió las huellas."""
+        self.blooms[kind] = bloom
+        self.dirty.add(kind)
+        con.execute("INSERT OR IGNORE INTO raw_fingerprint_bloom_stale (kind) VALUES (?)", (kind,))
+
+    def flush(self, con: sqlite3.Connection):
+        for kind in sorted(self.dirty):
+            _save_bloom(con, kind, self.blooms[kind])
+        con.commit()
+        self.dirty.clear()
+
+def rebuild_bloom(con: sqlite3.Connection, kind: str, capacity: int = MIN_CAPACITY) -> BloomFilter:
+    """Filtro nuevo desde raw_fingerprints, con sitio para `capacity` huellas (sin commit)."""
+    total = con.execute("SELECT COUNT(*) FROM raw_fingerprints WHERE kind = ?", (kind,)).fetchone()[0]
+    bloom = BloomFilter.for_capacity(max(capacity, 2 * total, MIN_CAPACITY))
+    cur = con.execute("SELECT fp FROM raw_fingerprints WHERE kind = ?", (kind,))
+    while rows := cur.fetchmany(100_000):
+        bloom.add_hashes(np.array([r[0] for r in rows], dtype=np.int64).view(np.uint64))
+    _save_bloom(con, kind, bloom)
+    return bloom
+
+def _known(con: sqlite3.Connection, kind: str, fps: np.ndarray) -> dict[int, str]:
+    """Huella de fichero + fila → _ingest_ts con el que se vio por primera vez."""
+    found: dict[int, str] = {}
+    values = fps.tolist()
+    for i in range(0, len(values), BATCH):
+        part = values[i:i + BATCH]
+        q = f"SELECT fp, _ingest_ts FROM raw_fingerprints WHERE kind = ? AND fp IN ({','.join('?' * len(part))})"
+        found.update(con.execute(q, [kind, *part]))
+    return found
+
+def _current(con: sqlite3.Connection, kind: str, key_fps: np.ndarray) -> dict[int, int]:
+    """Huella de la clave → huella de su versión vigente en raw_*."""
+    found: dict[int, int] = {}
+    values = key_fps.tolist()
+    for i in range(0, len(values), BATCH):
+        part = values[i:i + BATCH]
+        q = f"SELECT key_fp, fp FROM raw_current WHERE kind = ? AND key_fp IN ({','.join('?' * len(part))})"
+        found.update(con.execute(q, [kind, *part]))
+    return found
+
+def filter_repeats(
+    con: sqlite3.Connection,
+    kind: str,
+    df: pd.DataFrame,
+    cols: list[str],
+    fps: np.ndarray | None = None,
+    cache: BloomCache | None = None,
+) -> tuple[pd.DataFrame, int]:
+    """
+    Quita de `df` los reenvíos exactos de su fichero y las filas iguales a la versión vigente
+    de su clave; registra las huellas de fichero + fila de todas y la nueva versión vigente de
+    cada clave, con _source_file/_ingest_ts para poder purgarlas. Sin commit: va en la
+    transacción del batch. `fps` = row_fingerprints(df, cols) si ya se calcularon.
+    Con `cache`, el filtro sale de memoria y se guarda en su flush().
+    Devuelve (filas a guardar, repetidas).
+    """
+    if df.empty:
+        return df, 0
+    fps = row_fingerprints(df, cols) if fps is None else fps
+    sfps = source_fingerprints(fps, df["_source_file"])
+    ts = df["_ingest_ts"].to_numpy(dtype=object)
+    bloom = cache.get(con, kind) if cache is not None else _load_bloom(con, kind) or rebuild_bloom(con, kind)
+    # 1) Reenvío exacto: la misma línea del mismo fichero, vista en un batch anterior
+    resent = np.zeros(len(df), dtype=bool)
+    seen = np.zeros(len(df), dtype=bool)
+    maybe = np.flatnonzero(bloom.might_contain(sfps.view(np.uint64)))
+    if len(maybe):
+        known = _known(con, kind, np.unique(sfps[maybe]))
+        first_ts = [known.get(fp) for fp in sfps[maybe].tolist()]
+        seen[maybe] = [t0 is not None for t0 in first_ts]
+        resent[maybe] = [t0 is not None and t0 < t for t0, t in zip(first_ts, ts[maybe])]
+    # 2) Igual a la versión vigente de su clave: la fila anterior del batch o, si no hay, la de raw_current
+    key_fps = row_fingerprints(df, KEY_COLS[kind])
+    rest = np.flatnonzero(~resent)
+    order = rest[np.argsort(key_fps[rest], kind="stable")]  # por clave y, dentro, en orden de llegada
+    k, f = key_fps[order], fps[order]
+    same = np.zeros(len(k), dtype=bool)
+    same[1:] = (k[1:] == k[:-1]) & (f[1:] == f[:-1])
+    first = np.flatnonzero(np.r_[True, k[1:] != k[:-1]]) if len(k) else np.empty(0, dtype=np.intp)
+    current = _current(con, kind, k[first]) if len(first) else {}
+    same[first] = [current.get(key) == fp for key, fp in zip(k[first].tolist(), f[first].tolist())]
+    repeated = resent.copy()
+    repeated[order] = same
+    keep = df.loc[~repeated]
+    # Huellas de fichero + fila aún sin registrar, también las de filas saltadas por la regla 2:
+    # un --full de este fichero tiene que reconocerlas como reenvío
+    # np.unique las deja en orden de PK, como fact_ventas: cada inserción cae junto a la anterior en el B-tree
+    new, pos = np.unique(sfps[~seen], return_index=True)
+    if len(new):
+        con.executemany(
+            "INSERT OR IGNORE INTO raw_fingerprints (kind, fp, _source_file, _ingest_ts) VALUES (?, ?, ?, ?)",
+            zip([kind] * len(new), new.tolist(), df["_source_file"].to_numpy()[~seen][pos].tolist(), ts[~seen][pos].tolist()),
+        )
+        if bloom.n + len(new) > bloom.capacity:
+            bloom = rebuild_bloom(con, kind, 2 * (bloom.n + len(new)))
+            if cache is not None:
+                cache.blooms[kind] = bloom
+        elif cache is not None:
+            bloom.add_hashes(new.view(np.uint64))
+            cache.changed(con, kind, bloom)
+        else:
+            bloom.add_hashes(new.view(np.uint64))
+            _save_bloom(con, kind, bloom)
+    if len(keep):
+        # Versión vigente = la última guardada de cada clave (un replay con _ingest_ts anterior no la pisa)
+        last = ~pd.Series(key_fps[~repeated]).duplicated(keep="last").to_numpy()
+        con.executemany(
+            """INSERT INTO raw_current (kind, key_fp, fp, _source_file, _ingest_ts) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(kind, key_fp) DO UPDATE SET fp = excluded.fp, _source_file = excluded._source_file,
+              _ingest_ts = excluded._ingest_ts
+            WHERE excluded._ingest_ts >= raw_current._ingest_ts""",
+            zip([kind] * int(last.sum()), key_fps[~repeated][last].tolist(), fps[~repeated][last].tolist(),
+                keep["_source_file"].to_numpy()[last].tolist(), ts[~repeated][last].tolist()),
+        )
+    return keep, int(repeated.sum())
+
+def forget(con: sqlite3.Connection, kind: str, source_file: str, since: str) -> int:
+    """
+    Borra las huellas de un intento interrumpido (el filtro conserva sus bits: solo falsos
+    positivos). Sus claves se quedan sin versión vigente: la próxima fila de cada una se guarda.
+    """
+    con.execute("DELETE FROM raw_current WHERE kind = ? AND _source_file = ? AND _ingest_ts >= ?", (kind, source_file, since))
+    return con.execute(
+        "DELETE FROM raw_fingerprints WHERE kind = ? AND _source_file = ? AND _ingest_ts >= ?",
+        (kind, source_file, since),
+    ).rowcount
+
+def forget_current(con: sqlite3.Connection, kind: str):
+    """Sin dedupe (--keep-repeats) raw_current se quedaría atrás: se vacía el dominio (sin commit)."""
+    con.execute("DELETE FROM raw_current WHERE kind = ?", (kind,))
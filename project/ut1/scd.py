@@ -0,0 +1,125 @@
+"""
+Historia SCD2 de clientes/productos (hist_*) y join as-of vectorizado contra ella.
+
+Cada batch de clean hace UPSERT de sus versiones (id, valid_from, _ingest_ts) y después
+close_versions() rehace valid_to de los ids tocados con LEAD(valid_from). Solo se abre
+versión cuando cambia algún atributo; si una corrección llega con la misma fecha de
+negocio, la versión previa queda con valid_to = valid_from y el as-of ve la corregida.
+
+El as-of no busca fila a fila: codifica (id, día) en un int64, ordena la historia
+una vez y resuelve todas las ventas con un único np.searchsorted (merge ordenado,
+O(n log m)). Con ventas_asof() se recorre clean_ventas (o los shards) por trozos,
+así que el coste de memoria no depende del tamaño total de ventas.
+"""
+import sqlite3
+from collections.abc import Iterator
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from ut1 import keys
+
+MIN_DATE = "0001-01-01"  # valid_from de versiones sin fecha de negocio
+MAX_DATE = "9999-12-31"  # valid_to de la versión vigente
+
+# kind → (tabla de historia, clave, columna de fecha de negocio que da valid_from)
+HIST = {
+    "clientes": ("hist_clientes", "id_cliente", "fecha"),
+    "productos": ("hist_productos", "id_producto", "fecha_entrada"),
+}
+
+def close_versions(con: sqlite3.Connection, kind: str, ids) -> int:
+    """Recalcula valid_to de las versiones de `ids` (la siguiente valid_from, o MAX_DATE)."""
+    table, key, _ = HIST[kind]
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS scd_ids(id TEXT PRIMARY KEY)")
+    con.execute("DELETE FROM temp.scd_ids")
+    con.executemany("INSERT OR IGNORE INTO temp.scd_ids VALUES (?)", ((i,) for i in ids))
+    return con.execute(
+        f"""
+        UPDATE {table} SET valid_to = w.nxt
+        FROM (
+          SELECT rowid AS rid,
+                 LEAD(valid_from, 1, '{MAX_DATE}') OVER (PARTITION BY {key} ORDER BY valid_from, _ingest_ts) AS nxt
+          FROM {table} WHERE {key} IN (SELECT id FROM temp.scd_ids)
+        ) AS w
+        WHERE {table}.rowid = w.rid AND {table}.valid_to IS NOT w.nxt
+        """
+    ).rowcount
+
+# As-of: (id, día) → int64 ordenable. 2^23 días cubre 0001-01-01..9999-12-31 desplazado a positivo
+_DAY_OFFSET = 1 << 22
+_DAY_BITS = 23
+
+def _days(fechas) -> np.ndarray:
+    """'AAAA-MM-DD' → días desde 1970 + desplazamiento (int64); nulos → -1. Solo parsea las fechas únicas."""
+    codes, uniques = pd.factorize(pd.Series(fechas, dtype=object), use_na_sentinel=True)
+    d = np.array([str(u)[:10] for u in uniques] + ["NaT"], dtype="datetime64[D]")
+    days = np.where(np.isnat(d), -1, d.astype("int64") + _DAY_OFFSET)
+    return days[codes]  # código -1 (nulo) → último elemento, NaT
+
+class AsOfIndex:
+    """Historia de una dimensión ordenada por (id, valid_from), lista para resolver lotes de ventas."""
+
+    def __init__(self, hist: pd.DataFrame, key: str):
+        self.key = key
+        # Correcciones del mismo día: la última ingerida queda detrás y es la que encuentra searchsorted
+        hist = hist.sort_values([c for c in ("valid_from", "_ingest_ts") if c in hist.columns], kind="stable")
+        self.ids = pd.Index(pd.unique(hist[key]))
+        codes = self.ids.get_indexer(hist[key]).astype("int64")
+        keys = (codes << _DAY_BITS) | _days(hist["valid_from"])
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.hist = hist.iloc[order].reset_index(drop=True)
+        self.valid_to = _days(self.hist["valid_to"])
+
+    def positions(self, ids: pd.Series, fechas: pd.Series) -> np.ndarray:
+        """Posición en self.hist de la versión vigente para cada (id, fecha); -1 si no hay."""
+        ucodes, uniques = pd.factorize(pd.Series(ids, dtype=object))
+        codes = np.append(self.ids.get_indexer(uniques), -1).astype("int64")[ucodes]
+        days = _days(fechas)
+        probe = (codes << _DAY_BITS) | days
+        pos = np.searchsorted(self.keys, probe, side="right") - 1
+        ok = (codes >= 0) & (days >= 0) & (pos >= 0)
+        pos = np.where(ok, pos, 0)
+        # Misma entidad y fecha anterior al cierre de esa versión
+        ok &= (self.keys[pos] >> _DAY_BITS) == codes
+        ok &= days < self.valid_to[pos]
+        return np.where(ok, pos, -1)
+
+    def attach(self, df: pd.DataFrame, cols: list[str], date_col: str = "fecha", suffix: str = "_vigente") -> pd.DataFrame:
+        pos = self.positions(df[self.key], df[date_col])
+        out = df.copy()
+        hit = pos >= 0
+        for c in cols:
+            vals = self.hist[c].to_numpy()[np.where(hit, pos, 0)] if len(self.hist) else np.full(len(df), None)
+            out[c + suffix] = pd.Series(vals, index=df.index).where(hit)
+        return out
+
+def load_history(con: sqlite3.Connection, kind: str) -> AsOfIndex:
+    table, key, _ = HIST[kind]
+    return AsOfIndex(pd.read_sql_query(f"SELECT * FROM {table}", con), key)
+
+def asof_join(con: sqlite3.Connection, ventas: pd.DataFrame, kind: str = "productos", cols: list[str] | None = None) -> pd.DataFrame:
+    """Añade a `ventas` las columnas de la versión de `kind` vigente en su `fecha` (sufijo _vigente)."""
+    cols = cols or (["precio_unitario", "categoria"] if kind == "productos" else ["nombre", "apellido"])
+    return load_history(con, kind).attach(ventas, cols)
+
+def ventas_asof(
+    con: sqlite3.Connection,
+    shard_dir: Path | None = None,
+    cols: list[str] | None = None,
+    chunksize: int = 1_000_000,
+) -> Iterator[pd.DataFrame]:
+    """clean_ventas por trozos con precio/categoría de catálogo vigentes en cada fecha."""
+    idx = load_history(con, "productos")
+    cols = cols or ["precio_unitario", "categoria"]
+    sources = [con]
+    if shard_dir is not None and shard_dir.exists():
+        sources += [sqlite3.connect(p) for p in sorted(shard_dir.glob("ventas_*.db"))]
+    clientes, productos = keys.load(con, "cliente"), keys.load(con, "producto")
+    try:
+        for sc in sources:
+            for chunk in pd.read_sql_query("SELECT * FROM fact_ventas", sc, chunksize=chunksize):
+                yield idx.attach(keys.decode_ventas(chunk, clientes, productos), cols)
+    finally:
+        for sc in sources[1:]:
+            sc.close()
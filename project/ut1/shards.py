@@ -0,0 +1,255 @@
+"""
+Particionado mensual de las tablas de ventas en ficheros SQLite.
+
+Cada mes vive en su propia base de datos (output/shards/ventas_AAAA_MM.db) con
+raw_ventas y fact_ventas (claves enteras; los diccionarios dim_* y la vista clean_ventas
+están en ut1.db). Las escrituras se enrutan por `fecha` y las consultas
+oro se lanzan como UNION ALL sobre los shards que cubre el rango pedido, que se
+adjuntan (ATTACH) solo mientras dura la consulta. Los meses cerrados se pueden
+mover o comprimir sin tocar ut1.db ni el resto de meses.
+"""
+from __future__ import annotations
+import calendar
+import re
+import sqlite3
+from collections.abc import Callable
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+import pandas as pd
+from ut1 import keys, paths
+from ut1.coerce import parse_dates
+
+SHARD_SCHEMA = paths.SQL_DIR / "01_schema_shard_ventas.sql"
+SHARD_RE = re.compile(r"^ventas_(\d{4}_\d{2})\.db$")
+RANGE_VIEW = "ventas_rango"
+
+# Consultas oro sobre el rango; {ventas} se sustituye por la vista/tabla temporal de la UNION
+GOLD_SQL = {
+    "ventas_diarias": """
+        SELECT fecha, SUM(unidades * precio_unitario) AS importe_total, COUNT(*) AS lineas
+        FROM {ventas}
+        GROUP BY fecha
+        ORDER BY fecha
+    """,
+    "producto_mas_vendido": """
+        SELECT v.id_producto, cp.nombre_producto, SUM(v.unidades) AS unidades_vendidas
+        FROM {ventas} v
+        JOIN clean_productos cp ON cp.id_producto = v.id_producto
+        GROUP BY v.id_producto, cp.nombre_producto
+        ORDER BY unidades_vendidas DESC, v.id_producto
+        LIMIT 1
+    """,
+    "top_productos_importe": """
+        SELECT id_producto, SUM(unidades * precio_unitario) AS importe
+        FROM {ventas}
+        GROUP BY id_producto
+        ORDER BY importe DESC, id_producto
+    """,
+}
+
+def shard_key(fechas: pd.Series) -> pd.Series:
+    """Clave de shard 'AAAA_MM' por fila; NaN si la fecha no es válida."""
+    return parse_dates(fechas).dt.strftime("%Y_%m")
+
+def shard_path(shard_dir: Path, key: str) -> Path:
+    return shard_dir / f"ventas_{key}.db"
+
+def list_shards(shard_dir: Path) -> list[str]:
+    if not shard_dir.exists():
+        return []
+    return sorted(m.group(1) for p in shard_dir.iterdir() if (m := SHARD_RE.match(p.name)))
+
+def shards_range(keys: list[str]) -> tuple[str, str]:
+    """Primer y último día cubiertos por una lista ordenada de claves 'AAAA_MM'."""
+    y0, m0 = map(int, keys[0].split("_"))
+    y1, m1 = map(int, keys[-1].split("_"))
+    return date(y0, m0, 1).isoformat(), date(y1, m1, calendar.monthrange(y1, m1)[1]).isoformat()
+
+def months_in_range(desde: str, hasta: str) -> list[str]:
+    d0, d1 = date.fromisoformat(desde), date.fromisoformat(hasta)
+    if d1 < d0:
+        raise ValueError(f"Rango vacío: {desde} > {hasta}")
+    keys = []
+    y, m = d0.year, d0.month
+    while (y, m) <= (d1.year, d1.month):
+        keys.append(f"{y:04d}_{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return keys
+
+def open_shard(shard_dir: Path, key: str) -> sqlite3.Connection:
+    """Abre (y crea si no existe) el shard del mes `key`."""
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(shard_path(shard_dir, key))
+    con.executescript(SHARD_SCHEMA.read_text(encoding="utf-8"))
+    return con
+
+# Escritura: raw enrutado por fecha (las fechas no parseables quedan en ut1.db y caerán en cuarentena)
+def write_raw_ventas(df_raw: pd.DataFrame, con: sqlite3.Connection, shard_dir: Path) -> int:
+    keys = shard_key(df_raw["fecha"])
+    sin_fecha = df_raw.loc[keys.isna()]
+    if not sin_fecha.empty:
+        sin_fecha.to_sql("raw_ventas", con, if_exists="append", index=False)
+    for key, part in df_raw.loc[keys.notna()].groupby(keys[keys.notna()], sort=True):
+        sc = open_shard(shard_dir, key)
+        try:
+            part.to_sql("raw_ventas", sc, if_exists="append", index=False)
+            sc.commit()
+        finally:
+            sc.close()
+    return len(df_raw)
+
+def query_all(con: sqlite3.Connection, shard_dir: Path, sql: str, params: tuple = ()) -> pd.DataFrame:
+    """La misma consulta en ut1.db y en cada shard mensual, concatenada."""
+    frames = [pd.read_sql_query(sql, con, params=params)]
+    for key in list_shards(shard_dir):
+        sc = sqlite3.connect(shard_path(shard_dir, key))
+        try:
+            frames.append(pd.read_sql_query(sql, sc, params=params))
+        finally:
+            sc.close()
+    return pd.concat(frames, ignore_index=True)
+
+def read_all(con: sqlite3.Connection, shard_dir: Path, table: str, where: str = "", params: tuple = ()) -> pd.DataFrame:
+    return query_all(con, shard_dir, f"SELECT * FROM {table} {where}", params)
+
+def read_raw_ventas(con: sqlite3.Connection, shard_dir: Path, where: str = "", params: tuple = ()) -> pd.DataFrame:
+    return read_all(con, shard_dir, "raw_ventas", where, params)
+
+def _iter_query(con: sqlite3.Connection, sql: str, params: tuple, chunksize: int | Callable[[], int]):
+    if not callable(chunksize):
+        yield from pd.read_sql_query(sql, con, params=params, chunksize=chunksize)
+        return
+    # Tamaño variable (autoajuste): se pregunta antes de cada trozo
+    cur = con.execute(sql, params)
+    cols = [d[0] for d in cur.description]
+    while rows := cur.fetchmany(chunksize()):
+        yield pd.DataFrame.from_records(rows, columns=cols, coerce_float=True)
+
+def iter_raw_ventas(
+    con: sqlite3.Connection,
+    shard_dir: Path | None,
+    where: str = "",
+    params: tuple = (),
+    chunksize: int | Callable[[], int] = 100_000,
+):
+    """raw_ventas de ut1.db (y de cada shard si hay shard_dir) en trozos de `chunksize` filas (o de lo que devuelva)."""
+    sql = f"SELECT * FROM raw_ventas {where}"
+    yield from _iter_query(con, sql, params, chunksize)
+    for key in list_shards(shard_dir) if shard_dir is not None else []:
+        sc = sqlite3.connect(shard_path(shard_dir, key))
+        try:
+            yield from _iter_query(sc, sql, params, chunksize)
+        finally:
+            sc.close()
+
+def read_clean_ventas(con: sqlite3.Connection, shard_dir: Path) -> pd.DataFrame:
+    """clean_ventas de ut1.db y de todos los shards, con las claves naturales (dims de ut1.db)."""
+    fact = read_all(con, shard_dir, "fact_ventas")
+    return keys.decode_ventas(fact, keys.load(con, "cliente"), keys.load(con, "producto"))
+
+def delete_from_shards(shard_dir: Path, table: str, where: str, params: tuple = ()) -> int:
+    n = 0
+    for key in list_shards(shard_dir):
+        sc = sqlite3.connect(shard_path(shard_dir, key))
+        try:
+            n += sc.execute(f"DELETE FROM {table} {where}", params).rowcount
+            sc.commit()
+        finally:
+            sc.close()
+    return n
+
+def fact_params(clean: pd.DataFrame) -> list[dict]:
+    """Parámetros del UPSERT de fact_ventas (columnas fecha_dia, cliente_sk, producto_sk ya resueltas)."""
+    cols = ("fecha_dia", "cliente_sk", "producto_sk", "unidades", "precio_unitario", "_ingest_ts")
+    return [
+        {"dia": d, "csk": c, "psk": k, "u": u, "p": p, "ts": ts}
+        for d, c, k, u, p, ts in zip(*(clean[col].tolist() for col in cols))
+    ]
+
+def upsert_clean_ventas(clean: pd.DataFrame, shard_dir: Path, upsert_sql: str, cdc: bool = True) -> None:
+    """Aplica el UPSERT de fact_ventas en el shard de cada fila (una transacción por mes); `cdc` = feed encendido."""
+    keys = shard_key(clean["fecha"])
+    for key, part in clean.groupby(keys, sort=True):
+        params = fact_params(part)
+        sc = open_shard(shard_dir, key)
+        try:
+            sc.execute("INSERT OR REPLACE INTO cdc_context (id, enabled) VALUES (1, ?)", (int(cdc),))
+            sc.executemany(upsert_sql, params)
+            sc.commit()
+        finally:
+            sc.close()
+
+# Lectura: UNION ALL sobre los shards del rango (fact_ventas del shard + dims de ut1.db)
+CLEAN_SELECT = """
+    SELECT date(f.fecha_dia * 86400, 'unixepoch') AS fecha, c.id_cliente, p.id_producto,
+           f.unidades, f.precio_unitario, f._ingest_ts
+    FROM {alias}.fact_ventas f
+    JOIN main.dim_cliente c ON c.cliente_sk = f.cliente_sk
+    JOIN main.dim_producto p ON p.producto_sk = f.producto_sk
+    WHERE f.fecha_dia BETWEEN {desde} AND {hasta}
+"""
+
+def _day(fecha: str) -> int:
+    return (date.fromisoformat(fecha) - date(1970, 1, 1)).days
+
+def _drop_range(con: sqlite3.Connection):
+    row = con.execute("SELECT type FROM sqlite_temp_master WHERE name = ?", (RANGE_VIEW,)).fetchone()
+    if row:
+        con.execute(f"DROP {row[0].upper()} temp.{RANGE_VIEW}")
+
+@contextmanager
+def ventas_en_rango(con: sqlite3.Connection, shard_dir: Path, desde: str, hasta: str):
+    """
+    Expone temp.ventas_rango con las líneas de clean_ventas entre `desde` y `hasta`.
+    Si los shards caben en el límite de ATTACH se crea una vista temporal; si no,
+    se materializa en una tabla temporal adjuntando los shards por tandas.
+    ATTACH/DETACH no se permiten dentro de una transacción: se hace commit antes.
+    """
+    # Normaliza a AAAA-MM-DD y a número de día (fecha_dia de fact_ventas)
+    desde, hasta = date.fromisoformat(desde).isoformat(), date.fromisoformat(hasta).isoformat()
+    d0, d1 = _day(desde), _day(hasta)
+    wanted = set(months_in_range(desde, hasta))
+    keys = [k for k in list_shards(shard_dir) if k in wanted]
+    limit = con.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    attached: list[str] = []
+
+    def attach(key: str) -> str:
+        alias = f"v_{key}"
+        con.execute("ATTACH DATABASE ? AS " + alias, (str(shard_path(shard_dir, key)),))
+        attached.append(alias)
+        return alias
+
+    def detach_all():
+        con.commit()
+        while attached:
+            con.execute("DETACH DATABASE " + attached.pop())
+
+    con.commit()
+    _drop_range(con)
+    try:
+        if len(keys) <= limit:
+            aliases = [attach(k) for k in keys]
+            # Las vistas no admiten parámetros: los días son enteros calculados arriba
+            selects = [CLEAN_SELECT.format(alias=a, desde=d0, hasta=d1) for a in aliases]
+            if not selects:
+                selects = ["SELECT * FROM main.clean_ventas WHERE 0"]
+            con.execute(f"CREATE TEMP VIEW {RANGE_VIEW} AS " + " UNION ALL ".join(selects))
+        else:
+            con.execute(f"CREATE TEMP TABLE {RANGE_VIEW} AS SELECT * FROM main.clean_ventas WHERE 0")
+            for i in range(0, len(keys), limit):
+                for k in keys[i:i + limit]:
+                    alias = attach(k)
+                    con.execute(f"INSERT INTO temp.{RANGE_VIEW} " + CLEAN_SELECT.format(alias=alias, desde=d0, hasta=d1))
+                detach_all()
+        yield RANGE_VIEW
+    finally:
+        _drop_range(con)
+        detach_all()
+
+def gold_query(con: sqlite3.Connection, shard_dir: Path, name: str, desde: str, hasta: str) -> pd.DataFrame:
+    """Ejecuta una consulta de GOLD_SQL solo sobre los shards que necesita el rango."""
+    if name not in GOLD_SQL:
+        raise ValueError(f"Consulta oro desconocida: {name} (disponibles: {sorted(GOLD_SQL)})")
+    with ventas_en_rango(con, shard_dir, desde, hasta) as view:
+        return pd.read_sql_query(GOLD_SQL[name].format(ventas=view), con)
@@ -0,0 +1,160 @@
+"""
+Sketches fusionables para perfilar batches sin releer raw_*: HyperLogLog (distintos)
+y t-digest (cuantiles). Solo numpy; ambos se serializan a dict JSON y merge() es
+asociativo, así que el perfil de cualquier conjunto de batches es la fusión de los suyos.
+BloomFilter es el prefiltro del índice de huellas de fila de ingest (ut1/rowdedup.py).
+"""
+import base64
+import math
+import numpy as np
+
+class HyperLogLog:
+    """Cardinalidad aproximada con 2^p registros (p=14 → ~0.8 % de error típico, 16 KiB)."""
+
+    def __init__(self, p: int = 14, registers: np.ndarray | None = None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8) if registers is None else registers
+
+    def add_hashes(self, h: np.ndarray):
+        """Añade hashes uint64 (p. ej. de pandas.util.hash_array)."""
+        if len(h) == 0:
+            return
+        h = h.astype(np.uint64, copy=False)
+        idx = (h >> np.uint64(64 - self.p)).astype(np.intp)
+        w = (h & np.uint64((1 << (64 - self.p)) - 1)).astype(np.float64)  # < 2^52: exacto en float64
+        rank = np.full(len(h), 64 - self.p + 1, dtype=np.uint8)
+        nz = w > 0
+        rank[nz] = (64 - self.p) - np.floor(np.log2(w[nz])).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        return HyperLogLog(self.p, np.maximum(self.registers, other.registers))
+
+    def estimate(self) -> float:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        e = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if e <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # corrección de rango bajo (linear counting)
+        return float(e)
+
+    def to_dict(self) -> dict:
+        return {"p": self.p, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "HyperLogLog":
+        regs = np.frombuffer(base64.b64decode(d["registers"]), dtype=np.uint8).copy()
+        return cls(d["p"], regs)
+
+class TDigest:
+    """
+    t-digest con función de escala k1: centroides finos en las colas y gruesos en el centro.
+    La compresión es vectorizada: cada centroide cae en el cubo floor(k(q)) de su cuantil
+    y los cubos se agregan con bincount.
+    """
+
+    def __init__(self, delta: int = 500, means=None, weights=None, vmin: float = math.inf, vmax: float = -math.inf):
+        self.delta = delta
+        self.means = np.asarray(means if means is not None else [], dtype=np.float64)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=np.float64)
+        self.min = vmin
+        self.max = vmax
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def add(self, values: np.ndarray):
+        v = np.asarray(values, dtype=np.float64)
+        v = v[~np.isnan(v)]
+        if len(v) == 0:
+            return
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+        self._compress(np.concatenate([self.means, v]), np.concatenate([self.weights, np.ones(len(v))]))
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.delta / (2 * math.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+        bucket = np.floor(k - k.min()).astype(np.intp)
+        w = np.bincount(bucket, weights)
+        keep = w > 0
+        self.means = (np.bincount(bucket, weights * means)[keep]) / w[keep]
+        self.weights = w[keep]
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        out = TDigest(self.delta, vmin=min(self.min, other.min), vmax=max(self.max, other.max))
+        if self.count + other.count:
+            out._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+        return out
+
+    def quantile(self, q: float) -> float | None:
+        if not len(self.means):
+            return None
+        total = self.weights.sum()
+        mids = (np.cumsum(self.weights) - self.weights / 2) / total
+        xs = np.concatenate([[0.0], mids, [1.0]])
+        ys = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q, xs, ys))
+
+    def to_dict(self) -> dict:
+        return {
+            "delta": self.delta,
+            "means": self.means.round(6).tolist(),
+            "weights": self.weights.tolist(),
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "TDigest":
+        vmin = math.inf if d["min"] is None else d["min"]
+        vmax = -math.inf if d["max"] is None else d["max"]
+        return cls(d["delta"], d["means"], d["weights"], vmin, vmax)
+
+class BloomFilter:
+    """
+    Pertenencia aproximada sin falsos negativos: m bits (potencia de 2) y k posiciones por
+    hash uint64, derivadas de sus dos mitades (doble hashing). ~10 bits por elemento → ~1 %.
+    """
+
+    def __init__(self, m: int, k: int, bits: np.ndarray | None = None, n: int = 0):
+        self.m, self.k, self.n = m, k, n
+        self.bits = np.zeros(m // 8, dtype=np.uint8) if bits is None else bits
+
+    @classmethod
+    def for_capacity(cls, n: int, fp_rate: float = 0.01) -> "BloomFilter":
+        bits = max(64, math.ceil(-n * math.log(fp_rate) / math.log(2) ** 2))
+        m = 1 << (bits - 1).bit_length()
+        return cls(m, max(1, min(16, round(m / max(n, 1) * math.log(2)))))
+
+    @property
+    def capacity(self) -> int:
+        """Elementos que caben antes de pasar de ~1 % de falsos positivos."""
+        return int(self.m * math.log(2) ** 2 / -math.log(0.01))
+
+    def _positions(self, h: np.ndarray) -> np.ndarray:
+        h = h.astype(np.uint64, copy=False)
+        h1 = h & np.uint64(0xFFFFFFFF)
+        h2 = (h >> np.uint64(32)) | np.uint64(1)
+        i = np.arange(self.k, dtype=np.uint64)[:, None]
+        return ((h1 + i * h2) & np.uint64(self.m - 1)).astype(np.intp)
+
+    def add_hashes(self, h: np.ndarray):
+        if len(h) == 0:
+            return
+        pos = self._positions(h).ravel()
+        np.bitwise_or.at(self.bits, pos >> 3, (1 << (pos & 7)).astype(np.uint8))
+        self.n += len(h)
+
+    def might_contain(self, h: np.ndarray) -> np.ndarray:
+        """Máscara booleana: False = seguro que no está; True = probablemente sí."""
+        if len(h) == 0:
+            return np.zeros(0, dtype=bool)
+        pos = self._positions(h)
+        return ((self.bits[pos >> 3] >> (pos & 7).astype(np.uint8)) & 1).all(axis=0).astype(bool)
@@ -0,0 +1,241 @@
+"""
+Ingesta de drops en etapas solapadas con asyncio (la usan `ingest` y `run`).
+
+    lectura ──cola──▶ parseo ──cola──▶ escritura
+
+- lectura: descomprime cada drop en streaming, en trozos de líneas enteras de
+  ~`chunk_bytes` (readlines), en un pool de hilos; la cabecera va aparte con cada trozo;
+- parseo: conteo de campos, parse_lines y huellas de fila de cada trozo, en un pool
+  de procesos (o en un hilo si parse_workers=1), varios trozos a la vez;
+- escritura: una sola tarea, en su propio hilo y con su propia conexión a ut1.db
+  (sqlite3 no comparte conexiones entre hilos): journal, cuarentena, raw_*, claves y
+  perfil trozo a trozo, un batch por drop (ingest.DropBatch) que se cierra con la marca
+  de fin de drop. Los filtros de Bloom del dedupe viven en memoria durante toda la
+  ingesta y se guardan una vez al final (rowdedup.BloomCache).
+
+Las colas tienen tamaño fijo (`depth`): si la escritura se atrasa, el parseo y la
+lectura se paran en el put, así que en memoria hay como mucho ~2·depth + workers
+trozos, sea cual sea el tamaño de los drops. La cola de parseo lleva futuros en el
+orden de lectura, así que la escritura confirma en el mismo orden que la ingesta
+secuencial. El bucle de eventos nunca hace trabajo: solo mueve trozos entre pools, y
+el tiempo total tiende al de la etapa más lenta en vez de a la suma. Métricas: tiempo ocupado por etapa, esperas por
+cola llena (contrapresión) y profundidad media/máxima de cada cola (muestreada).
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from ut1 import rowdedup
+
+DEPTH = 2  # trozos por cola
+CHUNK_BYTES = 4 << 20  # tamaño aproximado de un trozo de lectura (caracteres)
+SAMPLE_S = 0.02  # periodo de muestreo de la profundidad de las colas
+
+@dataclass
+class StageStats:
+    busy: float = 0.0  # segundos trabajando (dentro del pool)
+    blocked: float = 0.0  # segundos esperando sitio en la cola de salida
+    items: int = 0
+
+@dataclass
+class QueueStats:
+    size: int
+    samples: list[int] = field(default_factory=list)
+
+    @property
+    def mean(self) -> float:
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    @property
+    def peak(self) -> int:
+        return max(self.samples, default=0)
+
+def _parse(kind: str, header: str, text: str) -> tuple[list[str], pd.DataFrame, np.ndarray, float]:
+    """Etapa de parseo (en proceso aparte) de un trozo sin cabecera: líneas malas, DataFrame, huellas y segundos."""
+    from ut1.ingest import RAW_COLS, parse_lines, split_text
+    t0 = time.perf_counter()
+    good, bad = split_text(text, header)
+    del text
+    df = parse_lines(good)
+    fps = rowdedup.row_fingerprints(df, RAW_COLS[kind]) if not df.empty else np.empty(0, dtype=np.int64)
+    return bad, df, fps, time.perf_counter() - t0
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+def _db_path(con: sqlite3.Connection) -> Path:
+    return Path(next(r[2] for r in con.execute("PRAGMA database_list") if r[1] == "main"))
+
+async def _put(q: asyncio.Queue, item, st: StageStats):
+    t0 = time.perf_counter()
+    await q.put(item)
+    st.blocked += time.perf_counter() - t0
+
+async def _reader(files: list[tuple[Path, str, str]], out: asyncio.Queue, pool: Executor, st: StageStats, chunk_bytes: int):
+    """(drop, kind, huella, cabecera, texto) por trozo y, al acabar cada drop, la marca con texto None."""
+    from ut1.drops import open_drop
+    loop = asyncio.get_running_loop()
+    for f, kind, fp in files:
+        try:
+            fh = await loop.run_in_executor(pool, open_drop, f)
+        except ImportError as e:  # .zst sin el paquete opcional zstandard
+            print(f"[AVISO] Ignorado {f.name}: {e}")
+            continue
+        header = None
+        try:
+            while True:
+                lines, secs = await loop.run_in_executor(pool, _timed, fh.readlines, chunk_bytes)
+                st.busy += secs
+                if not lines:
+                    break
+                if header is None:
+                    header = lines.pop(0).rstrip("\r\n")
+                    if not lines:
+                        continue
+                st.items += 1
+                await _put(out, (f, kind, fp, header, "".join(lines)), st)
+                del lines
+        finally:
+            fh.close()
+        await _put(out, (f, kind, fp, header, None), st)
+    await out.put(None)
+
+async def _parser(inp: asyncio.Queue, out: asyncio.Queue, pool: Executor, st: StageStats, tuner=None):
+    loop = asyncio.get_running_loop()
+    inflight: set = set()
+    while (item := await inp.get()) is not None:
+        f, kind, fp, header, text = item
+        if text is None:  # fin del drop
+            await _put(out, item, st)
+            continue
+        while tuner is not None and len(inflight) >= tuner.value:  # parseos en vuelo, según el autoajuste
+            await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+        fut = loop.run_in_executor(pool, _parse, kind, header, text)
+        inflight.add(fut)
+        fut.add_done_callback(inflight.discard)
+        del item, text
+        st.items += 1
+        await _put(out, (f, kind, fp, header, fut), st)
+    await out.put(None)
+
+async def _writer(inp: asyncio.Queue, begin, pool: Executor, st: StageStats, parse_st: StageStats, counters: dict, tuner=None):
+    loop = asyncio.get_running_loop()
+    last = time.perf_counter()
+    batch = None
+    while (item := await inp.get()) is not None:
+        f, kind, fp, header, fut = item
+        if batch is None:
+            batch, secs = await loop.run_in_executor(pool, _timed, begin, f, kind, fp)
+            st.busy += secs
+        if fut is None:  # fin del drop: perfil, ingested y commit
+            n, secs = await loop.run_in_executor(pool, _timed, batch.finish)
+            counters[kind] += n
+            st.busy += secs
+            batch = None
+            continue
+        bad, df, fps, secs = await fut
+        parse_st.busy += secs
+        _, secs = await loop.run_in_executor(pool, _timed, batch.add, ([header], bad), (df, fps))
+        st.busy += secs
+        st.items += 1
+        if tuner is not None:  # filas/s del pipeline entero desde el trozo anterior
+            now = time.perf_counter()
+            tuner.observe(len(df) + len(bad), now - last)
+            last = now
+
+async def _sample(queues: list[tuple[asyncio.Queue, QueueStats]]):
+    while True:
+        for q, qs in queues:
+            qs.samples.append(q.qsize())
+        await asyncio.sleep(SAMPLE_S)
+
+async def _run(files, begin, io_pool, parse_pool, write_pool, depth, chunk_bytes, stats, counters, tuner=None):
+    q_read, q_parse = asyncio.Queue(depth), asyncio.Queue(depth)
+    sampler = asyncio.create_task(_sample([(q_read, stats["cola_lectura"]), (q_parse, stats["cola_parseo"])]))
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(_reader(files, q_read, io_pool, stats["lectura"], chunk_bytes))
+            tg.create_task(_parser(q_read, q_parse, parse_pool, stats["parseo"], tuner))
+            tg.create_task(_writer(q_parse, begin, write_pool, stats["escritura"], stats["parseo"], counters, tuner))
+    finally:
+        sampler.cancel()
+
+def ingest_staged(
+    con: sqlite3.Connection,
+    files: list[tuple[Path, str, str]],
+    run_id: str,
+    shard_dir: Path | None = None,
+    dedup: bool = True,
+    io_workers: int | None = None,
+    parse_workers: int | None = None,
+    depth: int = DEPTH,
+    tune=None,
+    chunk_bytes: int = CHUNK_BYTES,
+) -> tuple[dict, dict]:
+    """
+    Ingesta de `files` [(drop, kind, huella)] en etapas. Devuelve (filas por kind, métricas).
+    Con `tune` (autotune.Session), el pool de parseo se dimensiona al máximo permitido y
+    los parseos en vuelo los decide el tuner ingest.parse_workers, trozo a trozo.
+    """
+    from ut1 import storage
+    from ut1.ingest import DropBatch
+    con.commit()  # la escritura usa otra conexión
+    counters = {"ventas": 0, "clientes": 0, "productos": 0}
+    stats = {
+        "lectura": StageStats(), "parseo": StageStats(), "escritura": StageStats(),
+        "cola_lectura": QueueStats(depth), "cola_parseo": QueueStats(depth),
+    }
+    io_workers = io_workers or min(4, os.cpu_count() or 1)
+    parse_workers = parse_workers or min(4, os.cpu_count() or 1)
+    tuner = tune.tuner("ingest.parse_workers") if tune is not None else None
+    if tuner is not None:
+        parse_workers = max(tuner.allowed)
+        depth = max(depth, parse_workers)  # que la cola no limite antes que el tuner
+        stats["cola_lectura"].size = stats["cola_parseo"].size = depth
+    db = _db_path(con)
+    wcon: list[sqlite3.Connection] = []
+    blooms = rowdedup.BloomCache()
+
+    def begin(f, kind, fp):  # siempre en el mismo hilo (write_pool de 1), como add() y finish()
+        if not wcon:
+            wcon.append(storage.connect(db))
+        return DropBatch(wcon[0], f, kind, fp, run_id, shard_dir, dedup, blooms)
+
+    def close():
+        try:
+            wcon[0].rollback()  # el batch que falló a medias no se confirma
+            blooms.flush(wcon[0])  # lo confirmado antes del fallo ya está en el filtro
+        finally:
+            wcon[0].close()
+
+    t0 = time.perf_counter()
+    parse_pool = ProcessPoolExecutor(parse_workers) if parse_workers > 1 else ThreadPoolExecutor(1)
+    with ThreadPoolExecutor(io_workers) as io_pool, parse_pool, ThreadPoolExecutor(1) as write_pool:
+        try:
+            asyncio.run(_run(files, begin, io_pool, parse_pool, write_pool, depth, chunk_bytes, stats, counters, tuner))
+        except ExceptionGroup as eg:  # el fallo de la etapa, como en la ingesta secuencial
+            raise eg.exceptions[0]
+        finally:
+            if wcon:
+                write_pool.submit(close).result()
+    stats["total"] = time.perf_counter() - t0
+    return counters, stats
+
+def format_stats(stats: dict) -> str:
+    stages = ", ".join(
+        f"{name} {stats[name].busy:.2f} s (bloqueada {stats[name].blocked:.2f} s)" if stats[name].blocked >= 0.01
+        else f"{name} {stats[name].busy:.2f} s"
+        for name in ("lectura", "parseo", "escritura")
+    )
+    queues = ", ".join(
+        f"{name} media {stats[name].mean:.1f}/{stats[name].size} máx {stats[name].peak}"
+        for name in ("cola_lectura", "cola_parseo")
+    )
+    return f"Etapas: {stages} · total {stats['total']:.2f} s\nColas: {queues}"
@@ -0,0 +1,139 @@
+"""SQLite sin pandas: conexión, esquema, UPSERTs y vistas (sql/*.sql)."""
+import re
+import sqlite3
+from pathlib import Path
+from ut1 import paths
+
+def connect(db: Path | None = None, timeout: float = 5.0, factory: type = sqlite3.Connection) -> sqlite3.Connection:
+    db = db or paths.DB
+    db.parent.mkdir(parents=True, exist_ok=True)
+    return sqlite3.connect(db, timeout=timeout, factory=factory)
+
+SCHEMA_FILES = ["00_schema.sql", "30_rollup.sql", "40_cdc.sql"]
+SHARD_SCHEMA_FILE = "01_schema_shard_ventas.sql"
+
+def apply_schema(con: sqlite3.Connection, shard_dir: Path | None = None):
+    legacy = _set_aside_legacy(con)
+    _dedupe_quarantine(con)
+    for name in SCHEMA_FILES:
+        con.executescript((paths.SQL_DIR / name).read_text(encoding="utf-8"))
+    if legacy:
+        con.executescript(LEGACY_COPY.format(dims="main"))
+    _add_columns(con)
+    con.commit()
+    migrate_shards(con, shard_dir or paths.SHARD_DIR)
+
+# Migración desde clean_ventas con claves TEXT (antes de dim_*/fact_ventas)
+LEGACY_TRIGGERS = ("trg_clean_ventas_ins", "trg_clean_ventas_upd", "trg_clean_ventas_del")
+LEGACY_CUBE = ("gold_ventas_dia_producto", "gold_productos", "gold_ventas_dia", "gold_dirty_fechas")
+LEGACY_VIEWS = ("ventas_diarias", "vw_producto_mas_vendido")
+LEGACY_COPY = """
+INSERT OR IGNORE INTO {dims}.dim_cliente (id_cliente) SELECT DISTINCT id_cliente FROM clean_ventas_legacy;
+INSERT OR IGNORE INTO {dims}.dim_producto (id_producto) SELECT DISTINCT id_producto FROM clean_ventas_legacy;
+INSERT INTO fact_ventas (fecha_dia, cliente_sk, producto_sk, unidades, precio_unitario, _ingest_ts)
+SELECT unixepoch(l.fecha) / 86400, c.cliente_sk, p.producto_sk, l.unidades, l.precio_unitario, l._ingest_ts
+FROM clean_ventas_legacy l
+JOIN {dims}.dim_cliente c ON c.id_cliente = l.id_cliente
+JOIN {dims}.dim_producto p ON p.id_producto = l.id_producto;
+DROP TABLE clean_ventas_legacy;
+"""
+
+def _is_table(con: sqlite3.Connection, name: str) -> bool:
+    return con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+def _set_aside_legacy(con: sqlite3.Connection, cube: bool = True) -> bool:
+    """
+    Renombra clean_ventas (tabla) a clean_ventas_legacy para que el esquema cree la vista;
+    LEGACY_COPY vuelca luego sus filas en fact_ventas. El cubo oro con claves TEXT se
+    descarta: refresh() lo rehace entero al encontrarlo vacío.
+    """
+    if not _is_table(con, "clean_ventas"):
+        return False
+    for t in LEGACY_TRIGGERS:
+        con.execute(f"DROP TRIGGER IF EXISTS {t}")
+    for v in LEGACY_VIEWS:
+        con.execute(f"DROP VIEW IF EXISTS {v}")
+    for t in LEGACY_CUBE if cube else ("gold_dirty_fechas",):
+        con.execute(f"DROP TABLE IF EXISTS {t}")
+    con.execute("ALTER TABLE clean_ventas RENAME TO clean_ventas_legacy")
+    return True
+
+def _dedupe_quarantine(con: sqlite3.Connection):
+    """Antes del índice único por (_source_file, _row): fuera las copias que dejaban los runs repetidos."""
+    for kind in ("ventas", "clientes", "productos"):
+        t = f"quarantine_{kind}"
+        done = con.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (f"ux_{t}_row",)).fetchone()
+        if _is_table(con, t) and not done:
+            con.execute(f"DELETE FROM {t} WHERE rowid NOT IN (SELECT MAX(rowid) FROM {t} GROUP BY _source_file, _row)")
+            con.execute(f"DROP INDEX IF EXISTS ix_{t}_source")
+
+# Columnas añadidas a tablas existentes: tabla → [(columna, tipo)]
+ADDED_COLUMNS = {
+    **{f"quarantine_{k}": [("_header", "TEXT")] for k in ("ventas", "clientes", "productos")},
+}
+
+def _add_columns(con: sqlite3.Connection):
+    for t, cols in ADDED_COLUMNS.items():
+        have = {c[1] for c in con.execute(f"PRAGMA table_info({t})")}
+        for name, decl in cols:
+            if name not in have:
+                con.execute(f"ALTER TABLE {t} ADD COLUMN {name} {decl}")
+
+def migrate_shards(con: sqlite3.Connection, shard_dir: Path) -> int:
+    """Pasa a fact_ventas los shards mensuales con clean_ventas TEXT. Las claves se dan de alta en ut1.db."""
+    main_db = con.execute("PRAGMA database_list").fetchone()[2]
+    n = 0
+    for p in sorted(shard_dir.glob("ventas_*.db")) if shard_dir.exists() else []:
+        sc = sqlite3.connect(p)
+        try:
+            if not _set_aside_legacy(sc, cube=False):
+                continue
+            sc.executescript((paths.SQL_DIR / SHARD_SCHEMA_FILE).read_text(encoding="utf-8"))
+            sc.execute("ATTACH DATABASE ? AS ut1", (main_db,))
+            sc.executescript(LEGACY_COPY.format(dims="ut1"))
+            sc.commit()
+            n += 1
+        finally:
+            sc.close()
+    return n
+
+def create_views(con: sqlite3.Connection):
+    con.executescript((paths.SQL_DIR / "20_views.sql").read_text(encoding="utf-8"))
+    con.commit()
+
+def list_objects(con: sqlite3.Connection, kind: str) -> list[str]:
+    return [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = ? ORDER BY name", (kind,))]
+
+def table_counts(con: sqlite3.Connection) -> dict[str, int]:
+    return {t: con.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in list_objects(con, "table")}
+
+# Carga de UPSERTs desde sql/10_upserts.sql
+def load_upsert_sqls(path: Path = paths.SQL_DIR / "10_upserts.sql") -> dict[str, str]:
+    raw = path.read_text(encoding="utf-8").replace("\ufeff", "")
+    lines = []
+    for line in raw.splitlines():
+        line = line.split("--", 1)[0]
+        if line.strip():
+            lines.append(line)
+    txt = "\n".join(lines)
+    def extract_one(table: str) -> str:
+        m = re.search(rf"(?is)\binsert\s+into\s+{table}\b", txt)
+        if not m:
+            raise ValueError(f"No se encontró INSERT INTO {table} en {path.name}")
+        after = txt[m.start():]
+        semi = after.find(";")
+        if semi == -1:
+            raise ValueError(f"La sentencia INSERT de {table} no termina en ';' en {path.name}")
+        stmt = after[:semi].strip()
+        if not re.search(r"(?i)\b(values|select)\b", stmt) or "on conflict" not in stmt.lower():
+            raise ValueError(f"INSERT de {table} incompleto en {path.name}")
+        if "*" in stmt:
+            raise ValueError(f"INSERT de {table} contiene '*', revisa {path.name}")
+        return stmt
+    return {
+        "fact_ventas": extract_one("fact_ventas"),
+        "clean_clientes": extract_one("clean_clientes"),
+        "clean_productos": extract_one("clean_productos"),
+        "hist_clientes": extract_one("hist_clientes"),
+        "hist_productos": extract_one("hist_productos"),
+    }
@@ -0,0 +1,30 @@
+"""Utilidades de limpieza compartidas por ingesta y plata."""
+import pandas as pd
+
+def to_float_money(x):
+    try:
+        return float(str(x).replace(",", "."))
+    except Exception:
+        return None
+
+def strip_strings(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    for c in df.columns:
+        if pd.api.types.is_object_dtype(df[c]):
+            df[c] = df[c].astype(str).str.strip()
+        elif pd.api.types.is_string_dtype(df[c]):  # dtype str de pandas 3 (read_csv con dtype=str): los nulos siguen nulos
+            df[c] = df[c].str.strip()
+    return df
+
+def serialize_row_csv_like(row: pd.Series, cols: list[str]) -> str:
+    values = []
+    for c in cols:
+        v = row.get(c, "")
+        if v is None:
+            v = ""
+        s = str(v)
+        if "," in s or '"' in s:
+            s = '"' + s.replace('"', '""') + '"'
+        values.append(s)
+    return ",".join(values)
@@ -0,0 +1,253 @@
+"""
+Cola de trabajo compartida (tabla work_queue) para procesar data/drops desde varios procesos o hosts.
+
+Cada drop es una fila. Un worker la reclama con un UPDATE ... RETURNING atómico que
+fija `owner` y un lease (`lease_until`); un hilo de heartbeat lo renueva mientras el
+fichero pasa por ingest y clean. Si el worker muere o se para, el lease caduca y otro
+lo vuelve a reclamar, purgando antes lo que dejaron los intentos anteriores (desde
+`started_ts`, el inicio del primero; como `run` con un batch en `pending`).
+
+Fencing: la conexión del worker (FencedConnection) comprueba owner + lease vigente con
+un UPDATE de work_queue dentro de cada transacción, justo antes del commit, y la deshace
+si ya no es suya. SQLite serializa escrituras: mientras la transacción escribe nadie
+puede reclamar el drop, así que un worker que perdió el lease no confirma nada más y lo
+que confirmó antes lo purga el siguiente. En ut1.db cada fila queda escrita una vez; los
+shards de ventas (--shard-ventas) son otros ficheros y se confirman aparte, así que un
+worker parado puede dejar ahí filas hasta que el siguiente intento las purga.
+Las funciones de cola son solo biblioteca estándar (las usa `status`).
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from ut1 import journal, paths, storage
+from ut1.drops import inner_name, list_drops
+
+LEASE_S = 60.0
+MAX_ATTEMPTS = 3
+QUEUE_STATES = ("queued", "claimed", "done", "failed")
+
+class LeaseLost(RuntimeError):
+    """Otro worker reclamó el fichero (nuestro lease caducó)."""
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+# Alta en la cola: nuevos → queued; los que cambiaron de huella vuelven a queued salvo si están reclamados
+ENQUEUE_SQL = """
+INSERT INTO work_queue (_source_file, kind, fingerprint, state, attempts, queued_ts, updated_ts)
+VALUES (:src, :kind, :fp, :state, 0, :ts, :ts)
+ON CONFLICT(_source_file) DO UPDATE SET
+    fingerprint = excluded.fingerprint, state = 'queued', owner = NULL, lease_until = NULL,
+    attempts = 0, queued_ts = excluded.queued_ts, started_ts = NULL, updated_ts = excluded.updated_ts, error = NULL
+WHERE work_queue.fingerprint IS NOT excluded.fingerprint AND work_queue.state <> 'claimed'
+"""
+
+# started_ts: inicio del primer intento desde el alta (lo que haya de antes no es de esta cola)
+CLAIM_SQL = """
+UPDATE work_queue SET state = 'claimed', owner = :owner, lease_until = :until, attempts = attempts + 1,
+    started_ts = COALESCE(started_ts, :ts), updated_ts = :ts
+WHERE _source_file = (
+    SELECT _source_file FROM work_queue
+    WHERE (state = 'queued' OR (state = 'claimed' AND lease_until < :now)) AND attempts < :max
+    ORDER BY queued_ts, _source_file
+    LIMIT 1
+)
+RETURNING _source_file, kind, fingerprint, attempts, queued_ts, started_ts
+"""
+
+# Fencing dentro de la transacción de datos: sigue siendo nuestro y con lease vigente (y se renueva)
+FENCE_SQL = """
+UPDATE work_queue SET lease_until = :until, updated_ts = :ts
+WHERE _source_file = :src AND owner = :owner AND state = 'claimed' AND lease_until > :now
+"""
+
+def enqueue(con: sqlite3.Connection, data_dir: Path | None = None) -> dict[str, int]:
+    """Registra los drops de `data_dir`; los ya limpios en run_journal con la misma huella entran como done."""
+    from ut1.ingest import classify_file
+    done = {src: e["fingerprint"] for src, e in journal.entries(con).items() if e["state"] in ("cleaned", "published")}
+    ts = journal.now_iso()
+    for f in list_drops(data_dir or paths.DATA):
+        kind = classify_file(inner_name(f))
+        if not kind:
+            continue
+        fp = journal.fingerprint(f)
+        state = "done" if done.get(f.name) == fp else "queued"
+        con.execute(ENQUEUE_SQL, {"src": f.name, "kind": kind, "fp": fp, "state": state, "ts": ts})
+    con.commit()
+    return summary(con)
+
+def claim(con: sqlite3.Connection, owner: str, lease_s: float = LEASE_S, max_attempts: int = MAX_ATTEMPTS) -> dict | None:
+    """Reclama el siguiente drop libre (o con lease caducado). None si no queda ninguno."""
+    now = time.time()
+    ts = journal.now_iso()
+    # Leases caducados sin intentos restantes: fuera de la cola
+    con.execute(
+        "UPDATE work_queue SET state = 'failed', error = 'lease caducado', updated_ts = ? "
+        "WHERE state = 'claimed' AND lease_until < ? AND attempts >= ?",
+        (ts, now, max_attempts),
+    )
+    cur = con.execute(CLAIM_SQL, {"owner": owner, "until": now + lease_s, "ts": ts, "now": now, "max": max_attempts})
+    row = cur.fetchone()
+    cols = [d[0] for d in cur.description]
+    con.commit()
+    return dict(zip(cols, row)) if row else None
+
+def heartbeat(con: sqlite3.Connection, src: str, owner: str, lease_s: float = LEASE_S) -> bool:
+    """Renueva el lease. False si ya no es nuestro."""
+    cur = con.execute(
+        "UPDATE work_queue SET lease_until = ?, updated_ts = ? WHERE _source_file = ? AND owner = ? AND state = 'claimed'",
+        (time.time() + lease_s, journal.now_iso(), src, owner),
+    )
+    con.commit()
+    return cur.rowcount == 1
+
+class FencedConnection(sqlite3.Connection):
+    """Conexión del worker: con `fence` = (drop, owner, lease_s), cada commit pasa antes FENCE_SQL en su transacción."""
+    fence: tuple[str, str, float] | None = None
+
+    def commit(self):
+        if self.fence is not None and self.in_transaction:
+            src, owner, lease_s = self.fence
+            now = time.time()
+            cur = self.execute(FENCE_SQL, {"src": src, "owner": owner, "until": now + lease_s, "ts": journal.now_iso(), "now": now})
+            if cur.rowcount != 1:
+                self.rollback()
+                raise LeaseLost(src)
+        super().commit()
+
+def finish(con: sqlite3.Connection, src: str, owner: str) -> bool:
+    cur = con.execute(
+        "UPDATE work_queue SET state = 'done', lease_until = NULL, updated_ts = ?, error = NULL "
+        "WHERE _source_file = ? AND owner = ? AND state = 'claimed' AND lease_until > ?",
+        (journal.now_iso(), src, owner, time.time()),
+    )
+    con.commit()
+    return cur.rowcount == 1
+
+def release(con: sqlite3.Connection, src: str, owner: str, error: str, max_attempts: int = MAX_ATTEMPTS) -> str | None:
+    """Devuelve el drop a la cola tras un fallo (o lo da por fallido al agotar intentos). Estado nuevo o None."""
+    cur = con.execute(
+        "UPDATE work_queue SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+        "owner = NULL, lease_until = NULL, updated_ts = ?, error = ? "
+        "WHERE _source_file = ? AND owner = ? AND state = 'claimed' RETURNING state",
+        (max_attempts, journal.now_iso(), error[:500], src, owner),
+    )
+    row = cur.fetchone()
+    con.commit()
+    return row[0] if row else None
+
+def summary(con: sqlite3.Connection) -> dict[str, int]:
+    counts = dict(con.execute("SELECT state, COUNT(*) FROM work_queue GROUP BY state").fetchall())
+    return {s: counts.get(s, 0) for s in QUEUE_STATES}
+
+class Heartbeat(threading.Thread):
+    """Renueva el lease cada lease_s/3 con su propia conexión; check() avisa si se perdió."""
+
+    def __init__(self, db: Path, src: str, owner: str, lease_s: float = LEASE_S):
+        super().__init__(daemon=True)
+        self.db, self.src, self.owner, self.lease_s = db, src, owner, lease_s
+        self.lost = threading.Event()
+        self._done = threading.Event()
+
+    def run(self):
+        con = storage.connect(self.db, timeout=self.lease_s / 3)
+        try:
+            while not self._done.wait(self.lease_s / 3):
+                try:
+                    if not heartbeat(con, self.src, self.owner, self.lease_s):
+                        self.lost.set()
+                        return
+                except sqlite3.OperationalError:  # BD ocupada: se reintenta en el siguiente tick
+                    pass
+        finally:
+            con.close()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def check(self):
+        if self.lost.is_set():
+            raise LeaseLost(self.src)
+
+def run_worker(
+    db: Path | None = None,
+    data_dir: Path | None = None,
+    shard_dir: Path | None = None,
+    owner: str | None = None,
+    lease_s: float = LEASE_S,
+    max_attempts: int = MAX_ATTEMPTS,
+    max_files: int | None = None,
+    wal: bool = False,
+) -> dict[str, int]:
+    """
+    Reclama drops hasta vaciar la cola (incluidos los que deje un worker caído) y pasa
+    cada uno por ingest + clean en este proceso. No exporta Parquet ni publica: eso lo hace `python -m ut1 run` al terminar.
+    """
+    from ut1.clean import clean_batch
+    from ut1.ingest import ingest_file, purge_batch
+
+    owner = owner or worker_id()
+    db, data_dir = db or paths.DB, data_dir or paths.DATA
+    stats = {"done": 0, "requeued": 0, "failed": 0, "lost": 0, "rows": 0}
+    con = storage.connect(db, timeout=max(30.0, lease_s), factory=FencedConnection)
+    try:
+        if wal:  # solo con todos los workers en el mismo host: WAL no funciona sobre ficheros de red
+            con.execute("PRAGMA journal_mode=WAL")
+        storage.apply_schema(con, shard_dir or paths.SHARD_DIR)
+        enqueue(con, data_dir)
+        run_id = journal.new_run_id()
+        upserts = storage.load_upsert_sqls()
+        while max_files is None or stats["done"] < max_files:
+            job = claim(con, owner, lease_s, max_attempts)
+            if job is None:
+                # Nada libre: si otro worker tiene drops reclamados, se espera a que acabe o caduque su lease
+                nxt = con.execute("SELECT MIN(lease_until) FROM work_queue WHERE state = 'claimed'").fetchone()[0]
+                if nxt is None:
+                    break
+                time.sleep(min(max(nxt - time.time(), 0.0) + 0.05, lease_s / 3))
+                continue
+            src, kind = job["_source_file"], job["kind"]
+            hb = Heartbeat(db, src, owner, lease_s)
+            hb.start()
+            con.fence = (src, owner, lease_s)
+            try:
+                if job["attempts"] > 1:
+                    purge_batch(con, kind, src, job["started_ts"] or job["queued_ts"], shard_dir)
+                f = data_dir / src
+                hb.check()
+                stats["rows"] += ingest_file(con, f, kind, journal.fingerprint(f), run_id, shard_dir)
+                hb.check()
+                clean_batch(con, kind, src, run_id, shard_dir, upserts, journal.entries(con).get(src))
+                con.fence = None
+                if not finish(con, src, owner):
+                    raise LeaseLost(src)
+                stats["done"] += 1
+            except LeaseLost:
+                con.rollback()
+                stats["lost"] += 1
+                print(f"[AVISO] {owner}: lease perdido en {src}; lo termina otro worker")
+            except Exception as e:
+                con.fence = None
+                con.rollback()
+                state = release(con, src, owner, f"{type(e).__name__}: {e}", max_attempts)
+                stats["failed" if state == "failed" else "requeued"] += 1
+                print(f"[ERROR] {owner}: {src} → {state}: {e}")
+            finally:
+                con.fence = None
+                hb.stop()
+    finally:
+        con.close()
+    return stats
+
+def _run_worker_proc(kwargs: dict) -> dict[str, int]:
+    return run_worker(**kwargs)
+
+def run_pool(processes: int, **kwargs) -> list[dict[str, int]]:
+    """`processes` workers locales (procesos) sobre la misma cola."""
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(processes) as ex:
+        return list(ex.map(_run_worker_proc, [kwargs] * processes))